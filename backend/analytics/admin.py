@@ -1,3 +1,13 @@
 from django.contrib import admin
+from .models import DailyIncidentRollup, OfficerDailyRollup
 
-# Register your models here.
+@admin.register(DailyIncidentRollup)
+class DailyIncidentRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'hour', 'incident_type', 'severity', 'location_building', 'incident_count', 'resolved_count']
+    list_filter = ['incident_type', 'severity', 'date']
+    date_hierarchy = 'date'
+
+@admin.register(OfficerDailyRollup)
+class OfficerDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'officer', 'resolved_count', 'resolution_seconds']
+    date_hierarchy = 'date'
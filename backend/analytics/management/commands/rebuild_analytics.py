@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from analytics import rollups
+from analytics.models import DailyIncidentRollup
+
+class Command(BaseCommand):
+    help = 'Rebuild the analytics rollup tables from the incidents table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding analytics rollups...')
+        rollups.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {DailyIncidentRollup.objects.count()} daily rollup rows'
+        ))
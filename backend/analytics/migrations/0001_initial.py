@@ -0,0 +1,97 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+
+
+def build_rollups(apps, schema_editor):
+    # A frozen copy of analytics.rollups.rebuild, so later model changes
+    # don't break migrating from scratch
+    Incident = apps.get_model('incidents', 'Incident')
+    DailyIncidentRollup = apps.get_model('analytics', 'DailyIncidentRollup')
+    OfficerDailyRollup = apps.get_model('analytics', 'OfficerDailyRollup')
+
+    resolved = Q(status__in=['resolved', 'closed'], resolved_at__isnull=False)
+    duration = ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=models.DurationField())
+    incidents = Incident.objects.order_by().annotate(
+        date=TruncDate('created_at'),
+        hour=ExtractHour('created_at'),
+    )
+    daily = incidents.values('date', 'hour', 'incident_type', 'severity', 'location_building').annotate(
+        incident_count=Count('id'),
+        resolved_count=Count('id', filter=resolved),
+        duration=Sum(duration, filter=resolved),
+    )
+    officers = incidents.filter(resolved).values('date', 'assigned_to').annotate(
+        resolved_count=Count('id'),
+        duration=Sum(duration),
+    )
+
+    DailyIncidentRollup.objects.bulk_create((
+        DailyIncidentRollup(
+            date=row['date'], hour=row['hour'], incident_type=row['incident_type'],
+            severity=row['severity'], location_building=row['location_building'],
+            incident_count=row['incident_count'], resolved_count=row['resolved_count'],
+            resolution_seconds=int(row['duration'].total_seconds()) if row['duration'] else 0,
+        )
+        for row in daily.iterator()
+    ), batch_size=1000)
+    OfficerDailyRollup.objects.bulk_create((
+        OfficerDailyRollup(
+            date=row['date'], officer_id=row['assigned_to'],
+            resolved_count=row['resolved_count'],
+            resolution_seconds=int(row['duration'].total_seconds()) if row['duration'] else 0,
+        )
+        for row in officers.iterator()
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('incidents', '0005_reference_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyIncidentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('incident_type', models.CharField(max_length=50)),
+                ('severity', models.CharField(max_length=20)),
+                ('location_building', models.CharField(max_length=100)),
+                ('incident_count', models.IntegerField(default=0)),
+                ('resolved_count', models.IntegerField(default=0)),
+                ('resolution_seconds', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'analytics_daily_incidents',
+                'ordering': ['date', 'hour'],
+                'unique_together': {('date', 'hour', 'incident_type', 'severity', 'location_building')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OfficerDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('resolved_count', models.IntegerField(default=0)),
+                ('resolution_seconds', models.BigIntegerField(default=0)),
+                ('officer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'analytics_daily_officers',
+                'ordering': ['date'],
+                'unique_together': {('date', 'officer')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,45 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+
+class DailyIncidentRollup(models.Model):
+    """Incident counts per day, hour, type, severity and building.
+
+    Maintained incrementally by analytics.signals and rebuilt from scratch by
+    the ``rebuild_analytics`` management command. Resolution totals are
+    attributed to the bucket the incident was created in.
+    """
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    incident_type = models.CharField(max_length=50)
+    severity = models.CharField(max_length=20)
+    location_building = models.CharField(max_length=100)
+
+    incident_count = models.IntegerField(default=0)
+    resolved_count = models.IntegerField(default=0)
+    resolution_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'analytics_daily_incidents'
+        unique_together = [('date', 'hour', 'incident_type', 'severity', 'location_building')]
+        ordering = ['date', 'hour']
+
+    def __str__(self):
+        return f"{self.date} {self.hour:02d}h {self.incident_type}: {self.incident_count}"
+
+
+class OfficerDailyRollup(models.Model):
+    """Resolved incidents per day (of creation) and assigned officer."""
+    date = models.DateField()
+    officer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    resolved_count = models.IntegerField(default=0)
+    resolution_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'analytics_daily_officers'
+        unique_together = [('date', 'officer')]
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date} {self.officer}: {self.resolved_count}"
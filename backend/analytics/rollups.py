@@ -0,0 +1,174 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, ExpressionWrapper, F, Q, Sum, fields
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from incidents.models import Incident
+from .models import DailyIncidentRollup, OfficerDailyRollup
+
+RESOLVED_STATUSES = ['resolved', 'closed']
+
+# Incident fields that decide which rollup rows an incident contributes to
+ROLLUP_FIELDS = ['created_at', 'incident_type', 'severity', 'location_building',
+                 'status', 'resolved_at', 'assigned_to_id']
+
+
+def incident_state(incident, previous=False):
+    """Return the rollup-relevant values of ``incident``.
+
+    With ``previous=True`` the values loaded from the database (before any
+    unsaved changes) are returned, using the incident's field tracker.
+    """
+    state = {name: getattr(incident, name) for name in ROLLUP_FIELDS}
+    if previous:
+        for name, (old_value, _) in incident.tracked_changes().items():
+            attname = 'assigned_to_id' if name == 'assigned_to' else name
+            if attname in state:
+                state[attname] = old_value
+    return state
+
+
+def _bump(model, lookup, deltas):
+    updates = {name: F(name) + value for name, value in deltas.items() if value}
+    if not updates:
+        return
+    rows = model.objects.filter(**lookup)
+    if None in lookup.values():
+        # NULLs aren't covered by the unique constraint; pin a single row
+        pk = rows.values_list('pk', flat=True).first()
+        rows = model.objects.filter(pk=pk) if pk is not None else model.objects.none()
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created concurrently; apply the delta to that row instead
+        model.objects.filter(**lookup).update(**updates)
+
+
+def contribution(state):
+    """The rollup buckets and amounts one incident in ``state`` contributes."""
+    created_at = timezone.localtime(state['created_at'])
+    resolved = state['status'] in RESOLVED_STATUSES and state['resolved_at'] is not None
+    seconds = int((state['resolved_at'] - state['created_at']).total_seconds()) if resolved else 0
+    bucket = (created_at.date(), created_at.hour, state['incident_type'],
+              state['severity'], state['location_building'])
+    return bucket, resolved, seconds, state['assigned_to_id'] if resolved else None
+
+
+def apply(state, sign):
+    """Add (``sign=1``) or remove (``sign=-1``) one incident's contribution."""
+    (date, hour, incident_type, severity, building), resolved, seconds, officer_id = contribution(state)
+
+    _bump(DailyIncidentRollup, {
+        'date': date,
+        'hour': hour,
+        'incident_type': incident_type,
+        'severity': severity,
+        'location_building': building,
+    }, {
+        'incident_count': sign,
+        'resolved_count': sign if resolved else 0,
+        'resolution_seconds': sign * seconds,
+    })
+    if resolved:
+        _bump(OfficerDailyRollup, {
+            'date': date,
+            'officer_id': officer_id,
+        }, {
+            'resolved_count': sign,
+            'resolution_seconds': sign * seconds,
+        })
+
+
+def rebuild(batch_size=1000):
+    """Recompute every rollup row from the incidents table."""
+    resolved = Q(status__in=RESOLVED_STATUSES, resolved_at__isnull=False)
+    duration = ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=fields.DurationField())
+    incidents = Incident.objects.order_by().annotate(
+        date=TruncDate('created_at'),
+        hour=ExtractHour('created_at'),
+    )
+
+    daily = incidents.values('date', 'hour', 'incident_type', 'severity', 'location_building').annotate(
+        incident_count=Count('id'),
+        resolved_count=Count('id', filter=resolved),
+        duration=Sum(duration, filter=resolved),
+    )
+    officers = incidents.filter(resolved).values('date', 'assigned_to').annotate(
+        resolved_count=Count('id'),
+        duration=Sum(duration),
+    )
+
+    with transaction.atomic():
+        DailyIncidentRollup.objects.all().delete()
+        OfficerDailyRollup.objects.all().delete()
+        DailyIncidentRollup.objects.bulk_create((
+            DailyIncidentRollup(
+                date=row['date'], hour=row['hour'], incident_type=row['incident_type'],
+                severity=row['severity'], location_building=row['location_building'],
+                incident_count=row['incident_count'], resolved_count=row['resolved_count'],
+                resolution_seconds=int(row['duration'].total_seconds()) if row['duration'] else 0,
+            )
+            for row in daily.iterator()
+        ), batch_size=batch_size)
+        OfficerDailyRollup.objects.bulk_create((
+            OfficerDailyRollup(
+                date=row['date'], officer_id=row['assigned_to'],
+                resolved_count=row['resolved_count'],
+                resolution_seconds=int(row['duration'].total_seconds()) if row['duration'] else 0,
+            )
+            for row in officers.iterator()
+        ), batch_size=batch_size)
+
+
+def _hours(seconds, count):
+    return round(seconds / count / 3600, 1) if count else 0
+
+
+def advanced_analytics():
+    """Build the advanced_analytics payload for the global scope from the rollups."""
+    rows = DailyIncidentRollup.objects.order_by()
+    thirty_days_ago = (timezone.localtime() - timedelta(days=30)).date()
+
+    trends = rows.filter(date__gte=thirty_days_ago).values('date')\
+        .annotate(count=Sum('incident_count')).order_by('date')
+
+    hour_stats = {h: 0 for h in range(24)}
+    for entry in rows.values('hour').annotate(count=Sum('incident_count')):
+        hour_stats[entry['hour']] = entry['count']
+
+    by_location = rows.values('location_building').annotate(count=Sum('incident_count')).order_by('-count')
+    by_severity = rows.values('severity').annotate(count=Sum('incident_count'))
+    totals = rows.aggregate(resolved=Sum('resolved_count'), seconds=Sum('resolution_seconds'))
+    resolved_count = totals['resolved'] or 0
+
+    officer_performance = OfficerDailyRollup.objects.order_by().values('officer__full_name')\
+        .annotate(count=Sum('resolved_count')).filter(count__gt=0).order_by('-count')
+
+    efficiency_by_type = rows.values('incident_type')\
+        .annotate(resolved=Sum('resolved_count'), seconds=Sum('resolution_seconds'))\
+        .filter(resolved__gt=0)
+
+    return {
+        'trends': [{'date': entry['date'], 'count': entry['count']} for entry in trends],
+        'by_hour': [{'hour': k, 'count': v} for k, v in hour_stats.items()],
+        'by_location': [
+            {'location': entry['location_building'], 'count': entry['count']}
+            for entry in by_location if entry['count']
+        ],
+        'by_severity': {entry['severity']: entry['count'] for entry in by_severity if entry['count']},
+        'avg_resolution_hours': _hours(totals['seconds'] or 0, resolved_count),
+        'resolved_count': resolved_count,
+        'officer_performance': [
+            {'assigned_to__full_name': entry['officer__full_name'], 'count': entry['count']}
+            for entry in officer_performance
+        ],
+        'type_efficiency': [
+            {'type': entry['incident_type'], 'avg_hours': _hours(entry['seconds'], entry['resolved'])}
+            for entry in efficiency_by_type
+        ],
+    }
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from incidents.models import Incident
+from . import rollups
+
+@receiver(post_save, sender=Incident)
+def update_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        rollups.apply(rollups.incident_state(instance), 1)
+        return
+
+    previous = rollups.incident_state(instance, previous=True)
+    current = rollups.incident_state(instance)
+    if rollups.contribution(previous) != rollups.contribution(current):
+        rollups.apply(previous, -1)
+        rollups.apply(current, 1)
+
+@receiver(post_delete, sender=Incident)
+def remove_from_rollups(sender, instance, **kwargs):
+    rollups.apply(rollups.incident_state(instance, previous=True), -1)
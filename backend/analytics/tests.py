@@ -1,3 +1,131 @@
-from django.test import TestCase
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from django.core.cache import caches
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from incidents.models import Incident
+from incidents.views import compute_analytics
+from .models import DailyIncidentRollup, OfficerDailyRollup
+from . import rollups
 
-# Create your tests here.
+User = get_user_model()
+
+def snapshot():
+    daily = sorted(
+        DailyIncidentRollup.objects.filter(incident_count__gt=0).values_list(
+            'date', 'hour', 'incident_type', 'severity', 'location_building',
+            'incident_count', 'resolved_count', 'resolution_seconds'
+        )
+    )
+    officers = sorted(
+        OfficerDailyRollup.objects.filter(resolved_count__gt=0).values_list(
+            'date', 'officer_id', 'resolved_count', 'resolution_seconds'
+        ),
+        key=lambda row: (row[0], row[1] or 0)
+    )
+    return daily, officers
+
+class RollupMaintenanceTests(APITestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.guards = [
+            User.objects.create_user(username=f'guard{i}', password='password', role='guard', full_name=f'Guard {i}')
+            for i in range(2)
+        ]
+        self.incidents = [
+            Incident.objects.create(
+                incident_type=incident_type, title='Test', description='Test',
+                location_building=building, severity=severity, assigned_to=self.guards[i % 2]
+            )
+            for i, (incident_type, severity, building) in enumerate([
+                ('theft', 'high', 'Library'), ('theft', 'low', 'Hostel A'),
+                ('noise', 'low', 'Hostel A'), ('facility', 'medium', 'Engineering Block'),
+            ])
+        ]
+
+    def mutate(self):
+        resolved = Incident.objects.get(pk=self.incidents[0].pk)
+        resolved.status = 'resolved'
+        resolved.resolved_at = resolved.created_at + timedelta(hours=3)
+        resolved.save()
+
+        closed = Incident.objects.get(pk=self.incidents[1].pk)
+        closed.status = 'closed'
+        closed.resolved_at = closed.created_at + timedelta(hours=1)
+        closed.save()
+        # Reassigning a closed incident moves its credit to the new officer
+        closed.assigned_to = self.guards[0]
+        closed.save()
+
+        changed = Incident.objects.get(pk=self.incidents[2].pk)
+        changed.incident_type = 'vandalism'
+        changed.severity = 'high'
+        changed.save()
+
+        Incident.objects.get(pk=self.incidents[3].pk).delete()
+
+    def test_incremental_rollups_match_a_full_rebuild(self):
+        self.mutate()
+        incremental = snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, snapshot())
+        self.assertEqual(sum(row[5] for row in incremental[0]), 3)
+        self.assertEqual(incremental[1][0][1:], (self.guards[0].id, 2, 4 * 3600))
+
+    def test_advanced_analytics_from_rollups_matches_raw_computation(self):
+        self.mutate()
+        self.client.force_authenticate(user=self.supervisor)
+        response = self.client.get(reverse('incident-advanced-analytics'))
+        self.assertEqual(response.status_code, 200)
+
+        raw = compute_analytics(Incident.objects.all())
+        data = response.data
+        self.assertEqual([entry['count'] for entry in data['trends']], [entry['count'] for entry in raw['trends']])
+        self.assertEqual(data['by_hour'], raw['by_hour'])
+        self.assertEqual(sorted(data['by_location'], key=str), sorted(raw['by_location'], key=str))
+        self.assertEqual(data['by_severity'], raw['by_severity'])
+        self.assertEqual(data['avg_resolution_hours'], raw['avg_resolution_hours'])
+        self.assertEqual(data['resolved_count'], raw['resolved_count'])
+        self.assertEqual(data['officer_performance'], raw['officer_performance'])
+        self.assertEqual(sorted(data['type_efficiency'], key=str), sorted(raw['type_efficiency'], key=str))
+
+
+class AnalyticsCacheTests(APITestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.head = User.objects.create_user(
+            username='head', password='password', role='head', full_name='Head'
+        )
+        Incident.objects.create(
+            incident_type='theft', title='Test', description='Test', location_building='Library'
+        )
+        self.url = reverse('incident-advanced-analytics')
+
+    def get(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_global_scope_is_shared_between_supervisors(self):
+        self.get(self.supervisor)
+        with self.assertNumQueries(0):
+            response = self.get(self.head)
+        self.assertEqual(response.data['by_severity'], {'medium': 1})
+
+    def test_incident_change_invalidates_cached_analytics(self):
+        self.get(self.supervisor)
+        with self.captureOnCommitCallbacks(execute=True):
+            Incident.objects.create(
+                incident_type='noise', title='Test', description='Test',
+                location_building='Library', severity='low'
+            )
+        response = self.get(self.head)
+        self.assertEqual(response.data['by_severity'], {'medium': 1, 'low': 1})
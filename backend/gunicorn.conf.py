@@ -0,0 +1,23 @@
+"""gunicorn settings.
+
+Read from the working directory when gunicorn is started in backend/, and
+with ``-c backend/gunicorn.conf.py`` from the repository root.
+"""
+from pathlib import Path
+import glob
+import os
+
+from decouple import config
+
+
+def on_starting(server):
+    # Files left by the previous master's workers would otherwise be summed
+    # into the counters forever, and a reused PID could revive their gauges.
+    # Django's settings are not loaded here: workers forked from this master
+    # would inherit them before asgi.py can adjust DB_CONN_MAX_AGE.
+    directory = config('METRICS_DIR', default=str(Path(__file__).resolve().parent / '.metrics'))
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json*')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'incident_system.settings')
+# Under ASGI each request runs its synchronous code in a thread of its own,
+# so a persistent connection would be left open for every finished thread
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -0,0 +1,48 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _lock:
+        # Forked gunicorn workers must not reuse the parent's threads
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_TASK_WORKERS,
+                thread_name_prefix='background-task',
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(fn, '__name__', fn))
+        raise
+    finally:
+        # Each worker thread holds its own connections; don't leak them
+        connections.close_all()
+
+
+def submit(fn, *args, **kwargs):
+    """Run ``fn`` on the process-wide background thread pool.
+
+    With ``BACKGROUND_TASKS_SYNC`` enabled (the test run) the task runs inline
+    instead, so its effects are visible as soon as this returns.
+    """
+    if settings.BACKGROUND_TASKS_SYNC:
+        return fn(*args, **kwargs)
+    return _get_executor().submit(_run, fn, args, kwargs)
@@ -0,0 +1,166 @@
+"""Per-request timing and query instrumentation.
+
+Enabled with ``INSTRUMENTATION_ENABLED``. Each request records wall time, DB
+query count and time (through a connection execute wrapper), serializer time
+and response size. The numbers go out in a ``Server-Timing`` header, into a
+rolling per-route window served to admins by ``request_stats``, and to the
+log when a request exceeds the configured budgets.
+"""
+from collections import defaultdict, deque
+from contextvars import ContextVar
+import logging
+import math
+import os
+import threading
+import time
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+
+from users.permissions import IsAdminUser
+
+logger = logging.getLogger(__name__)
+
+# A context variable rather than a thread-local: under ASGI a sync view runs
+# in a worker thread with a copy of the request's context, and concurrent
+# requests on the event loop each get their own value
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+
+def get_current_metrics():
+    return _current.get()
+
+
+def start():
+    metrics = RequestMetrics()
+    _current.set(metrics)
+    return metrics
+
+
+def finish():
+    _current.set(None)
+
+
+def time_query(execute, sql, params, many, context):
+    """Connection execute wrapper adding each query to the current request."""
+    metrics = get_current_metrics()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def _add_query_timing(connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def install_query_timing():
+    """Wrap every connection, including ones opened later in other threads."""
+    connection_created.connect(_add_query_timing, dispatch_uid='instrumentation-query-timing')
+    for connection in connections.all(initialized_only=True):
+        _add_query_timing(connection)
+
+
+_original_serializer_data = BaseSerializer.data
+
+
+def _timed_serializer_data(self):
+    metrics = get_current_metrics()
+    if metrics is None:
+        return _original_serializer_data.fget(self)
+    # Nested and list serializers go through here too; only time the outermost
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_serializer_data.fget(self)
+    finally:
+        metrics.serializer_depth -= 1
+        if not metrics.serializer_depth:
+            metrics.serializer_time += time.perf_counter() - started
+
+
+def install_serializer_timing():
+    if BaseSerializer.data is _original_serializer_data:
+        BaseSerializer.data = property(_timed_serializer_data)
+
+
+def _percentile(ordered, pct):
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class RouteStats:
+    """Rolling window of the most recent requests per route, in this process."""
+
+    def __init__(self, window=500):
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+
+    def add(self, route, duration_ms, queries, db_ms, serializer_ms, size):
+        with self._lock:
+            self._samples[route].append((duration_ms, queries, db_ms, serializer_ms, size))
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        with self._lock:
+            samples = {route: list(entries) for route, entries in self._samples.items()}
+
+        routes = {}
+        for route, entries in sorted(samples.items()):
+            durations = sorted(entry[0] for entry in entries)
+            count = len(entries)
+            routes[route] = {
+                'count': count,
+                'p50_ms': round(_percentile(durations, 50), 2),
+                'p95_ms': round(_percentile(durations, 95), 2),
+                'p99_ms': round(_percentile(durations, 99), 2),
+                'max_ms': round(durations[-1], 2),
+                'avg_queries': round(sum(entry[1] for entry in entries) / count, 1),
+                'max_queries': max(entry[1] for entry in entries),
+                'avg_db_ms': round(sum(entry[2] for entry in entries) / count, 2),
+                'avg_serializer_ms': round(sum(entry[3] for entry in entries) / count, 2),
+                'avg_response_bytes': round(sum(entry[4] for entry in entries) / count),
+            }
+        return {
+            'pid': os.getpid(),
+            'since': self.started,
+            'window': self.window,
+            'routes': routes,
+        }
+
+
+stats = RouteStats()
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    name = (match.view_name or match.route) if match else 'unresolved'
+    return f'{request.method} {name}'
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def request_stats(request):
+    """Rolling per-route latency and query stats for this worker process"""
+    return Response(stats.summary())
@@ -0,0 +1,258 @@
+"""Prometheus metrics shared across worker processes.
+
+Each process keeps its counters, histograms and gauges in memory and
+periodically writes them to its own ``metrics-<pid>-<boot id>.json`` file in
+``METRICS_DIR``. A scrape of ``/api/metrics`` sums every process's file, so
+all gunicorn workers are covered without an external service. Counters from
+exited workers keep counting towards the totals until the gunicorn master
+restarts and clears the directory (see gunicorn.conf.py); gauges only come
+from live processes.
+"""
+from collections import defaultdict
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+
+from users.permissions import IsAdminUser
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'incident_api_requests_total': ('counter', 'API requests by route, method and status code.'),
+    'incident_api_request_duration_seconds': ('histogram', 'API request latency by route and method.'),
+    'incident_api_db_queries_total': ('counter', 'Database queries issued while serving API requests.'),
+    'incident_analytics_cache_requests_total': ('counter', 'Analytics cache lookups by endpoint and result.'),
+    'incident_audit_queue_depth': ('gauge', 'Audit log entries waiting to be written.'),
+    'incident_audit_write_failures_total': ('counter', 'Failed attempts to write a batch of audit log entries.'),
+    'incident_audit_entries_dropped_total': ('counter', 'Audit log entries that could not be written.'),
+    'incident_evidence_uploads_total': ('counter', 'Evidence files uploaded.'),
+    'incident_evidence_upload_bytes_total': ('counter', 'Bytes of evidence uploaded.'),
+    'incident_evidence_deduplicated_total': ('counter', 'Evidence uploads stored as a reference to identical content.'),
+    'incident_incidents': ('gauge', 'Incidents by status.'),
+}
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class Registry:
+    """This process's metric values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        # Tells this process's file apart from one left by an earlier process with the same PID
+        self.boot = uuid.uuid4().hex[:12]
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.gauges = {}
+        self.last_flush = 0.0
+
+    def _check_pid(self):
+        # A forked worker starts from zero rather than the parent's values
+        if self.pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self._check_pid()
+            self.counters[_key(name, labels)] += amount
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            self._check_pid()
+            key = _key(name, labels)
+            if key not in self.histograms:
+                self.histograms[key] = [0] * len(DURATION_BUCKETS) + [0.0, 0]
+            values = self.histograms[key]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    values[i] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._check_pid()
+            self.gauges[_key(name, labels)] = value
+
+    def snapshot(self):
+        with self._lock:
+            self._check_pid()
+            return {
+                'pid': self.pid,
+                'boot': self.boot,
+                'written': time.time(),
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, dict(labels), values] for (name, labels), values in self.histograms.items()],
+                'gauges': [[name, dict(labels), value] for (name, labels), value in self.gauges.items()],
+            }
+
+
+registry = Registry()
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def record_request(route, method, status_code, duration, queries):
+    registry.inc('incident_api_requests_total', route=route, method=method, status=str(status_code))
+    registry.observe('incident_api_request_duration_seconds', duration, route=route, method=method)
+    registry.inc('incident_api_db_queries_total', queries, route=route, method=method)
+
+
+def record_cache(endpoint, hit):
+    registry.inc('incident_analytics_cache_requests_total', endpoint=endpoint, result='hit' if hit else 'miss')
+
+
+def flush(force=False):
+    """Write this process's values to its file, at most every METRICS_FLUSH_INTERVAL seconds."""
+    now = time.monotonic()
+    if not force and now - registry.last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    registry.last_flush = now
+
+    from incidents.audit import get_sink
+    registry.set('incident_audit_queue_depth', get_sink().qsize())
+
+    directory = str(settings.METRICS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    snapshot = registry.snapshot()
+    path = os.path.join(directory, f"metrics-{snapshot['pid']}-{snapshot['boot']}.json")
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(snapshot, handle)
+    os.replace(temporary, path)
+
+
+def clear():
+    """Remove every process's file, so counters start again from zero."""
+    for path in glob.glob(os.path.join(str(settings.METRICS_DIR), 'metrics-*.json*')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Sum every process's file into one (counters, histograms, gauges) view."""
+    flush(force=True)
+    counters = defaultdict(float)
+    histograms = {}
+    gauges = defaultdict(float)
+    # pid -> (written, gauges) of the newest file for each live PID
+    live = {}
+
+    for path in glob.glob(os.path.join(str(settings.METRICS_DIR), 'metrics-*.json')):
+        try:
+            with open(path) as handle:
+                snapshot = json.load(handle)
+        except (OSError, ValueError):
+            # Being replaced by its worker right now; it is picked up next scrape
+            continue
+        for name, labels, value in snapshot['counters']:
+            counters[_key(name, labels)] += value
+        for name, labels, values in snapshot['histograms']:
+            key = _key(name, labels)
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+            else:
+                histograms[key] = list(values)
+        pid, written = snapshot['pid'], snapshot.get('written', 0)
+        # Only the newest file for a PID can belong to the process using it now
+        if _alive(pid) and (pid not in live or written > live[pid][0]):
+            live[pid] = (written, snapshot['gauges'])
+
+    for _, snapshot_gauges in live.values():
+        for name, labels, value in snapshot_gauges:
+            gauges[_key(name, labels)] += value
+
+    from incidents.models import Incident
+    for row in Incident.objects.order_by().values('status').annotate(count=Count('id')):
+        gauges[_key('incident_incidents', {'status': row['status']})] = row['count']
+
+    return counters, histograms, gauges
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in items) + '}'
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render():
+    """The Prometheus text exposition format (version 0.0.4)."""
+    counters, histograms, gauges = collect()
+    values = defaultdict(list)
+    for (name, labels), value in sorted(counters.items()) + sorted(gauges.items()):
+        values[name].append(f'{name}{_labels(labels)} {_number(value)}')
+    for (name, labels), buckets in sorted(histograms.items()):
+        for bound, count in zip(DURATION_BUCKETS, buckets):
+            values[name].append(f'{name}_bucket{_labels(labels, le=bound)} {count}')
+        values[name].append(f'{name}_bucket{_labels(labels, le="+Inf")} {buckets[-1]}')
+        values[name].append(f'{name}_sum{_labels(labels)} {_number(buckets[-2])}')
+        values[name].append(f'{name}_count{_labels(labels)} {buckets[-1]}')
+
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(values.get(name, []))
+    return '\n'.join(lines) + '\n'
+
+
+class HasMetricsToken(permissions.BasePermission):
+    """Allows scrapers presenting ``Authorization: Token <METRICS_TOKEN>``."""
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        return bool(token) and constant_time_compare(header, f'Token {token}')
+
+
+@api_view(['GET'])
+@permission_classes([HasMetricsToken | IsAdminUser])
+@throttle_classes([])
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    if not settings.METRICS_ENABLED:
+        # Nothing is being recorded; an empty scrape would look like an idle server
+        raise Http404('Metrics are disabled')
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,31 +1,111 @@
-import threading
+from contextvars import ContextVar
+import re
+import time
+import uuid
 
-_thread_locals = threading.local()
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+# Per-request state. Context variables are isolated per thread and per
+# asyncio task, so concurrent requests under ASGI don't see each other's
+# user or IP the way they could with a thread-local.
+_request_context = ContextVar('request_context', default=None)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_valid_request_id = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestContext:
+    def __init__(self, request, ip, user_agent, request_id, audit):
+        self.request = request
+        self.ip = ip
+        self.user_agent = user_agent
+        self.request_id = request_id
+        self.audit = audit
+
+
+def get_current_request():
+    context = _request_context.get()
+    return context.request if context else None
 
 def get_current_user():
-    return getattr(_thread_locals, 'user', None)
+    # Read lazily: DRF authenticates inside the view, after this middleware
+    # has run, and sets the user on the underlying request
+    request = get_current_request()
+    return getattr(request, 'user', None)
 
 def get_current_ip():
-    return getattr(_thread_locals, 'ip', None)
+    context = _request_context.get()
+    return context.ip if context else None
+
+def get_current_user_agent():
+    context = _request_context.get()
+    return context.user_agent if context else ''
+
+def get_request_id():
+    context = _request_context.get()
+    return context.request_id if context else None
+
+def get_audit_collector():
+    context = _request_context.get()
+    return context.audit if context else None
 
 class AuditLogMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        _thread_locals.user = getattr(request, 'user', None)
-        _thread_locals.ip = self.get_client_ip(request)
-        
-        response = self.get_response(request)
-        
-        # Clean up
-        if hasattr(_thread_locals, 'user'):
-            del _thread_locals.user
-        if hasattr(_thread_locals, 'ip'):
-            del _thread_locals.ip
-            
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        context = self.bind(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            # Write the request's merged audit entries in one batch
+            try:
+                context.audit.flush()
+            finally:
+                _request_context.set(None)
+
+        response[REQUEST_ID_HEADER] = context.request_id
         return response
 
+    async def __acall__(self, request):
+        context = self.bind(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            try:
+                if context.audit.recorded:
+                    await sync_to_async(context.audit.flush)()
+            finally:
+                _request_context.set(None)
+
+        response[REQUEST_ID_HEADER] = context.request_id
+        return response
+
+    def bind(self, request):
+        from incidents.audit import AuditCollector
+
+        request_id = request.META.get('HTTP_X_REQUEST_ID', '')
+        if not _valid_request_id.match(request_id):
+            request_id = uuid.uuid4().hex
+        context = RequestContext(
+            request=request,
+            ip=self.get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            request_id=request_id,
+            audit=AuditCollector(),
+        )
+        _request_context.set(context)
+        return context
+
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
@@ -33,3 +113,121 @@ class AuditLogMiddleware:
         else:
             ip = request.META.get('REMOTE_ADDR')
         return ip
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that can sit in an async middleware chain.
+
+    WhiteNoise 6 is sync-only, which makes Django run every request below it
+    in a worker thread under ASGI. Finding a static file is a dict lookup
+    (a stat with autorefresh in development) and serving one only builds the
+    response, so the async path does both inline.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class InstrumentationMiddleware:
+    """Per-request timing and query counting.
+
+    Feeds the Server-Timing header, per-route stats and budget logging when
+    INSTRUMENTATION_ENABLED is set, and the Prometheus metrics when
+    METRICS_ENABLED is set.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        from django.conf import settings
+        from django.core.exceptions import MiddlewareNotUsed
+        from . import instrumentation
+
+        self.instrumentation_enabled = settings.INSTRUMENTATION_ENABLED
+        self.metrics_enabled = settings.METRICS_ENABLED
+        if not (self.instrumentation_enabled or self.metrics_enabled):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.query_budget = settings.INSTRUMENTATION_QUERY_BUDGET
+        self.latency_budget = settings.INSTRUMENTATION_LATENCY_BUDGET_MS
+        instrumentation.install_query_timing()
+        if self.instrumentation_enabled:
+            instrumentation.install_serializer_timing()
+
+    def __call__(self, request):
+        from . import instrumentation
+
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = instrumentation.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.finish()
+        return self.process(request, response, metrics)
+
+    async def __acall__(self, request):
+        from . import instrumentation
+
+        metrics = instrumentation.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.finish()
+        return self.process(request, response, metrics)
+
+    def process(self, request, response, metrics):
+        from . import instrumentation, metrics as api_metrics
+
+        duration_ms = (time.perf_counter() - metrics.started) * 1000
+
+        if self.metrics_enabled:
+            match = getattr(request, 'resolver_match', None)
+            api_metrics.record_request(
+                match.view_name if match else 'unresolved', request.method,
+                response.status_code, duration_ms / 1000, metrics.queries,
+            )
+            api_metrics.flush()
+
+        if not self.instrumentation_enabled:
+            return response
+
+        db_ms = metrics.db_time * 1000
+        serializer_ms = metrics.serializer_time * 1000
+        size = 0 if response.streaming else len(response.content)
+        route = instrumentation.route_name(request)
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={duration_ms:.1f}',
+            f'db;dur={db_ms:.1f};desc="{metrics.queries} queries"',
+            f'serialize;dur={serializer_ms:.1f}',
+        ])
+        instrumentation.stats.add(route, duration_ms, metrics.queries, db_ms, serializer_ms, size)
+
+        if metrics.queries > self.query_budget or duration_ms > self.latency_budget:
+            instrumentation.logger.warning(
+                'Request over budget: %s %s took %.1f ms with %d queries (%.1f ms in DB, %.1f ms serializing, %d bytes)',
+                route, request.get_full_path(), duration_ms, metrics.queries, db_ms, serializer_ms, size,
+            )
+        return response
@@ -11,10 +11,11 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Choices, config
 import dj_database_url
 import os
 import sys
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -57,8 +58,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'incident_system.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'incident_system.middleware.StaticFilesMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'incident_system.middleware.AuditLogMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -95,12 +97,54 @@ WSGI_APPLICATION = 'incident_system.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
-        conn_max_age=600,
+        conn_max_age=config('DB_CONN_MAX_AGE', default=600, cast=int),
         conn_health_checks=True,
     )
 }
 
 
+# Cache
+# 'default' holds per-process data such as throttle histories. 'shared' is
+# seen by every worker on the host: incident data versions, which ETags and
+# streams compare, and the analytics and dashboard payloads keyed by them.
+# 'file' needs no external service, 'database' needs `manage.py createcachetable`,
+# 'locmem' is per-process.
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+if 'test' in sys.argv:
+    CACHE_BACKEND = 'locmem'
+
+# Entries keyed by an old version are abandoned rather than deleted, and
+# culled once the cache holds this many
+CACHE_OPTIONS = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=1000, cast=int)}
+
+CACHE_BACKENDS = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+        'OPTIONS': CACHE_OPTIONS,
+    },
+    'database': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': config('CACHE_LOCATION', default='django_cache'),
+        'OPTIONS': CACHE_OPTIONS,
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': CACHE_BACKENDS[CACHE_BACKEND],
+}
+
+# Cached incident aggregates are invalidated by a version bump whenever an
+# incident changes; the timeout only bounds staleness if a bump is lost.
+INCIDENT_CACHE_TIMEOUT = config('INCIDENT_CACHE_TIMEOUT', default=3600, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -174,8 +218,8 @@ REST_FRAMEWORK = {
         'rest_framework.throttling.UserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/minute',
-        'user': '1000/day'
+        'anon': config('THROTTLE_ANON_RATE', default='100/minute'),
+        'user': config('THROTTLE_USER_RATE', default='1000/day')
     },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
@@ -231,6 +275,68 @@ SIMPLE_JWT = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Audit log writer: 'buffered' inserts on a background thread in batches,
+# 'sync' writes at the end of each request
+AUDIT_LOG_SINK = config('AUDIT_LOG_SINK', default='buffered')
+AUDIT_LOG_BATCH_SIZE = config('AUDIT_LOG_BATCH_SIZE', default=100, cast=int)
+AUDIT_LOG_FLUSH_INTERVAL = config('AUDIT_LOG_FLUSH_INTERVAL', default=1.0, cast=float)
+if 'test' in sys.argv:
+    AUDIT_LOG_SINK = 'sync'
+
+# Background tasks (export jobs) run on a small per-process thread pool;
+# the test run executes them inline
+BACKGROUND_TASK_WORKERS = config('BACKGROUND_TASK_WORKERS', default=2, cast=int)
+BACKGROUND_TASKS_SYNC = config('BACKGROUND_TASKS_SYNC', default='test' in sys.argv, cast=bool)
+# Jobs still pending or running after this many seconds were lost with their
+# worker process and are marked failed
+EXPORT_JOB_TIMEOUT = config('EXPORT_JOB_TIMEOUT', default=3600, cast=int)
+
+# Request instrumentation (Server-Timing header, /api/instrumentation/stats/
+# and logging of requests over budget); off unless enabled
+INSTRUMENTATION_ENABLED = config('INSTRUMENTATION_ENABLED', default=False, cast=bool)
+INSTRUMENTATION_QUERY_BUDGET = config('INSTRUMENTATION_QUERY_BUDGET', default=30, cast=int)
+INSTRUMENTATION_LATENCY_BUDGET_MS = config('INSTRUMENTATION_LATENCY_BUDGET_MS', default=500, cast=float)
+
+# Live incident stream (/api/incidents/stream/). Streams close after the
+# timeout and EventSource reconnects; under WSGI they are kept short because
+# each one holds a sync worker. Clients open it with a ticket from
+# /api/incidents/stream/ticket/, valid for EVENTS_TICKET_MAX_AGE seconds
+EVENTS_HEARTBEAT_INTERVAL = config('EVENTS_HEARTBEAT_INTERVAL', default=15.0, cast=float)
+EVENTS_STREAM_TIMEOUT = config('EVENTS_STREAM_TIMEOUT', default=1800, cast=float)
+EVENTS_WSGI_STREAM_TIMEOUT = config('EVENTS_WSGI_STREAM_TIMEOUT', default=25, cast=float)
+EVENTS_TICKET_MAX_AGE = config('EVENTS_TICKET_MAX_AGE', default=60, cast=int)
+
+# Delta sync (/api/incidents/sync/). Rows are returned in pages; each caught-up
+# sync re-reads the last SYNC_OVERLAP_SECONDS so slow transactions are not
+# missed. Tokens older than the tombstone retention force a full resync
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)
+SYNC_OVERLAP_SECONDS = config('SYNC_OVERLAP_SECONDS', default=30, cast=int)
+SYNC_TOMBSTONE_RETENTION_DAYS = config('SYNC_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+# Prometheus metrics at /api/metrics, summed across workers through per-process
+# files in METRICS_DIR. Off unless enabled, since every request is then timed
+# and counted; turn it on where Prometheus scrapes. Scrapers authenticate with
+# "Authorization: Token <METRICS_TOKEN>"; admins can also read it with their JWT
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default=str(BASE_DIR / '.metrics'))
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+if 'test' in sys.argv:
+    METRICS_DIR = os.path.join(tempfile.gettempdir(), f'incident-metrics-{os.getpid()}')
+
 # File Upload Settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
+# Uploads are spooled to a temporary file and hashed chunk by chunk instead of
+# being held in memory
+FILE_UPLOAD_HANDLERS = ['incidents.uploads.HashingFileUploadHandler']
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760
+EVIDENCE_MAX_UPLOAD_SIZE = 10485760  # 10MB
+EVIDENCE_THUMBNAIL_SIZE = config('EVIDENCE_THUMBNAIL_SIZE', default=320, cast=int)
+
+# Evidence is served by /api/evidence/<id>/file/, never straight from MEDIA_URL.
+# Serializers hand out signed URLs valid for EVIDENCE_URL_LIFETIME seconds.
+# EVIDENCE_SENDFILE leaves the file body to the front server: 'x-accel-redirect'
+# for nginx, with an internal location at EVIDENCE_ACCEL_REDIRECT_PREFIX aliased
+# to MEDIA_ROOT, or 'x-sendfile' for Apache and lighttpd
+EVIDENCE_URL_LIFETIME = config('EVIDENCE_URL_LIFETIME', default=86400, cast=int)
+EVIDENCE_SENDFILE = config('EVIDENCE_SENDFILE', default='', cast=Choices(['', 'x-accel-redirect', 'x-sendfile']))
+EVIDENCE_ACCEL_REDIRECT_PREFIX = config('EVIDENCE_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
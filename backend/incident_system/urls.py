@@ -20,6 +20,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView
 from users.views import CustomTokenObtainPairView, LogoutView
+from incident_system.instrumentation import request_stats
+from incident_system.metrics import metrics_view
 
 from django.views.generic import TemplateView
 
@@ -28,18 +30,18 @@ urlpatterns = [
     path('api/auth/login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/auth/logout/', LogoutView.as_view(), name='token_logout'),
+    path('api/instrumentation/stats/', request_stats, name='request-stats'),
+    path('api/metrics', metrics_view, name='metrics'),
     path('api/users/', include('users.urls')),
     path('api/', include('incidents.urls')),
     path('', TemplateView.as_view(template_name='index.html')),
     # Catch-all route for SPA routing - must be last and exclude static assets
-    re_path(r'^(?!assets/)(?!static/).*$', TemplateView.as_view(template_name='index.html')),
+    re_path(r'^(?!assets/)(?!static/)(?!media/).*$', TemplateView.as_view(template_name='index.html')),
 ]
 
-# Serve static files in production (WhiteNoise handles this automatically)
-# But we still need to configure media files
+# Static files are served by WhiteNoise. Media is only served directly by the
+# development server: in production evidence goes through the permission-checked
+# /api/evidence/ views, and static() serves nothing anyway when DEBUG is off
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-else:
-    # In production, also serve media files
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
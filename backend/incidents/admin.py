@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Incident, IncidentNote, Evidence, AuditLog, PublicReport
+from .models import Incident, IncidentNote, Evidence, EvidenceBlob, AuditLog, PublicReport, ReferenceSequence, ExportJob, Tombstone
 
 @admin.register(Incident)
 class IncidentAdmin(admin.ModelAdmin):
@@ -32,14 +32,21 @@ class IncidentNoteAdmin(admin.ModelAdmin):
     list_display = ['incident', 'user', 'created_at']
     list_filter = ['created_at']
     search_fields = ['incident__reference_number', 'note']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'updated_at']
 
 @admin.register(Evidence)
 class EvidenceAdmin(admin.ModelAdmin):
     list_display = ['incident', 'file_type', 'file_size', 'uploaded_by', 'uploaded_at']
     list_filter = ['file_type', 'uploaded_at']
     search_fields = ['incident__reference_number', 'description']
-    readonly_fields = ['uploaded_at', 'file_size', 'file_type']
+    readonly_fields = ['uploaded_at', 'updated_at', 'file_size', 'file_type']
+
+@admin.register(EvidenceBlob)
+class EvidenceBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'content_type', 'size', 'ref_count', 'created_at']
+    list_filter = ['content_type']
+    search_fields = ['sha256']
+    readonly_fields = ['sha256', 'file', 'thumbnail', 'content_type', 'size', 'ref_count', 'created_at']
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
@@ -55,3 +62,20 @@ class PublicReportAdmin(admin.ModelAdmin):
     list_filter = ['status', 'incident_type', 'is_anonymous', 'created_at']
     search_fields = ['reference_number', 'description']
     readonly_fields = ['reference_number', 'created_at']
+
+@admin.register(ReferenceSequence)
+class ReferenceSequenceAdmin(admin.ModelAdmin):
+    list_display = ['prefix', 'year', 'last_value']
+    list_filter = ['prefix', 'year']
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_by', 'format', 'compress', 'status', 'row_count', 'created_at', 'finished_at']
+    list_filter = ['status', 'format', 'created_at']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'row_count', 'error']
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ['entity_type', 'entity_id', 'incident_id', 'user', 'deleted_at']
+    list_filter = ['entity_type', 'deleted_at']
+    readonly_fields = ['deleted_at']
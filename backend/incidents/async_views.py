@@ -0,0 +1,317 @@
+"""Async versions of the read-heavy incident endpoints.
+
+DRF 3.14 views are synchronous, so under ASGI each DRF request occupies a
+worker thread for its whole duration. The dashboard, analytics, "my
+incidents" and public status endpoints are polled constantly, so they are
+plain Django async views instead: they authenticate, check permissions and
+throttles, and render exactly like the DRF views they replace, but wait on
+the cache and the database through the async ORM. They also work under
+WSGI, where Django runs them in an event loop per request.
+"""
+from functools import wraps
+import asyncio
+import queue
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q, Count
+from django.http import StreamingHttpResponse
+from rest_framework import exceptions, permissions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from analytics import rollups
+from incident_system import metrics
+from users.permissions import IsSupervisorUser
+from . import cache as incident_cache
+from . import events
+from .conditional import make_etag, not_modified, set_etag
+from .models import Incident, PublicReport
+from .serializers import IncidentListSerializer, PublicReportStatusSerializer
+from .views import compute_analytics, with_related_counts
+
+User = get_user_model()
+
+
+def render(data, status=200, headers=None):
+    """A DRF Response rendered as JSON, so clients and tests see the same body."""
+    response = Response(data, status=status, headers=headers)
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = 'application/json'
+    response.renderer_context = {}
+    return response
+
+
+def error(exc):
+    headers = {}
+    if getattr(exc, 'auth_header', None):
+        headers['WWW-Authenticate'] = exc.auth_header
+    if getattr(exc, 'wait', None):
+        headers['Retry-After'] = str(int(exc.wait))
+    detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+    return render(detail, status=exc.status_code, headers=headers)
+
+
+async def authenticate(request, ticket_param=None):
+    """The JWT user for ``request``, or None, without blocking the event loop.
+
+    With ``ticket_param`` a stream ticket (see events.issue_ticket) may be
+    passed in that query parameter instead, for clients such as EventSource
+    that cannot set headers.
+    """
+    # APIClient.force_authenticate in tests, as DRF's Request honours it
+    forced = getattr(request, '_force_auth_user', None)
+    if forced is not None:
+        return forced
+
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    if header is None and ticket_param and request.GET.get(ticket_param):
+        user_id = events.ticket_user_id(request.GET[ticket_param])
+        user = user_id and await User.objects.filter(pk=user_id, is_active=True).afirst()
+        if not user:
+            raise exceptions.AuthenticationFailed('Stream ticket is invalid or has expired')
+        return user
+    if header is None:
+        return None
+    raw_token = authenticator.get_raw_token(header)
+    if raw_token is None:
+        return None
+    token = authenticator.get_validated_token(raw_token)
+    # get_user() does a synchronous lookup; run it as one ORM call
+    return await sync_to_async(authenticator.get_user)(token)
+
+
+def check_throttles(request):
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            raise exceptions.Throttled(throttle.wait())
+
+
+def async_api_view(permission_class=permissions.IsAuthenticated, ticket_param=None):
+    """Wrap an async GET view with DRF-style authentication, permissions and throttling."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                response = error(exceptions.MethodNotAllowed(request.method))
+                response['Allow'] = 'GET, HEAD'
+                return response
+            try:
+                request.user = await authenticate(request, ticket_param) or AnonymousUser()
+                if not permission_class().has_permission(request, None):
+                    if not request.user.is_authenticated:
+                        raise exceptions.NotAuthenticated()
+                    raise exceptions.PermissionDenied()
+                await sync_to_async(check_throttles)(request)
+            except (exceptions.NotAuthenticated, exceptions.AuthenticationFailed) as exc:
+                exc.auth_header = JWTAuthentication().authenticate_header(request)
+                return error(exc)
+            except exceptions.APIException as exc:
+                return error(exc)
+            return await view(request, *args, **kwargs)
+        return wrapped
+    return decorator
+
+
+@async_api_view()
+async def my_incidents(request):
+    """Get incidents assigned to current user"""
+    incidents = with_related_counts(
+        Incident.objects.filter(assigned_to=request.user)
+    ).select_related('reported_by', 'assigned_to')
+    # Load the rows asynchronously; serializing them needs no further queries
+    serializer = IncidentListSerializer([incident async for incident in incidents], many=True)
+    return render(serializer.data)
+
+
+@async_api_view(IsSupervisorUser)
+async def advanced_analytics(request):
+    """Get detailed analytics for security analysis"""
+    # Supervisors and above share one entry; each guard gets their own
+    cache_key = await incident_cache.ascoped_key('advanced_analytics', request.user)
+    cached_data = await incident_cache.cache.aget(cache_key)
+    metrics.record_cache('advanced_analytics', cached_data is not None)
+
+    if cached_data is not None:
+        return render(cached_data)
+
+    user = request.user
+    if user.role in ['supervisor', 'head', 'admin']:
+        # The global view is answered from the incrementally maintained rollups
+        result = await sync_to_async(rollups.advanced_analytics)()
+    else:
+        incidents = Incident.objects.filter(Q(assigned_to=user) | Q(reported_by=user))
+        result = await sync_to_async(compute_analytics)(incidents)
+
+    # Invalidated by the incidents version bump rather than a short TTL
+    await incident_cache.cache.aset(cache_key, result, settings.INCIDENT_CACHE_TIMEOUT)
+    return render(result)
+
+
+@async_api_view(IsSupervisorUser)
+async def dashboard_stats(request):
+    """Get dashboard statistics"""
+    user = request.user
+    cache_key = await incident_cache.ascoped_key('dashboard_stats', user)
+    # The key already names the data version, so it doubles as the ETag
+    etag = make_etag(cache_key)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    stats = await incident_cache.cache.aget(cache_key)
+    metrics.record_cache('dashboard_stats', stats is not None)
+    if stats is not None:
+        return set_etag(render(stats), etag)
+
+    if user.role in ['supervisor', 'head', 'admin']:
+        incidents = Incident.objects.all()
+    else:
+        incidents = Incident.objects.filter(Q(assigned_to=user) | Q(reported_by=user))
+
+    # One conditional aggregate for the totals, one grouped query for the breakdowns
+    stats = await incidents.aaggregate(
+        total=Count('id'),
+        **{
+            name: Count('id', filter=Q(status=name))
+            for name in ['pending', 'assigned', 'in_progress', 'resolved']
+        }
+    )
+    by_type, by_severity = {}, {}
+    grouped = incidents.order_by().values('incident_type', 'severity').annotate(count=Count('id'))
+    async for row in grouped:
+        by_type[row['incident_type']] = by_type.get(row['incident_type'], 0) + row['count']
+        by_severity[row['severity']] = by_severity.get(row['severity'], 0) + row['count']
+    stats['by_type'] = by_type
+    stats['by_severity'] = by_severity
+
+    await incident_cache.cache.aset(cache_key, stats, settings.INCIDENT_CACHE_TIMEOUT)
+    return set_etag(render(stats), etag)
+
+
+@async_api_view(permissions.AllowAny)
+async def public_report_status(request, reference_number):
+    """Check status of public report"""
+    try:
+        report = await PublicReport.objects.select_related('incident').aget(reference_number=reference_number)
+    except PublicReport.DoesNotExist:
+        return render({'error': 'Report not found'}, status=404)
+    incident = report.incident
+    etag = make_etag(
+        'public_report', report.reference_number, report.status,
+        incident and incident.reference_number, incident and incident.status,
+    )
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    serializer = PublicReportStatusSerializer(report)
+    return set_etag(render(serializer.data), etag)
+
+
+# Tells EventSource how long to wait before reconnecting, in milliseconds
+STREAM_RETRY_MS = 3000
+
+
+async def stream_async(request, subscriber, timeout):
+    """Long-lived event stream for ASGI servers."""
+    deadline = time.monotonic() + timeout
+    version = await incident_cache.aget_version()
+    try:
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        if 'HTTP_LAST_EVENT_ID' in request.META:
+            # Reconnected: whatever happened in between was missed
+            yield events.format_sync()
+        while time.monotonic() < deadline:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), settings.EVENTS_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                event = None
+            if subscriber.overflowed:
+                subscriber.drain()
+                version = await incident_cache.aget_version()
+                yield events.format_sync()
+            elif event is not None:
+                # The change behind this event already bumped the version
+                version = await incident_cache.aget_version()
+                yield events.format_event(event)
+            else:
+                current = await incident_cache.aget_version()
+                if current != version:
+                    # Changed through another worker process
+                    version = current
+                    yield events.format_sync()
+                else:
+                    yield ': heartbeat\n\n'
+    finally:
+        events.bus.unsubscribe(subscriber)
+
+
+def stream_sync(request, subscriber, timeout):
+    """WSGI fallback: the same stream, ended after ``timeout`` seconds so it
+    only holds a sync worker briefly; EventSource then reconnects."""
+    deadline = time.monotonic() + timeout
+    version = incident_cache.get_version()
+    try:
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        if 'HTTP_LAST_EVENT_ID' in request.META:
+            yield events.format_sync()
+        while time.monotonic() < deadline:
+            wait = min(settings.EVENTS_HEARTBEAT_INTERVAL, max(deadline - time.monotonic(), 0))
+            try:
+                event = subscriber.queue.get(timeout=wait)
+            except queue.Empty:
+                event = None
+            if subscriber.overflowed:
+                subscriber.drain()
+                version = incident_cache.get_version()
+                yield events.format_sync()
+            elif event is not None:
+                version = incident_cache.get_version()
+                yield events.format_event(event)
+            else:
+                current = incident_cache.get_version()
+                if current != version:
+                    version = current
+                    yield events.format_sync()
+                else:
+                    yield ': heartbeat\n\n'
+    finally:
+        events.bus.unsubscribe(subscriber)
+
+
+@async_api_view()
+async def stream_ticket(request):
+    """Issue a ticket for opening the incident stream"""
+    response = render({
+        'ticket': events.issue_ticket(request.user),
+        'expires_in': settings.EVENTS_TICKET_MAX_AGE,
+        # Under WSGI every open stream holds a sync worker, so browsers
+        # should not connect at all
+        'streaming': isinstance(request, ASGIRequest),
+    })
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@async_api_view(ticket_param='ticket')
+async def incident_stream(request):
+    """Server-sent events for incident changes the user may see"""
+    if isinstance(request, ASGIRequest):
+        subscriber = events.bus.subscribe(request.user, asyncio.get_running_loop())
+        content = stream_async(request, subscriber, settings.EVENTS_STREAM_TIMEOUT)
+    else:
+        # Under WSGI this coroutine's loop ends when the view returns
+        subscriber = events.bus.subscribe(request.user)
+        content = stream_sync(request, subscriber, settings.EVENTS_WSGI_STREAM_TIMEOUT)
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
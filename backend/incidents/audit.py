@@ -0,0 +1,293 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from incident_system import metrics
+from incident_system.middleware import get_audit_collector, get_current_ip, get_current_user_agent
+
+logger = logging.getLogger(__name__)
+
+# Actions recorded by the save/delete signals. An explicit action recorded by
+# a view for the same entity (assign, status_change, ...) takes precedence.
+GENERIC_ACTIONS = ('create', 'update')
+
+
+class _Committed:
+    """on_commit callback marking that an entry's transaction committed."""
+    committed = False
+
+    def __call__(self):
+        self.committed = True
+
+
+class AuditCollector:
+    """Accumulates audit entries for one request and writes them once.
+
+    Entries for the same entity are merged, so a view that saves an incident
+    twice and also records its own action still produces a single AuditLog
+    row with the combined field changes. Entries recorded inside an atomic
+    block that rolls back are dropped, as the inline rows they replace were.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.aliases = {}
+        self.recorded = []
+
+    def collect(self, entry, primary, covers=()):
+        """Keep an entry until flush, tied to the transaction it was recorded in."""
+        marker = _Committed()
+        # Run at once in autocommit; discarded if the enclosing savepoint rolls back
+        transaction.on_commit(marker)
+        self.recorded.append((entry, primary, covers, marker))
+
+    def add(self, entry, primary, covers=()):
+        key = (entry['entity_type'], entry['entity_id'])
+        if entry['entity_id'] is None:
+            # Nothing to merge on; keep it as its own row
+            key = (entry['entity_type'], object())
+        key = self.aliases.get(key, key)
+
+        existing = self.entries.get(key)
+        if existing is None:
+            entry['primary'] = primary
+            self.entries[key] = existing = entry
+        else:
+            self._merge(existing, entry, primary)
+
+        # Entities created as part of this operation (e.g. the note added by
+        # close) are folded into this row instead of getting their own.
+        for covered in covers:
+            self.aliases[covered] = key
+            covered_entry = self.entries.pop(covered, None)
+            if covered_entry is not None:
+                self._merge(existing, covered_entry, covered_entry.pop('primary'))
+
+    def _merge(self, existing, entry, primary):
+        for field in ('user', 'ip_address', 'user_agent'):
+            if not existing[field] and entry[field]:
+                existing[field] = entry[field]
+
+        if entry['entity_type'] != existing['entity_type']:
+            # A covered entity only contributes attribution, not its diff
+            return
+
+        if entry['changes']:
+            merged = existing['changes'] or {}
+            for name, change in entry['changes'].items():
+                if name in merged:
+                    change = {'old': merged[name]['old'], 'new': change['new']}
+                if change['old'] == change['new']:
+                    merged.pop(name, None)
+                else:
+                    merged[name] = change
+            existing['changes'] = merged or None
+
+        if primary:
+            if not existing['primary'] or existing['action'] in GENERIC_ACTIONS:
+                existing['action'] = entry['action']
+                existing['description'] = entry['description']
+            existing['primary'] = True
+        elif not existing['primary']:
+            if existing['action'] != 'create':
+                existing['action'] = entry['action']
+            existing['description'] = entry['description']
+
+    def flush(self):
+        from .models import AuditLog
+
+        # Callbacks still queued belong to a transaction that is yet to commit
+        pending = {callback for _, callback, _ in connection.run_on_commit}
+        recorded, self.recorded = self.recorded, []
+        for entry, primary, covers, marker in recorded:
+            if marker.committed or marker in pending:
+                self.add(entry, primary, covers)
+
+        entries, self.entries, self.aliases = list(self.entries.values()), {}, {}
+        if not entries:
+            return []
+        logs = []
+        for entry in entries:
+            entry.pop('primary')
+            logs.append(AuditLog(**entry))
+        get_sink().write(logs)
+        return logs
+
+
+class SyncAuditSink:
+    """Writes audit rows inline, in the caller's transaction."""
+
+    def write(self, logs):
+        from .models import AuditLog
+
+        AuditLog.objects.bulk_create(logs)
+
+    def qsize(self):
+        return 0
+
+    def shutdown(self, timeout=None):
+        pass
+
+
+class BufferedAuditSink:
+    """Queues audit rows and inserts them from a background thread.
+
+    Rows are written with one bulk_create per batch, either when
+    ``batch_size`` rows are waiting or ``flush_interval`` seconds after the
+    first of them arrived. A failed batch is retried after each of
+    ``retry_delays`` seconds, then written row by row so only rows that
+    cannot be inserted are lost, and those are logged in full.
+    ``shutdown()`` (also registered with atexit) drains the queue before the
+    process exits.
+    """
+    _STOP = object()
+
+    def __init__(self, batch_size=100, flush_interval=1.0, retry_delays=(0.1, 0.5, 2.0)):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delays = retry_delays
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def write(self, logs):
+        self._ensure_thread()
+        for log in logs:
+            self.queue.put(log)
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def _ensure_thread(self):
+        with self.lock:
+            # A forked worker inherits the object but not the thread
+            if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is self._STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+        connection.close()
+
+    def _write_batch(self, batch):
+        from .models import AuditLog
+
+        for delay in (*self.retry_delays, None):
+            close_old_connections()
+            try:
+                AuditLog.objects.bulk_create(batch)
+                return
+            except Exception:
+                metrics.inc('incident_audit_write_failures_total')
+                if delay is None:
+                    logger.exception('Failed to write %d audit log entries; writing them one by one', len(batch))
+                    break
+                logger.warning('Failed to write %d audit log entries; retrying in %ss', len(batch), delay, exc_info=True)
+                # A broken connection is replaced on the next attempt
+                connection.close()
+                time.sleep(delay)
+
+        for log in batch:
+            try:
+                AuditLog.objects.bulk_create([log])
+            except Exception:
+                metrics.inc('incident_audit_entries_dropped_total')
+                logger.exception(
+                    'Dropped audit log entry: %s %s %s at %s: %s', log.action, log.entity_type,
+                    log.entity_id, log.created_at.isoformat(), log.description
+                )
+
+    def shutdown(self, timeout=10):
+        """Flush everything queued so far and stop the writer thread."""
+        with self.lock:
+            thread = self.thread
+            if thread is None or not thread.is_alive() or self.pid != os.getpid():
+                return
+            self.queue.put(self._STOP)
+            self.thread = None
+        thread.join(timeout)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    """Return the process-wide sink configured by ``AUDIT_LOG_SINK``."""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                if getattr(settings, 'AUDIT_LOG_SINK', 'sync') == 'buffered':
+                    _sink = BufferedAuditSink(
+                        batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+                        flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL,
+                    )
+                else:
+                    _sink = SyncAuditSink()
+    return _sink
+
+
+@atexit.register
+def shutdown_sink():
+    if _sink is not None:
+        _sink.shutdown()
+
+
+def record(action, entity_type, description, entity_id=None, user=None,
+           changes=None, ip_address=None, user_agent='', primary=True, covers=()):
+    """Record an audit entry.
+
+    Inside a request the entry is merged into the request's collector and
+    written when the request finishes, unless the atomic block it was
+    recorded in rolled back; elsewhere (shell, management commands)
+    it is written immediately, and the IP address and user agent default to
+    the request's. Signals pass ``primary=False`` so that the
+    view's own description and action win when both describe the same entity.
+    ``covers`` lists ``(entity_type, entity_id)`` pairs created by the same
+    operation whose own entries should be folded into this one.
+    """
+    from .models import AuditLog
+
+    entry = {
+        'user': user if user and not user.is_anonymous else None,
+        'action': action,
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'description': description,
+        'changes': changes or None,
+        'ip_address': ip_address or get_current_ip(),
+        'user_agent': user_agent or get_current_user_agent(),
+        # When it happened, not when the request or the background writer flushes it
+        'created_at': timezone.now(),
+    }
+    collector = get_audit_collector()
+    if collector is None:
+        return AuditLog.objects.create(**entry)
+    collector.collect(entry, primary, covers)
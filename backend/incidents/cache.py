@@ -0,0 +1,65 @@
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+
+# Versions and the aggregates keyed by them must agree across workers
+cache = ConnectionProxy(caches, 'shared')
+
+VERSION_KEY = 'incidents:version'
+# Notes and evidence; kept apart so new notes leave cached aggregates alone
+ACTIVITY_VERSION_KEY = 'incidents:activity-version'
+
+
+def new_version():
+    # Random rather than a counter: a key lost to culling or a cache restart
+    # must not come back as a version that old entries and ETags were built on,
+    # and concurrent bumps each still change it where incr() could lose one
+    return uuid.uuid4().hex
+
+
+def get_version(key=VERSION_KEY):
+    """Current incidents data version, changed whenever an incident changes."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key=VERSION_KEY):
+    cache.set(key, new_version(), None)
+
+
+def invalidate():
+    """Invalidate cached incident aggregates once the current transaction commits."""
+    transaction.on_commit(bump_version)
+
+
+def invalidate_activity():
+    """Mark incident notes or evidence as changed once the current transaction commits."""
+    transaction.on_commit(lambda: bump_version(ACTIVITY_VERSION_KEY))
+
+
+def scope_for(user):
+    """Supervisors and above share one view of the data; guards only see their own."""
+    if user.role in ['supervisor', 'head', 'admin']:
+        return 'global'
+    return f'user:{user.id}'
+
+
+def scoped_key(name, user):
+    return f'{name}:{scope_for(user)}:v{get_version()}'
+
+
+async def aget_version(key=VERSION_KEY):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, new_version(), None)
+        version = await cache.aget(key)
+    return version
+
+
+async def ascoped_key(name, user):
+    return f'{name}:{scope_for(user)}:v{await aget_version()}'
@@ -0,0 +1,34 @@
+"""Conditional GET for the endpoints clients poll.
+
+Each view derives an ETag from cheap inputs, such as the incidents version
+counters in ``cache`` or a row's updated_at, and answers 304 Not Modified
+before running the serializer when the client's copy is still current.
+
+No Last-Modified is sent: max(updated_at) does not move when a row is
+deleted or leaves the user's scope, or when a note is added, so
+If-Modified-Since on its own would return stale 304s.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+def set_etag(response, etag):
+    response['ETag'] = etag
+    # Let browsers keep the body but revalidate it on every request
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def not_modified(request, etag):
+    """A 304 response if the client already has this representation, else None."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_etag(response, etag)
+    return response
@@ -0,0 +1,168 @@
+"""Evidence downloads.
+
+Evidence is served by a permission-checked view rather than from the media
+URL. Serializers hand out signed URLs, so <img> tags and PDF viewers can
+fetch files without an Authorization header. The view answers conditional
+and Range requests itself. With EVIDENCE_SENDFILE set, the body is left to
+the front server through X-Accel-Redirect or X-Sendfile. Otherwise
+FileResponse streams it, which gunicorn sends with sendfile().
+"""
+from urllib.parse import quote, urlencode
+import mimetypes
+import re
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import content_disposition_header, parse_etags, quote_etag
+
+from .conditional import make_etag
+
+SALT = 'incidents.evidence-download'
+# Signed URLs stay the same for this long, so browsers can reuse cached files
+URL_WINDOW = 3600
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _signature(pk, variant, expires):
+    return signing.Signer(salt=SALT).signature(f'{pk}:{variant}:{expires}')
+
+
+def url_window():
+    """The window signed URLs issued now belong to; responses carrying them are cached per window."""
+    return int(time.time()) // URL_WINDOW
+
+
+def signed_url(evidence, variant, request=None):
+    """A URL for ``variant`` ('file' or 'thumbnail') that works without credentials until it expires."""
+    expires = (url_window() + 1) * URL_WINDOW + settings.EVIDENCE_URL_LIFETIME
+    query = urlencode({'expires': expires, 'signature': _signature(evidence.pk, variant, expires)})
+    url = f"{reverse(f'evidence-{variant}', args=[evidence.pk])}?{query}"
+    return request.build_absolute_uri(url) if request else url
+
+
+def has_valid_signature(request, pk, variant):
+    try:
+        expires = int(request.GET.get('expires', ''))
+    except ValueError:
+        return False
+    signature = request.GET.get('signature', '')
+    return expires >= time.time() and constant_time_compare(signature, _signature(pk, variant, expires))
+
+
+def parse_range(header, size):
+    """The inclusive (start, end) of a single byte range, or None to send the whole file.
+
+    Multiple ranges are answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = int(last) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable
+    return start, min(end, size - 1)
+
+
+class RangeFile:
+    """``length`` bytes of ``file`` from ``start``, read like a file by FileResponse."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def serve(request, evidence, variant):
+    """The response for one evidence file or its thumbnail."""
+    blob = evidence.blob
+    if variant == 'thumbnail':
+        if blob is None or not blob.thumbnail:
+            raise Http404('No thumbnail')
+        field, content_type, etag = blob.thumbnail, 'image/jpeg', quote_etag(f'{blob.sha256}-thumbnail')
+    elif blob is not None:
+        field, content_type, etag = blob.file, blob.content_type, quote_etag(blob.sha256)
+    else:
+        # Uploaded before content-addressed storage
+        field = evidence.file
+        content_type = mimetypes.guess_type(field.name)[0] or 'application/octet-stream'
+        etag = make_etag('evidence', evidence.pk, field.name, evidence.file_size)
+
+    def finish(response):
+        response['ETag'] = etag
+        if blob is not None:
+            # The content behind a content-addressed URL never changes
+            patch_cache_control(response, private=True, max_age=settings.EVIDENCE_URL_LIFETIME, immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    unchanged = get_conditional_response(request, etag=etag)
+    if unchanged is not None:
+        return finish(unchanged)
+
+    extension = field.name.rsplit('.', 1)[-1]
+    disposition = content_disposition_header(False, f'{evidence.incident.reference_number}-{evidence.pk}.{extension}')
+
+    if settings.EVIDENCE_SENDFILE:
+        # The front server reads the file and handles Range itself
+        response = HttpResponse(content_type=content_type)
+        if settings.EVIDENCE_SENDFILE == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.EVIDENCE_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(field.name)
+        else:
+            response['X-Sendfile'] = field.path
+        response['Content-Disposition'] = disposition
+        return finish(response)
+
+    try:
+        size = field.size
+    except FileNotFoundError:
+        raise Http404('Evidence file is missing')
+    # If-Range: only send part of the file if the client's copy is this version
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or etag in parse_etags(if_range):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = field.storage.open(field.name, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(file, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = disposition
+    return finish(response)
@@ -0,0 +1,178 @@
+import csv
+import gzip
+import io
+import json
+import logging
+import tempfile
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from .filters import filter_incidents
+from .models import Evidence, ExportJob, IncidentNote
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip by both the streamed CSV and export jobs
+EXPORT_CHUNK_SIZE = 1000
+
+CSV_HEADER = ['Ref Number', 'Title', 'Type', 'Status', 'Severity', 'Building', 'Floor',
+              'Reported By', 'Assigned To', 'Created At', 'Resolved At', 'Notes', 'Evidence Files']
+
+
+def _name(user):
+    return user.full_name if user else None
+
+
+def _timestamp(value):
+    return value.isoformat() if value else None
+
+
+def incident_record(incident):
+    """Full export record: the incident plus its notes and evidence metadata."""
+    return {
+        'id': incident.id,
+        'reference_number': incident.reference_number,
+        'incident_type': incident.incident_type,
+        'title': incident.title,
+        'description': incident.description,
+        'location_building': incident.location_building,
+        'location_floor': incident.location_floor,
+        'location_details': incident.location_details,
+        'latitude': incident.latitude,
+        'longitude': incident.longitude,
+        'status': incident.status,
+        'severity': incident.severity,
+        'reported_by': _name(incident.reported_by),
+        'assigned_to': _name(incident.assigned_to),
+        'is_public_report': incident.is_public_report,
+        'created_at': _timestamp(incident.created_at),
+        'updated_at': _timestamp(incident.updated_at),
+        'resolved_at': _timestamp(incident.resolved_at),
+        'notes': [
+            {
+                'id': note.id,
+                'user': _name(note.user),
+                'note': note.note,
+                'created_at': _timestamp(note.created_at),
+            }
+            for note in incident.notes.all()
+        ],
+        'evidence': [
+            {
+                'id': item.id,
+                'file': item.file.name,
+                'file_type': item.file_type,
+                'file_size': item.file_size,
+                'description': item.description,
+                'uploaded_by': _name(item.uploaded_by),
+                'uploaded_at': _timestamp(item.uploaded_at),
+            }
+            for item in incident.evidence.all()
+        ],
+    }
+
+
+def write_csv(stream, incidents):
+    writer = csv.writer(stream)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for incident in incidents:
+        writer.writerow([
+            incident.reference_number,
+            incident.title,
+            incident.incident_type,
+            incident.status,
+            incident.severity,
+            incident.location_building,
+            incident.location_floor,
+            _name(incident.reported_by) or 'System/Public',
+            _name(incident.assigned_to) or 'Unassigned',
+            incident.created_at.strftime('%Y-%m-%d %H:%M'),
+            incident.resolved_at.strftime('%Y-%m-%d %H:%M') if incident.resolved_at else '',
+            len(incident.notes.all()),
+            len(incident.evidence.all()),
+        ])
+        count += 1
+    return count
+
+
+def write_jsonl(stream, incidents):
+    count = 0
+    for incident in incidents:
+        stream.write(json.dumps(incident_record(incident), cls=DjangoJSONEncoder))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+}
+
+
+def export_queryset(job):
+    queryset = filter_incidents(job.created_by, job.filters)
+    return queryset.select_related('reported_by', 'assigned_to').prefetch_related(
+        Prefetch('notes', queryset=IncidentNote.objects.select_related('user')),
+        Prefetch('evidence', queryset=Evidence.objects.select_related('uploaded_by')),
+    )
+
+
+def run_export(job_id):
+    """Generate the artifact for an export job into MEDIA_ROOT.
+
+    Incidents are read in chunks with their notes and evidence prefetched per
+    chunk, and written through a temporary file so memory use stays flat.
+    """
+    job = ExportJob.objects.select_related('created_by').get(pk=job_id)
+    job.status = 'running'
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    try:
+        incidents = export_queryset(job).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        with tempfile.TemporaryFile() as spool:
+            raw = gzip.GzipFile(fileobj=spool, mode='wb') if job.compress else spool
+            stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            row_count = WRITERS[job.format](stream, incidents)
+            stream.flush()
+            stream.detach()
+            if job.compress:
+                raw.close()
+            spool.seek(0)
+            job.file.save(job.filename, File(spool), save=False)
+    except Exception as exc:
+        logger.exception('Export job %s failed', job.pk)
+        job.status = 'failed'
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return
+
+    job.status = 'completed'
+    job.row_count = row_count
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'row_count', 'finished_at'])
+
+
+def fail_stale_jobs(queryset=None):
+    """Mark jobs that outlived EXPORT_JOB_TIMEOUT as failed.
+
+    Jobs run on an in-process thread pool, so a restarted or killed worker
+    takes its queued and running jobs with it; without this they would stay
+    pending forever. Returns the number of jobs marked.
+    """
+    if queryset is None:
+        queryset = ExportJob.objects.all()
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+    return queryset.filter(
+        Q(status='pending', created_at__lt=cutoff) | Q(status='running', started_at__lt=cutoff)
+    ).update(status='failed', error='Export was interrupted; please start it again', finished_at=now)
@@ -0,0 +1,50 @@
+from django.db.models import Q
+from .models import Incident
+from . import search as incident_search
+
+# Query parameters understood by filter_incidents
+INCIDENT_FILTERS = ['status', 'type', 'severity', 'assigned_to', 'search', 'start_date', 'end_date']
+
+
+def scope_incidents(queryset, user):
+    """Restrict incidents to what ``user`` may see."""
+    # Only supervisors, heads, and admins see all incidents
+    if user.role not in ['supervisor', 'head', 'admin']:
+        queryset = queryset.filter(
+            Q(assigned_to=user) | Q(reported_by=user)
+        )
+    return queryset
+
+
+def filter_incidents(user, params):
+    """Incidents visible to ``user`` narrowed by the list filters in ``params``.
+
+    Shared by IncidentViewSet.get_queryset and background export jobs, which
+    store the same filters as a plain dict.
+    """
+    queryset = scope_incidents(Incident.objects.all(), user)
+    
+    status_filter = params.get('status', None)
+    incident_type = params.get('type', None)
+    severity = params.get('severity', None)
+    assigned_to = params.get('assigned_to', None)
+    search = params.get('search', None)
+    start_date = params.get('start_date', None)
+    end_date = params.get('end_date', None)
+    
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    if incident_type:
+        queryset = queryset.filter(incident_type=incident_type)
+    if severity:
+        queryset = queryset.filter(severity=severity)
+    if assigned_to:
+        queryset = queryset.filter(assigned_to_id=assigned_to)
+    if search:
+        # Full-text match, ordered by relevance
+        queryset = incident_search.apply(queryset, search)
+    if start_date:
+        queryset = queryset.filter(created_at__date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(created_at__date__lte=end_date)
+    return queryset
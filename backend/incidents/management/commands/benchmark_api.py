@@ -0,0 +1,347 @@
+from datetime import datetime
+from unittest import mock
+import io
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import uuid
+
+from PIL import Image
+import django
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from incidents import async_views, cache as incident_cache
+from incidents.models import AuditLog, Evidence, EvidenceBlob, Incident, IncidentNote, PublicReport
+
+User = get_user_model()
+
+BENCH_PASSWORD = 'bench-pass-123'
+
+# A fixed-size incident for incidents.retrieve.heavy, so its latency and query
+# count compare across databases and runs; nothing else writes to it
+HEAVY_TITLE = 'Benchmark heavy incident'
+HEAVY_NOTES = 200
+HEAVY_EVIDENCE = 50
+
+
+def _png():
+    # A decodable image, so uploads also exercise thumbnail generation
+    output = io.BytesIO()
+    Image.new('RGB', (1024, 768), (90, 120, 160)).save(output, 'PNG')
+    return output.getvalue()
+
+
+PNG = _png()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the incidents and users API endpoints and write a JSON report. '
+            'Write endpoints create data, so run it against a scratch or load-test database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='*', default=None, help='Run only these endpoint names')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--compare', help='Print the change against a previous JSON report')
+
+    def handle(self, *args, **options):
+        self.setup_fixtures()
+        scenarios = self.scenarios()
+        if options['only']:
+            unknown = set(options['only']) - {name for name, *_ in scenarios}
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+            scenarios = [scenario for scenario in scenarios if scenario[0] in options['only']]
+
+        results = {}
+        # Rate limits would turn the run into a throttling benchmark
+        with mock.patch.object(APIView, 'get_throttles', lambda view: []), \
+                mock.patch.object(async_views, 'check_throttles', lambda request: None):
+            for name, role, build in scenarios:
+                results[name] = self.measure(name, role, build, options['iterations'], options['warmup'])
+                self.stdout.write(
+                    f"{name:32} p50 {results[name]['p50_ms']:8.1f} ms  p95 {results[name]['p95_ms']:8.1f} ms  "
+                    f"p99 {results[name]['p99_ms']:8.1f} ms  {results[name]['queries']:4d} queries  "
+                    f"{results[name]['peak_memory_kb']:8.0f} KiB"
+                )
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'iterations': options['iterations'],
+                'incidents': Incident.objects.count(),
+                'notes': IncidentNote.objects.count(),
+                'audit_logs': AuditLog.objects.count(),
+                'users': User.objects.count(),
+                'heavy_incident': {
+                    'id': self.heavy_incident.id, 'notes': HEAVY_NOTES, 'evidence': HEAVY_EVIDENCE,
+                },
+            },
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        if options['compare']:
+            self.compare(options['compare'], report)
+
+    def setup_fixtures(self):
+        """Benchmark accounts plus representative incidents to read and write."""
+        self.users = {}
+        for role in ['supervisor', 'admin']:
+            user, _ = User.objects.get_or_create(
+                username=f'bench_{role}', defaults={'role': role, 'full_name': f'Benchmark {role.title()}'}
+            )
+            user.set_password(BENCH_PASSWORD)
+            user.save(update_fields=['password'])
+            self.users[role] = user
+
+        # The busiest guard gives the most realistic guard-scoped list
+        guard = User.objects.filter(role='guard').annotate(
+            assigned=Count('assigned_incidents')
+        ).order_by('-assigned').first()
+        if guard is None:
+            guard = User.objects.create_user(
+                username='bench_guard', password=BENCH_PASSWORD, role='guard', full_name='Benchmark Guard'
+            )
+        self.users['guard'] = guard
+
+        # The detail view is dominated by notes and evidence; benchmark the heaviest incident
+        busiest = IncidentNote.objects.exclude(incident__title=HEAVY_TITLE).values('incident').annotate(
+            n=Count('id')
+        ).order_by('-n').first()
+        self.detail_incident = (
+            Incident.objects.get(pk=busiest['incident']) if busiest else self.new_incident()
+        )
+        self.heavy_incident = self.get_heavy_incident()
+        self.public_report = PublicReport.objects.order_by('-id').first()
+        if self.public_report is None:
+            self.public_report = PublicReport.objects.create(
+                incident_type='other', description='Benchmark', location_building='Library'
+            )
+
+    def get_heavy_incident(self):
+        """The incident with exactly HEAVY_NOTES notes and HEAVY_EVIDENCE evidence rows, created once."""
+        existing = Incident.objects.filter(title=HEAVY_TITLE).annotate(
+            note_count=Count('notes', distinct=True), evidence_count=Count('evidence', distinct=True),
+        ).filter(note_count=HEAVY_NOTES, evidence_count=HEAVY_EVIDENCE).first()
+        if existing is not None:
+            return existing
+
+        incident = Incident.objects.create(
+            incident_type='theft', title=HEAVY_TITLE, description='Created by benchmark_api',
+            location_building='Library', reported_by=self.users['supervisor'],
+            assigned_to=self.users['guard'], status='in_progress',
+        )
+        authors = [self.users['supervisor'], self.users['guard']]
+        IncidentNote.objects.bulk_create(
+            IncidentNote(incident=incident, user=authors[i % 2], note=f'Benchmark note {i}')
+            for i in range(HEAVY_NOTES)
+        )
+        # Metadata only: retrieving the incident signs URLs but never opens the files
+        blobs = EvidenceBlob.objects.bulk_create(
+            EvidenceBlob(
+                sha256=uuid.uuid4().hex * 2, file=f'evidence/blobs/bench-{i}.png',
+                thumbnail=f'evidence/thumbnails/bench-{i}.jpg', content_type='image/png',
+                size=len(PNG), ref_count=1,
+            )
+            for i in range(HEAVY_EVIDENCE)
+        )
+        Evidence.objects.bulk_create(
+            Evidence(
+                incident=incident, blob=blob, file=blob.file.name, file_type='png',
+                file_size=blob.size, uploaded_by=self.users['guard'],
+            )
+            for blob in blobs
+        )
+        return incident
+
+    def new_incident(self, **fields):
+        return Incident.objects.create(
+            incident_type='other', title='Benchmark incident', description='Created by benchmark_api',
+            location_building='Library', reported_by=self.users['supervisor'], **fields
+        )
+
+    def scenarios(self):
+        """(name, role, build) triples; ``build(i)`` prepares iteration ``i`` outside the timer
+        and returns the request as (method, path, kwargs)."""
+        detail = f'/api/incidents/{self.detail_incident.id}/'
+        guard_id = self.users['guard'].id
+        deep_page = max(1, min(200, math.ceil(Incident.objects.count() / 20)))
+
+        def get(path, **params):
+            return lambda i: ('get', path, {'data': params})
+
+        def create_user(i):
+            return ('post', '/api/users/', {'format': 'json', 'data': {
+                'username': f'bench_user_{time.time_ns()}', 'email': 'bench@jkuat.ac.ke',
+                'password': BENCH_PASSWORD, 'password2': BENCH_PASSWORD,
+                'full_name': 'Benchmark User', 'role': 'guard',
+            }})
+
+        def assign(i):
+            incident = self.new_incident()
+            return ('post', f'/api/incidents/{incident.id}/assign/', {'data': {'officer_id': guard_id}})
+
+        def close(i):
+            incident = self.new_incident(assigned_to=self.users['guard'], status='in_progress')
+            return ('post', f'/api/incidents/{incident.id}/close/', {'data': {'resolution_note': 'Done'}})
+
+        def upload(i):
+            # Unique content each time (and each run), or every upload after the
+            # first would only take the deduplicated path
+            content = PNG + time.time_ns().to_bytes(8, 'big') + i.to_bytes(4, 'big')
+            upload = SimpleUploadedFile(f'bench-{i}.png', content, content_type='image/png')
+            return ('post', f'{detail}upload_evidence/', {'data': {'file': upload}, 'format': 'multipart'})
+
+        def dashboard_cold(i):
+            incident_cache.bump_version()
+            return ('get', '/api/incidents/dashboard_stats/', {})
+
+        return [
+            ('auth.login', None, lambda i: ('post', '/api/auth/login/', {'format': 'json', 'data': {
+                'username': 'bench_supervisor', 'password': BENCH_PASSWORD}})),
+            ('users.list', 'supervisor', get('/api/users/')),
+            ('users.retrieve', 'supervisor', get(f'/api/users/{guard_id}/')),
+            ('users.me', 'guard', get('/api/users/me/')),
+            ('users.guards', 'supervisor', get('/api/users/guards/')),
+            ('users.create', 'admin', create_user),
+            ('users.update', 'admin', lambda i: ('patch', f'/api/users/{guard_id}/', {
+                'format': 'json', 'data': {'phone': f'07{i:08d}'}})),
+            ('incidents.list', 'supervisor', get('/api/incidents/')),
+            ('incidents.list.guard', 'guard', get('/api/incidents/')),
+            ('incidents.list.filtered', 'supervisor', get('/api/incidents/', status='pending', severity='high')),
+            ('incidents.list.search', 'supervisor', get('/api/incidents/', search='laptop')),
+            ('incidents.list.deep_page', 'supervisor', get('/api/incidents/', page=deep_page)),
+            ('incidents.list.cursor', 'supervisor', get('/api/incidents/', pagination='cursor')),
+            ('incidents.retrieve', 'supervisor', get(detail)),
+            ('incidents.retrieve.heavy', 'supervisor', get(f'/api/incidents/{self.heavy_incident.id}/')),
+            ('incidents.my_incidents', 'guard', get('/api/incidents/my_incidents/')),
+            ('incidents.create', 'supervisor', lambda i: ('post', '/api/incidents/', {'format': 'json', 'data': {
+                'incident_type': 'theft', 'title': f'Benchmark {i}', 'description': 'Benchmark',
+                'location_building': 'Library', 'severity': 'low'}})),
+            ('incidents.update', 'supervisor', lambda i: ('patch', detail, {
+                'format': 'json', 'data': {'severity': ['low', 'medium', 'high'][i % 3]}})),
+            ('incidents.assign', 'supervisor', assign),
+            ('incidents.close', 'supervisor', close),
+            ('incidents.add_note', 'supervisor', lambda i: ('post', f'{detail}add_note/', {
+                'format': 'json', 'data': {'note': f'Benchmark note {i}'}})),
+            ('incidents.upload_evidence', 'supervisor', upload),
+            ('incidents.dashboard_stats', 'supervisor', get('/api/incidents/dashboard_stats/')),
+            ('incidents.dashboard_stats.cold', 'supervisor', dashboard_cold),
+            ('incidents.advanced_analytics', 'supervisor', get('/api/incidents/advanced_analytics/')),
+            ('incidents.export_incidents', 'supervisor', get('/api/incidents/export_incidents/')),
+            ('audit_logs.list', 'supervisor', get('/api/audit-logs/')),
+            ('audit_logs.entity', 'supervisor', get(
+                '/api/audit-logs/', entity_type='incident', entity_id=self.detail_incident.id)),
+            ('public.submit', None, lambda i: ('post', '/api/public/submit/', {'format': 'json', 'data': {
+                'incident_type': 'noise', 'description': 'Benchmark public report',
+                'location_building': 'Hostels', 'is_anonymous': True}})),
+            ('public.status', None, get(f'/api/public/status/{self.public_report.reference_number}/')),
+        ]
+
+    def client_for(self, role):
+        # Real JWT authentication, so its cost is part of every measurement
+        client = APIClient(HTTP_HOST='localhost')
+        if role:
+            token = RefreshToken.for_user(self.users[role]).access_token
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def request(self, client, method, path, kwargs):
+        response = getattr(client, method)(path, secure=True, **kwargs)
+        if response.streaming:
+            # Streaming responses do their work while being consumed
+            for _ in response.streaming_content:
+                pass
+        if response.status_code >= 400:
+            raise CommandError(f'{method.upper()} {path} returned {response.status_code}')
+        return response
+
+    def measure(self, name, role, build, iterations, warmup):
+        client = self.client_for(role)
+        for i in range(warmup):
+            self.request(client, *build(i))
+
+        timings = []
+        for i in range(warmup, warmup + iterations):
+            call = build(i)
+            started = time.perf_counter()
+            self.request(client, *call)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # Query count and peak memory come from a separate pass; tracing would skew the timings
+        call = build(warmup + iterations)
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                self.request(client, *call)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'method': call[0].upper(),
+            'path': call[1],
+            'iterations': iterations,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': len(queries.captured_queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def compare(self, path, report):
+        with open(path) as handle:
+            baseline = json.load(handle)['endpoints']
+
+        def change(old, new):
+            return f'{(new - old) / old * 100:+7.1f}%' if old else '    n/a'
+
+        self.stdout.write(f"\n{'endpoint':32} {'p50':>8} {'p95':>8} {'queries':>9} {'memory':>8}")
+        for name, current in report['endpoints'].items():
+            previous = baseline.get(name)
+            if previous is None:
+                self.stdout.write(f'{name:32} (new)')
+                continue
+            self.stdout.write(
+                f"{name:32} {change(previous['p50_ms'], current['p50_ms'])} "
+                f"{change(previous['p95_ms'], current['p95_ms'])} "
+                f"{current['queries'] - previous['queries']:+9d} "
+                f"{change(previous['peak_memory_kb'], current['peak_memory_kb'])}"
+            )
@@ -0,0 +1,354 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+import math
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from analytics import rollups
+from incidents import cache as incident_cache
+from incidents import search
+from incidents.models import AuditLog, Evidence, Incident, IncidentNote, PublicReport, ReferenceSequence
+from incidents.uploads import EXTENSIONS
+
+User = get_user_model()
+
+ROLE_WEIGHTS = {'guard': 80, 'supervisor': 15, 'head': 4, 'admin': 1}
+
+TYPE_WEIGHTS = {
+    'theft': 25, 'suspicious': 20, 'lost_found': 15, 'vandalism': 10,
+    'noise': 10, 'facility': 10, 'traffic': 5, 'other': 5,
+}
+
+SEVERITY_WEIGHTS = {'low': 45, 'medium': 40, 'high': 15}
+
+BUILDING_WEIGHTS = {
+    'Main Gate': 14, 'Library': 12, 'Hostels': 12, 'Student Centre': 10, 'Engineering Block': 9,
+    'Science Complex': 8, 'Assembly Hall': 7, 'Administration Block': 6, 'SPA Building': 6,
+    'Sports Ground': 6, 'Graduation Square': 5, 'Staff Quarters': 5,
+}
+
+# Quiet early mornings, busy afternoons and evenings
+HOUR_WEIGHTS = [3, 2, 2, 1, 1, 1, 2, 4, 6, 7, 7, 8, 9, 9, 8, 8, 9, 10, 11, 11, 10, 8, 6, 4]
+
+FLOORS = ['Ground', '1st', '2nd', '3rd', '4th', '']
+
+# Typical resolution time in hours by incident type
+RESOLUTION_HOURS = {
+    'theft': 72, 'suspicious': 6, 'lost_found': 48, 'vandalism': 36,
+    'noise': 2, 'facility': 24, 'traffic': 4, 'other': 12,
+}
+
+TITLES = {
+    'theft': ['Laptop stolen', 'Phone snatched', 'Bicycle missing', 'Break-in reported'],
+    'suspicious': ['Suspicious person loitering', 'Unattended bag', 'Unknown vehicle parked'],
+    'lost_found': ['Lost student ID', 'Found wallet', 'Lost keys', 'Found backpack'],
+    'vandalism': ['Broken window', 'Graffiti on wall', 'Damaged notice board'],
+    'noise': ['Loud music after hours', 'Disturbance in hallway'],
+    'facility': ['Faulty street light', 'Water leak', 'Broken door lock', 'Power outage'],
+    'traffic': ['Minor collision', 'Illegal parking', 'Speeding vehicle'],
+    'other': ['General security concern', 'Medical assistance requested'],
+}
+
+DESCRIPTIONS = [
+    'Reported by a student near the {building}.',
+    'Caller described the situation at the {building} as urgent.',
+    'Observed during the routine patrol of the {building}.',
+    'Staff member at the {building} requested security presence.',
+]
+
+NOTES = [
+    'Officer dispatched to the scene.',
+    'Spoke with the reporting party.',
+    'CCTV footage requested from control room.',
+    'Area secured, awaiting follow-up.',
+    'Matter referred to the administration.',
+    'Reporting party contacted with an update.',
+]
+
+# Only the types the upload view accepts (see incidents.uploads)
+EVIDENCE_TYPES = {'image/jpeg': 70, 'image/png': 18, 'application/pdf': 12}
+
+AUDIT_ACTIONS = {'update': 40, 'create': 20, 'status_change': 15, 'assign': 10, 'login': 10, 'upload': 5}
+
+
+def weighted(rng, weights):
+    """Return a picker drawing keys of ``weights`` with their relative frequencies."""
+    keys = list(weights)
+    cumulative = []
+    total = 0
+    for key in keys:
+        total += weights[key]
+        cumulative.append(total)
+    return lambda: rng.choices(keys, cum_weights=cumulative)[0]
+
+
+def poisson(rng, mean):
+    """A Poisson-distributed count (Knuth's method; fine for small means)."""
+    limit = math.exp(-mean)
+    count, product = 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+@contextmanager
+def historical_timestamps(*models):
+    """Let bulk_create keep the generated created_at/updated_at values."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate realistic synthetic data for load testing and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--incidents', type=int, default=10000)
+        parser.add_argument('--notes-per-incident', type=float, default=2.0,
+                            help='Average number of notes per incident')
+        parser.add_argument('--evidence-per-incident', type=float, default=0.5,
+                            help='Average number of evidence files per incident')
+        parser.add_argument('--public-reports', type=int, default=1000,
+                            help='How many of the incidents arrive through the public portal')
+        parser.add_argument('--audit-logs', type=int, default=50000)
+        parser.add_argument('--days', type=int, default=365, help='Spread incidents over this many days')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+        self.prefix = f"load{options['seed']}_"
+
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(f'Load data for seed {options["seed"]} already exists; use another --seed')
+
+        started = time.monotonic()
+        with historical_timestamps(User, Incident, IncidentNote, Evidence, PublicReport, AuditLog):
+            self.create_users(options['users'])
+            self.create_incidents(
+                options['incidents'], options['public_reports'],
+                options['notes_per_incident'], options['evidence_per_incident']
+            )
+            self.create_audit_logs(options['audit_logs'])
+
+        self.stdout.write('Rebuilding analytics rollups and search index...')
+        rollups.rebuild()
+        search.rebuild()
+        incident_cache.bump_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated load data in {time.monotonic() - started:.1f}s'
+        ))
+
+    def log(self, label, count):
+        self.stdout.write(f'  {label}: {count}')
+
+    def random_time(self, start=None, end=None):
+        """A timestamp in [start, end) following the hourly incident pattern."""
+        start = start or self.start
+        end = end or self.now
+        span = (end - start).total_seconds()
+        if span < 3600:
+            return start + timedelta(seconds=self.rng.random() * span)
+        moment = timezone.localtime(start + timedelta(seconds=self.rng.random() * span))
+        hour = self.rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+        moment = moment.replace(hour=hour, minute=self.rng.randrange(60), second=self.rng.randrange(60))
+        return min(max(moment, start), end)
+
+    def create_users(self, count):
+        password = make_password('pass123')
+        pick_role = weighted(self.rng, ROLE_WEIGHTS)
+        users = []
+        for i in range(count):
+            # Always include at least one supervisor to log in with
+            role = 'supervisor' if i == 0 else pick_role()
+            created = self.random_time()
+            users.append(User(
+                username=f'{self.prefix}{role}{i}',
+                email=f'{self.prefix}{role}{i}@jkuat.ac.ke',
+                password=password,
+                full_name=f'Load {role.title()} {i}',
+                role=role,
+                phone=f'07{self.rng.randrange(10 ** 8):08d}',
+                date_joined=created,
+                created_at=created,
+                updated_at=created,
+            ))
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+
+        self.users = list(User.objects.filter(username__startswith=self.prefix).values_list('id', 'role'))
+        self.user_ids = [user_id for user_id, _ in self.users]
+        self.guard_ids = [user_id for user_id, role in self.users if role == 'guard'] or self.user_ids
+        self.log('Users', len(self.users))
+
+    def references(self, prefix, timestamps):
+        """Reference numbers for ``timestamps``, numbered within each calendar year."""
+        by_year = defaultdict(int)
+        for moment in timestamps:
+            by_year[moment.year] += 1
+        values = {year: iter(ReferenceSequence.reserve(prefix, count, year=year)) for year, count in by_year.items()}
+        return [ReferenceSequence.format(prefix, moment.year, next(values[moment.year])) for moment in timestamps]
+
+    def create_incidents(self, count, public_reports, notes_per_incident, evidence_per_incident):
+        pick_type = weighted(self.rng, TYPE_WEIGHTS)
+        pick_severity = weighted(self.rng, SEVERITY_WEIGHTS)
+        pick_building = weighted(self.rng, BUILDING_WEIGHTS)
+        pick_file_type = weighted(self.rng, EVIDENCE_TYPES)
+        rng = self.rng
+        public = set(rng.sample(range(count), min(public_reports, count)))
+        self.incident_ids = []
+        self.evidence_ids = []
+        totals = defaultdict(int)
+
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            timestamps = sorted(self.random_time() for _ in range(size))
+            references = self.references(Incident.REFERENCE_PREFIX, timestamps)
+
+            incidents = []
+            for i, (created, reference) in enumerate(zip(timestamps, references), start=offset):
+                incident_type = pick_type()
+                building = pick_building()
+                age_days = (self.now - created).days
+                # Older incidents are far more likely to be finished
+                finished = rng.random() < min(0.97, 0.35 + age_days / 30)
+                if finished:
+                    status = 'closed' if rng.random() < 0.6 else 'resolved'
+                else:
+                    status = rng.choice(['pending', 'assigned', 'in_progress'])
+                resolved_at = None
+                if finished:
+                    hours = rng.expovariate(1 / RESOLUTION_HOURS[incident_type])
+                    resolved_at = min(created + timedelta(hours=hours), self.now)
+                is_public = i in public
+                incidents.append(Incident(
+                    reference_number=reference,
+                    incident_type=incident_type,
+                    title=f'Public Report: {incident_type}' if is_public else rng.choice(TITLES[incident_type]),
+                    description=rng.choice(DESCRIPTIONS).format(building=building),
+                    location_building=building,
+                    location_floor=rng.choice(FLOORS),
+                    status=status,
+                    severity=pick_severity(),
+                    reported_by_id=None if is_public else rng.choice(self.user_ids),
+                    assigned_to_id=None if status == 'pending' else rng.choice(self.guard_ids),
+                    is_public_report=is_public,
+                    is_anonymous=is_public and rng.random() < 0.3,
+                    created_at=created,
+                    updated_at=resolved_at or created,
+                    resolved_at=resolved_at,
+                ))
+
+            with transaction.atomic():
+                Incident.objects.bulk_create(incidents, batch_size=self.batch_size)
+
+                notes = []
+                evidence = []
+                reports = []
+                for incident in incidents:
+                    self.incident_ids.append(incident.id)
+                    if incident.is_public_report:
+                        reports.append(incident)
+                    end = incident.resolved_at or self.now
+                    for _ in range(poisson(rng, notes_per_incident)):
+                        created = self.random_time(incident.created_at, end)
+                        notes.append(IncidentNote(
+                            incident_id=incident.id,
+                            user_id=incident.assigned_to_id or rng.choice(self.user_ids),
+                            note=rng.choice(NOTES),
+                            created_at=created,
+                            updated_at=created,
+                        ))
+                    for n in range(poisson(rng, evidence_per_incident)):
+                        content_type = pick_file_type()
+                        file_size = rng.randrange(20_000, 8_000_000)
+                        uploaded = self.random_time(incident.created_at, end)
+                        evidence.append(Evidence(
+                            incident_id=incident.id,
+                            file=f'evidence/load/{incident.reference_number}-{n}.{EXTENSIONS[content_type]}',
+                            file_type=content_type.split('/')[-1],
+                            file_size=file_size,
+                            uploaded_by_id=incident.assigned_to_id or incident.reported_by_id,
+                            uploaded_at=uploaded,
+                            updated_at=uploaded,
+                        ))
+                IncidentNote.objects.bulk_create(notes, batch_size=self.batch_size)
+                Evidence.objects.bulk_create(evidence, batch_size=self.batch_size)
+                self.evidence_ids.extend(item.id for item in evidence)
+                self.create_public_reports(reports)
+
+            totals['incidents'] += len(incidents)
+            totals['notes'] += len(notes)
+            totals['evidence'] += len(evidence)
+            totals['public reports'] += len(reports)
+            self.stdout.write(f'  ...{totals["incidents"]}/{count} incidents')
+
+        for label, total in totals.items():
+            self.log(label.capitalize(), total)
+
+    def create_public_reports(self, incidents):
+        """The public submissions behind public incidents, as public_report_submit creates them."""
+        references = self.references(PublicReport.REFERENCE_PREFIX, [incident.created_at for incident in incidents])
+        PublicReport.objects.bulk_create([
+            PublicReport(
+                reference_number=reference,
+                incident_id=incident.id,
+                incident_type=incident.incident_type,
+                description=incident.description,
+                location_building=incident.location_building,
+                location_floor=incident.location_floor,
+                is_anonymous=incident.is_anonymous,
+                created_at=incident.created_at,
+            )
+            for incident, reference in zip(incidents, references)
+        ], batch_size=self.batch_size)
+
+    def create_audit_logs(self, count):
+        pick_action = weighted(self.rng, AUDIT_ACTIONS)
+        rng = self.rng
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            logs = []
+            for _ in range(size):
+                action = pick_action()
+                user_id = rng.choice(self.user_ids)
+                if action == 'upload' and self.evidence_ids:
+                    entity_type, entity_id = 'evidence', rng.choice(self.evidence_ids)
+                elif action not in ('login', 'upload') and self.incident_ids:
+                    entity_type, entity_id = 'incident', rng.choice(self.incident_ids)
+                else:
+                    action, entity_type, entity_id = 'login', 'user', user_id
+                logs.append(AuditLog(
+                    user_id=user_id,
+                    action=action,
+                    entity_type=entity_type,
+                    entity_id=entity_id,
+                    description=f'{action.replace("_", " ").capitalize()} {entity_type} {entity_id}',
+                    ip_address=f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+                    user_agent='load-generator',
+                    created_at=self.random_time(),
+                ))
+            with transaction.atomic():
+                AuditLog.objects.bulk_create(logs, batch_size=self.batch_size)
+        self.log('Audit logs', count)
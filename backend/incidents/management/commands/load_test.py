@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import http.client
+import json
+import math
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from incidents.models import PublicReport
+
+User = get_user_model()
+
+DEFAULT_PATHS = [
+    '/api/incidents/dashboard_stats/',
+    '/api/incidents/advanced_analytics/',
+    '/api/incidents/my_incidents/',
+    '/api/public/status/{public_reference}/',
+]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Drive concurrent clients against a running server (WSGI or ASGI) and report '
+            'throughput and latency per endpoint. The server must use this database and SECRET_KEY, '
+            'and a high THROTTLE_USER_RATE so the run is not throttled.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run for')
+        parser.add_argument('--username', help='User to authenticate as (default: the first supervisor)')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Endpoint to request; repeat for a mix (default: the async dashboard endpoints)')
+        parser.add_argument('--slow-path', help='Endpoint hammered by --slow-clients alongside the mix, '
+                                                'e.g. /api/incidents/export_incidents/')
+        parser.add_argument('--slow-clients', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise CommandError(f"Not an http(s) URL: {options['url']}")
+        self.url = url
+
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(role='supervisor', is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No user to authenticate as; pass --username')
+        self.token = str(RefreshToken.for_user(user).access_token)
+
+        report = PublicReport.objects.order_by('-id').first()
+        public_reference = report.reference_number if report else 'PUB-0000-00000'
+        paths = [path.format(public_reference=public_reference) for path in options['paths'] or DEFAULT_PATHS]
+
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        deadline = time.monotonic() + options['duration']
+        clients = [paths[i % len(paths):] + paths[:i % len(paths)] for i in range(options['concurrency'])]
+        clients += [[options['slow_path']]] * (options['slow_clients'] if options['slow_path'] else 0)
+
+        self.stdout.write(
+            f"{options['concurrency']} clients (+{len(clients) - options['concurrency']} slow) "
+            f"against {options['url']} for {options['duration']:g}s as {user.username}"
+        )
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+            for future in [pool.submit(self.client, rotation, deadline) for rotation in clients]:
+                future.result()
+        elapsed = time.monotonic() - started
+
+        results = {}
+        for path in sorted(set(self.samples) | set(self.errors)):
+            timings = self.samples.get(path, [])
+            results[path] = {
+                'requests': len(timings),
+                'errors': self.errors.get(path, 0),
+                'throughput_rps': round(len(timings) / elapsed, 1),
+                'p50_ms': round(percentile(timings, 50), 1) if timings else None,
+                'p95_ms': round(percentile(timings, 95), 1) if timings else None,
+                'p99_ms': round(percentile(timings, 99), 1) if timings else None,
+            }
+            self.stdout.write(
+                f"{path:48} {results[path]['requests']:7d} ok {results[path]['errors']:5d} errors "
+                f"{results[path]['throughput_rps']:8.1f} req/s  p50 {results[path]['p50_ms'] or 0:8.1f} ms  "
+                f"p95 {results[path]['p95_ms'] or 0:8.1f} ms  p99 {results[path]['p99_ms'] or 0:8.1f} ms"
+            )
+        total = sum(result['requests'] for result in results.values())
+        self.stdout.write(self.style.SUCCESS(f'{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s'))
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump({
+                    'url': options['url'],
+                    'concurrency': options['concurrency'],
+                    'slow_clients': len(clients) - options['concurrency'],
+                    'duration_s': round(elapsed, 1),
+                    'throughput_rps': round(total / elapsed, 1),
+                    'endpoints': results,
+                }, handle, indent=2)
+
+    def connect(self):
+        connection_class = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.url.hostname, self.url.port, timeout=120)
+
+    def client(self, rotation, deadline):
+        """One keep-alive client cycling through ``rotation`` until the deadline."""
+        headers = {'Authorization': f'Bearer {self.token}', 'Accept': 'application/json'}
+        connection = self.connect()
+        samples, errors = {}, {}
+        i = 0
+        try:
+            while time.monotonic() < deadline:
+                path = rotation[i % len(rotation)]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', self.url.path.rstrip('/') + path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status < 400
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    connection = self.connect()
+                    ok = False
+                if ok:
+                    samples.setdefault(path, []).append((time.perf_counter() - started) * 1000)
+                else:
+                    errors[path] = errors.get(path, 0) + 1
+        finally:
+            connection.close()
+
+        with self.lock:
+            for path, timings in samples.items():
+                self.samples.setdefault(path, []).extend(timings)
+            for path, count in errors.items():
+                self.errors[path] = self.errors.get(path, 0) + count
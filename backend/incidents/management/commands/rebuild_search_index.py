@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from incidents import search
+
+class Command(BaseCommand):
+    help = 'Rebuild the incident full-text search index'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write(self.style.WARNING('Full-text search is not available on this database'))
+            return
+        self.stdout.write('Rebuilding incident search index...')
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
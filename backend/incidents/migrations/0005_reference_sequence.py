@@ -0,0 +1,46 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each counter after the highest reference number already issued."""
+    ReferenceSequence = apps.get_model('incidents', 'ReferenceSequence')
+    counters = {}
+    for model_name in ('Incident', 'PublicReport'):
+        model = apps.get_model('incidents', model_name)
+        for reference in model.objects.values_list('reference_number', flat=True).iterator():
+            try:
+                prefix, year, value = reference.split('-')
+                key = (prefix, int(year))
+                counters[key] = max(counters.get(key, 0), int(value))
+            except ValueError:
+                continue
+    ReferenceSequence.objects.bulk_create([
+        ReferenceSequence(prefix=prefix, year=year, last_value=value)
+        for (prefix, year), value in counters.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0004_auditlog_changes_alter_auditlog_action_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10)),
+                ('year', models.PositiveIntegerField()),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'reference_sequences',
+                'unique_together': {('prefix', 'year')},
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
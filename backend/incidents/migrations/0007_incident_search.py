@@ -0,0 +1,60 @@
+from django.db import migrations
+
+
+# A frozen copy of the DDL and backfill in incidents.search, so later changes
+# to the live module don't change what this migration does
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        # No foreign key: Django doesn't know about this table, and flush
+        # truncates incidents without CASCADE. Deletes go through signals.
+        schema_editor.execute(
+            "CREATE TABLE incident_search ("
+            " incident_id bigint PRIMARY KEY,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute("CREATE INDEX incident_search_document_gin ON incident_search USING GIN (document)")
+        schema_editor.execute("""
+            INSERT INTO incident_search (incident_id, document)
+            SELECT i.id,
+                   setweight(to_tsvector('simple', i.reference_number), 'A') ||
+                   setweight(to_tsvector('english', i.title), 'A') ||
+                   setweight(to_tsvector('english', i.description), 'B') ||
+                   setweight(to_tsvector('english', concat_ws(' ', i.location_building, i.location_floor, i.location_details)), 'C') ||
+                   setweight(to_tsvector('english', COALESCE(
+                       (SELECT string_agg(n.note, ' ') FROM incident_notes n WHERE n.incident_id = i.id), ''
+                   )), 'D')
+            FROM incidents i
+        """)
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE incident_search USING fts5("
+            " reference_number, title, description, location, notes, tokenize='unicode61')"
+        )
+        schema_editor.execute("""
+            INSERT INTO incident_search (rowid, reference_number, title, description, location, notes)
+            SELECT i.id, i.reference_number, i.title, i.description,
+                   i.location_building || ' ' || i.location_floor || ' ' || i.location_details,
+                   COALESCE((SELECT group_concat(n.note, ' ') FROM incident_notes n WHERE n.incident_id = i.id), '')
+            FROM incidents i
+        """)
+    # incidents.search caches whether the table exists on each connection
+    schema_editor.connection.__dict__.pop('_incident_search_available', None)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP TABLE IF EXISTS incident_search")
+    schema_editor.connection.__dict__.pop('_incident_search_available', None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0006_exportjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
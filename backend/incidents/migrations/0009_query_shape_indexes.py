@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0008_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['entity_type', 'entity_id', '-created_at', '-id'], name='audit_logs_entity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='audit_logs_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['assigned_to', 'status', '-created_at'], name='incidents_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['reported_by', 'status', '-created_at'], name='incidents_reporter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'assigned', 'in_progress'])), fields=['status', '-created_at'], name='incidents_open_idx'),
+        ),
+    ]
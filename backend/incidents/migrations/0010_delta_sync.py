@@ -0,0 +1,72 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Existing notes and evidence were last changed when they were created."""
+    IncidentNote = apps.get_model('incidents', 'IncidentNote')
+    Evidence = apps.get_model('incidents', 'Evidence')
+    IncidentNote.objects.update(updated_at=models.F('created_at'))
+    Evidence.objects.update(updated_at=models.F('uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0009_query_shape_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('incident', 'Incident'), ('note', 'Note'), ('evidence', 'Evidence')], max_length=20)),
+                ('entity_id', models.IntegerField()),
+                ('incident_id', models.IntegerField()),
+                ('reporter_id', models.IntegerField(blank=True, null=True)),
+                ('assignee_id', models.IntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'tombstones',
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='evidence',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='incidentnote',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='evidence',
+            index=models.Index(fields=['updated_at', 'id'], name='evidence_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['updated_at', 'id'], name='incidents_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidentnote',
+            index=models.Index(fields=['updated_at', 'id'], name='incident_notes_updated_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstones_deleted_id_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def drop_foreign_key(apps, schema_editor):
+    # Databases migrated before 0007 lost its foreign key still have it, and
+    # flush can't truncate incidents while it exists
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE incident_search DROP CONSTRAINT IF EXISTS incident_search_incident_id_fkey"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0011_evidence_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_foreign_key, migrations.RunPython.noop),
+    ]
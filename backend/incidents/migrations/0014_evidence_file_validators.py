@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:41
+
+import incidents.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0013_auditlog_created_at'),
+    ]
+
+    # validate_file_size was on the model before any migration recorded it.
+    # Validators only change migration state; no SQL runs.
+    operations = [
+        migrations.AlterField(
+            model_name='evidence',
+            name='file',
+            field=models.FileField(upload_to='evidence/%Y/%m/%d/', validators=[incidents.models.validate_file_size]),
+        ),
+    ]
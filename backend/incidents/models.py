@@ -1,8 +1,93 @@
-from django.db import models
+from django.db import models, transaction, connection, IntegrityError
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
 import uuid
 
-class Incident(models.Model):
+from .tracking import FieldTrackerMixin
+
+
+class ReferenceSequence(models.Model):
+    """Per-prefix, per-year counter used to allocate reference numbers.
+
+    Each allocation increments a single counter row, so the cost stays
+    constant no matter how many incidents were filed this year, and the
+    increment is serialized so concurrent workers never hand out the same
+    number twice.
+    """
+    prefix = models.CharField(max_length=10)
+    year = models.PositiveIntegerField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'reference_sequences'
+        unique_together = [('prefix', 'year')]
+
+    def __str__(self):
+        return f"{self.prefix}-{self.year}: {self.last_value}"
+
+    @staticmethod
+    def format(prefix, year, value):
+        return f'{prefix}-{year}-{value:05d}'
+
+    @classmethod
+    def _increment(cls, prefix, year, count):
+        """Bump the counter and return the first reserved value, or None if
+        the row for this prefix/year does not exist yet."""
+        rows = cls.objects.filter(prefix=prefix, year=year)
+        if connection.features.has_select_for_update:
+            sequence = rows.select_for_update().first()
+            if sequence is None:
+                return None
+            start = sequence.last_value + 1
+            sequence.last_value += count
+            sequence.save(update_fields=['last_value'])
+            return start
+        if not rows.update(last_value=F('last_value') + count):
+            return None
+        return rows.values_list('last_value', flat=True).get() - count + 1
+
+    @classmethod
+    def reserve(cls, prefix, count=1, year=None):
+        """Reserve ``count`` consecutive values and return them as a range.
+
+        On backends with row locking (Postgres) the counter row is locked with
+        SELECT ... FOR UPDATE. Elsewhere (SQLite) the increment is issued as a
+        single UPDATE first, which takes the database write lock and
+        serializes competing allocators until the transaction commits.
+        """
+        if count < 1:
+            raise ValueError('count must be at least 1')
+        year = year or timezone.now().year
+
+        with transaction.atomic():
+            start = cls._increment(prefix, year, count)
+            if start is None:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(prefix=prefix, year=year)
+                except IntegrityError:
+                    # Another worker created the row first
+                    pass
+                start = cls._increment(prefix, year, count)
+        return range(start, start + count)
+
+    @classmethod
+    def next_reference(cls, prefix):
+        year = timezone.now().year
+        value = cls.reserve(prefix, 1, year=year)[0]
+        return cls.format(prefix, year, value)
+
+    @classmethod
+    def reserve_references(cls, prefix, count):
+        """Reserve ``count`` reference numbers at once, e.g. for bulk imports."""
+        year = timezone.now().year
+        return [cls.format(prefix, year, value) for value in cls.reserve(prefix, count, year=year)]
+
+
+class Incident(FieldTrackerMixin, models.Model):
+    REFERENCE_PREFIX = 'INC'
+
     INCIDENT_TYPES = [
         ('theft', 'Theft/Burglary'),
         ('suspicious', 'Suspicious Activity'),
@@ -57,13 +142,24 @@ class Incident(models.Model):
     class Meta:
         db_table = 'incidents'
         ordering = ['-created_at']
+        indexes = [
+            # Cursor pagination key
+            models.Index(fields=['-created_at', '-id'], name='incidents_created_id_idx'),
+            # Guard scope: assigned_to OR reported_by, optionally by status, newest first
+            models.Index(fields=['assigned_to', 'status', '-created_at'], name='incidents_assignee_idx'),
+            models.Index(fields=['reported_by', 'status', '-created_at'], name='incidents_reporter_idx'),
+            # Open work queues; resolved and closed incidents dominate the table over time
+            models.Index(
+                fields=['status', '-created_at'], name='incidents_open_idx',
+                condition=models.Q(status__in=['pending', 'assigned', 'in_progress']),
+            ),
+            # Delta sync key
+            models.Index(fields=['updated_at', 'id'], name='incidents_updated_id_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.reference_number:
-            from datetime import datetime
-            year = datetime.now().year
-            count = Incident.objects.filter(reference_number__startswith=f'INC-{year}').count() + 1
-            self.reference_number = f'INC-{year}-{count:05d}'
+            self.reference_number = ReferenceSequence.next_reference(self.REFERENCE_PREFIX)
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -75,10 +171,14 @@ class IncidentNote(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     note = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'incident_notes'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='incident_notes_updated_id_idx'),
+        ]
     
     def __str__(self):
         return f"Note on {self.incident.reference_number}"
@@ -91,23 +191,81 @@ def validate_file_size(value):
     if filesize > 10 * 1024 * 1024:  # 10MB
         raise ValidationError("Maximum file size is 10MB")
 
+class EvidenceBlob(models.Model):
+    """Stored evidence content, shared by every Evidence row with the same SHA-256."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='evidence/blobs/')
+    content_type = models.CharField(max_length=100)
+    size = models.BigIntegerField()
+    thumbnail = models.FileField(upload_to='evidence/thumbnails/', blank=True)
+    # Evidence rows using this blob; it is deleted with its files at zero
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'evidence_blobs'
+
+    def __str__(self):
+        return self.sha256
+
+
 class Evidence(models.Model):
     incident = models.ForeignKey(Incident, on_delete=models.CASCADE, related_name='evidence')
     file = models.FileField(upload_to='evidence/%Y/%m/%d/', validators=[validate_file_size])
+    # Uploads made before content-addressed storage have no blob
+    blob = models.ForeignKey(EvidenceBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='evidence')
     file_type = models.CharField(max_length=10)
     file_size = models.IntegerField()
     description = models.CharField(max_length=255, blank=True)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'evidence'
         ordering = ['uploaded_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='evidence_updated_id_idx'),
+        ]
     
     def __str__(self):
         return f"Evidence for {self.incident.reference_number}"
 
 
+class Tombstone(models.Model):
+    """A row that disappeared from someone's view, for delta sync clients to drop.
+
+    Written when an incident, note or evidence is deleted, and when an
+    incident is reassigned away from a guard. Pruned after
+    SYNC_TOMBSTONE_RETENTION_DAYS by ``prune_tombstones``.
+    """
+    ENTITY_CHOICES = [
+        ('incident', 'Incident'),
+        ('note', 'Note'),
+        ('evidence', 'Evidence'),
+    ]
+
+    entity_type = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    entity_id = models.IntegerField()
+    incident_id = models.IntegerField()
+    # Who could see the incident at the time; the rows themselves are gone
+    reporter_id = models.IntegerField(null=True, blank=True)
+    assignee_id = models.IntegerField(null=True, blank=True)
+    # Set when only this user lost sight of the incident
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'tombstones'
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstones_deleted_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.entity_type} {self.entity_id}"
+
+
 class AuditLog(models.Model):
     ACTION_TYPES = [
         ('create', 'Create'),
@@ -128,17 +286,27 @@ class AuditLog(models.Model):
     changes = models.JSONField(null=True, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by audit.record() when the event happens; rows may be written later
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'audit_logs'
         ordering = ['-created_at']
+        indexes = [
+            # Cursor pagination key
+            models.Index(fields=['-created_at', '-id'], name='audit_logs_created_id_idx'),
+            # Entity history and per-user activity, newest first
+            models.Index(fields=['entity_type', 'entity_id', '-created_at', '-id'], name='audit_logs_entity_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='audit_logs_user_idx'),
+        ]
     
     def __str__(self):
         return f"{self.action} by {self.user} at {self.created_at}"
 
 
 class PublicReport(models.Model):
+    REFERENCE_PREFIX = 'PUB'
+
     reference_number = models.CharField(max_length=20, unique=True, editable=False)
     incident = models.OneToOneField(Incident, on_delete=models.CASCADE, null=True, blank=True, related_name='public_report')
     
@@ -164,11 +332,48 @@ class PublicReport(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.reference_number:
-            from datetime import datetime
-            year = datetime.now().year
-            count = PublicReport.objects.filter(reference_number__startswith=f'PUB-{year}').count() + 1
-            self.reference_number = f'PUB-{year}-{count:05d}'
+            self.reference_number = ReferenceSequence.next_reference(self.REFERENCE_PREFIX)
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.reference_number}"
+
+
+class ExportJob(models.Model):
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='export_jobs')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    compress = models.BooleanField(default=False)
+    filters = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    file = models.FileField(upload_to='exports/%Y/%m/%d/', blank=True)
+    row_count = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'export_jobs'
+        ordering = ['-created_at']
+
+    @property
+    def filename(self):
+        extension = self.format + ('.gz' if self.compress else '')
+        return f'incidents_export_{self.pk}.{extension}'
+
+    def __str__(self):
+        return f"Export {self.pk} ({self.format}, {self.status})"
@@ -0,0 +1,139 @@
+"""Full-text search over incidents.
+
+Each incident gets one search document built from its reference number,
+title, description, location and notes:
+
+* PostgreSQL: a weighted ``tsvector`` in the ``incident_search`` table with a
+  GIN index, ranked with ``ts_rank``.
+* SQLite: an FTS5 virtual table ``incident_search`` keyed by incident id,
+  ranked with ``bm25``.
+
+The table is created by migrations and has no foreign key to incidents, so
+``flush`` can truncate incidents. Documents are kept current, and removed
+with their incident, by the signals in ``incidents.signals``; bulk loads
+call ``rebuild()``. Other backends fall back to ``icontains``.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+SEARCH_TABLE = 'incident_search'
+
+# Incident fields that feed the search document
+SEARCH_FIELDS = ['title', 'description', 'location_building', 'location_floor', 'location_details']
+
+_SQLITE_SOURCE = """
+    SELECT i.id, i.reference_number, i.title, i.description,
+           i.location_building || ' ' || i.location_floor || ' ' || i.location_details,
+           COALESCE((SELECT group_concat(n.note, ' ') FROM incident_notes n WHERE n.incident_id = i.id), '')
+    FROM incidents i
+"""
+
+_POSTGRES_SOURCE = """
+    SELECT i.id,
+           setweight(to_tsvector('simple', i.reference_number), 'A') ||
+           setweight(to_tsvector('english', i.title), 'A') ||
+           setweight(to_tsvector('english', i.description), 'B') ||
+           setweight(to_tsvector('english', concat_ws(' ', i.location_building, i.location_floor, i.location_details)), 'C') ||
+           setweight(to_tsvector('english', COALESCE(
+               (SELECT string_agg(n.note, ' ') FROM incident_notes n WHERE n.incident_id = i.id), ''
+           )), 'D')
+    FROM incidents i
+"""
+
+
+def is_available(using=connection):
+    if using.vendor not in ('postgresql', 'sqlite'):
+        return False
+    if not hasattr(using, '_incident_search_available'):
+        using._incident_search_available = SEARCH_TABLE in using.introspection.table_names()
+    return using._incident_search_available
+
+
+def index_incident(incident_id, using=connection):
+    """(Re)build the search document for one incident from the database."""
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        if using.vendor == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (incident_id, document) {_POSTGRES_SOURCE} WHERE i.id = %s "
+                "ON CONFLICT (incident_id) DO UPDATE SET document = EXCLUDED.document",
+                [incident_id]
+            )
+        else:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [incident_id])
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, reference_number, title, description, location, notes) "
+                f"{_SQLITE_SOURCE} WHERE i.id = %s",
+                [incident_id]
+            )
+
+
+def remove_incident(incident_id, using=connection):
+    if not is_available(using):
+        return
+    column = 'incident_id' if using.vendor == 'postgresql' else 'rowid'
+    with using.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {column} = %s", [incident_id])
+
+
+def rebuild(using=connection):
+    """Rebuild every search document in one pass (after bulk loads)."""
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        if using.vendor == 'postgresql':
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} (incident_id, document) {_POSTGRES_SOURCE}")
+        else:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, reference_number, title, description, location, notes) "
+                f"{_SQLITE_SOURCE}"
+            )
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def apply(queryset, query):
+    """Filter ``queryset`` to incidents matching ``query``, most relevant first.
+
+    Every term must match, each as a word prefix so search-as-you-type works.
+    Reference numbers also match by prefix.
+    """
+    terms = _terms(query)
+    if not terms or not is_available():
+        return queryset.filter(
+            Q(reference_number__icontains=query) |
+            Q(title__icontains=query) |
+            Q(description__icontains=query)
+        )
+
+    if connection.vendor == 'postgresql':
+        match = ' & '.join(f'{term}:*' for term in terms)
+        matches = RawSQL(
+            f"SELECT incident_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('english', %s)", [match]
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank(document, to_tsquery('english', %s)) FROM {SEARCH_TABLE} "
+            f"WHERE incident_id = incidents.id", [match]
+        )
+    else:
+        match = ' '.join(f'"{term}"*' for term in terms)
+        matches = RawSQL(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match])
+        # bm25 is lower-is-better; column weights favour reference number and title
+        rank = RawSQL(
+            f"SELECT -bm25({SEARCH_TABLE}, 10.0, 5.0, 1.0, 2.0, 1.0) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rowid = incidents.id", [match]
+        )
+
+    return queryset.filter(
+        Q(id__in=matches) | Q(reference_number__startswith=query.strip().upper())
+    ).annotate(
+        search_rank=Coalesce(rank, Value(0.0), output_field=FloatField())
+    ).order_by('-search_rank', '-created_at')
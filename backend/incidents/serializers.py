@@ -1,15 +1,30 @@
 from rest_framework import serializers
-from .models import Incident, IncidentNote, Evidence, AuditLog, PublicReport
+from .models import Incident, IncidentNote, Evidence, AuditLog, PublicReport, ExportJob
+from . import downloads
+from .filters import INCIDENT_FILTERS
+from django.urls import reverse
 from users.serializers import UserSerializer
 
 class EvidenceSerializer(serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.full_name', read_only=True)
+    file = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
     
     class Meta:
         model = Evidence
-        fields = ['id', 'file', 'file_type', 'file_size', 'description', 
+        fields = ['id', 'file', 'thumbnail', 'file_type', 'file_size', 'description', 
                   'uploaded_by', 'uploaded_by_name', 'uploaded_at']
         read_only_fields = ['id', 'uploaded_by', 'uploaded_at', 'file_size', 'file_type']
+    
+    # Signed, so <img> tags and new tabs can load it without a token
+    def get_file(self, obj):
+        return downloads.signed_url(obj, 'file', self.context.get('request'))
+    
+    # Null until the background worker has rendered it, and for PDFs
+    def get_thumbnail(self, obj):
+        if obj.blob is None or not obj.blob.thumbnail:
+            return None
+        return downloads.signed_url(obj, 'thumbnail', self.context.get('request'))
 
 
 class IncidentNoteSerializer(serializers.ModelSerializer):
@@ -21,6 +36,16 @@ class IncidentNoteSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at']
 
 
+class EvidenceSyncSerializer(EvidenceSerializer):
+    class Meta(EvidenceSerializer.Meta):
+        fields = EvidenceSerializer.Meta.fields + ['incident', 'updated_at']
+
+
+class IncidentNoteSyncSerializer(IncidentNoteSerializer):
+    class Meta(IncidentNoteSerializer.Meta):
+        fields = IncidentNoteSerializer.Meta.fields + ['incident', 'updated_at']
+
+
 class IncidentListSerializer(serializers.ModelSerializer):
     reported_by_name = serializers.CharField(source='reported_by.full_name', read_only=True)
     assigned_to_name = serializers.CharField(source='assigned_to.full_name', read_only=True)
@@ -33,10 +58,16 @@ class IncidentListSerializer(serializers.ModelSerializer):
                   'status', 'severity', 'reported_by_name', 'assigned_to_name', 
                   'created_at', 'evidence_count', 'notes_count', 'is_public_report']
     
+    # Views annotate these counts in SQL; fall back to a query only when a
+    # caller passes an unannotated instance.
     def get_evidence_count(self, obj):
+        if hasattr(obj, 'evidence_count'):
+            return obj.evidence_count
         return obj.evidence.count()
     
     def get_notes_count(self, obj):
+        if hasattr(obj, 'notes_count'):
+            return obj.notes_count
         return obj.notes.count()
 
 
@@ -60,6 +91,16 @@ class IncidentDetailSerializer(serializers.ModelSerializer):
         return None
 
 
+class IncidentSyncSerializer(serializers.ModelSerializer):
+    """Flat incident rows for delta sync; notes and evidence sync separately."""
+    reported_by_name = serializers.CharField(source='reported_by.full_name', read_only=True)
+    assigned_to_name = serializers.CharField(source='assigned_to.full_name', read_only=True)
+
+    class Meta:
+        model = Incident
+        fields = '__all__'
+
+
 class IncidentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Incident
@@ -113,3 +154,27 @@ class AuditLogSerializer(serializers.ModelSerializer):
         model = AuditLog
         fields = '__all__'
         read_only_fields = ['id', 'created_at']
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'format', 'compress', 'filters', 'status', 'row_count', 'error',
+                  'created_at', 'started_at', 'finished_at', 'download_url']
+        read_only_fields = ['id', 'status', 'row_count', 'error', 'created_at',
+                            'started_at', 'finished_at']
+    
+    def validate_filters(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Filters must be an object.")
+        unknown = set(value) - set(INCIDENT_FILTERS)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown filters: {', '.join(sorted(unknown))}")
+        return value
+    
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        return reverse('export-download', args=[obj.pk])
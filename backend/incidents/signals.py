@@ -1,23 +1,17 @@
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.forms.models import model_to_dict
-from .models import Incident, IncidentNote, Evidence, AuditLog
+from django.utils import timezone
+from .models import Incident, IncidentNote, Evidence, Tombstone
+from . import audit
+from . import cache as incident_cache
+from . import search as incident_search
+from . import events
+from . import uploads
 from django.contrib.auth import get_user_model
 from incident_system.middleware import get_current_user, get_current_ip
 
 User = get_user_model()
 
-@receiver(pre_save, sender=Incident)
-@receiver(pre_save, sender=User)
-def capture_previous_state(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            instance._old_instance = sender.objects.get(pk=instance.pk)
-        except sender.DoesNotExist:
-            instance._old_instance = None
-    else:
-        instance._old_instance = None
-
 @receiver(post_save, sender=Incident)
 @receiver(post_save, sender=User)
 @receiver(post_save, sender=IncidentNote)
@@ -36,19 +30,13 @@ def log_save(sender, instance, created, **kwargs):
     #     return
 
     changes = {}
-    if not created and hasattr(instance, '_old_instance') and instance._old_instance:
-        old_dict = model_to_dict(instance._old_instance)
-        new_dict = model_to_dict(instance)
-        
-        for field, value in new_dict.items():
-            if field in ['password', 'last_login']: # Ignore sensitive or noise fields
-                continue
-            old_value = old_dict.get(field)
-            if value != old_value:
-                changes[field] = {
-                    'old': str(old_value),
-                    'new': str(value)
-                }
+    if not created and hasattr(instance, 'tracked_changes'):
+        # Diffed against the values snapshotted at load time; no extra query
+        for field, (old_value, value) in instance.tracked_changes().items():
+            changes[field] = {
+                'old': str(old_value),
+                'new': str(value)
+            }
     
     # If update but no changes, skip logging
     if action == 'update' and not changes:
@@ -57,14 +45,15 @@ def log_save(sender, instance, created, **kwargs):
     name = getattr(instance, 'username', getattr(instance, 'reference_number', str(instance.pk)))
     description = f"{action.capitalize()}d {sender.__name__}: {name}"
 
-    AuditLog.objects.create(
-        user=user if user and not user.is_anonymous else None,
+    audit.record(
+        user=user,
         action=action,
         entity_type=sender.__name__.lower(),
         entity_id=instance.id,
         description=description,
-        changes=changes if changes else None,
-        ip_address=ip
+        changes=changes,
+        ip_address=ip,
+        primary=False
     )
 
 @receiver(post_delete, sender=Incident)
@@ -75,11 +64,113 @@ def log_delete(sender, instance, **kwargs):
     
     name = getattr(instance, 'username', getattr(instance, 'reference_number', str(instance.pk)))
     
-    AuditLog.objects.create(
-        user=user if user and not user.is_anonymous else None,
+    audit.record(
+        user=user,
         action='delete',
         entity_type=sender.__name__.lower(),
         entity_id=instance.id,
         description=f"Deleted {sender.__name__}: {name}",
-        ip_address=ip
+        ip_address=ip,
+        primary=False
+    )
+
+@receiver(post_save, sender=Incident)
+@receiver(post_delete, sender=Incident)
+def invalidate_incident_cache(sender, instance, **kwargs):
+    incident_cache.invalidate()
+
+@receiver(post_save, sender=IncidentNote)
+@receiver(post_delete, sender=IncidentNote)
+@receiver(post_save, sender=Evidence)
+@receiver(post_delete, sender=Evidence)
+def invalidate_incident_activity(sender, instance, **kwargs):
+    incident_cache.invalidate_activity()
+
+@receiver(post_save, sender=User)
+def invalidate_user_details(sender, instance, created, **kwargs):
+    # Incidents, notes and analytics all show user names
+    if not created and instance.tracked_changes():
+        incident_cache.invalidate()
+        incident_cache.invalidate_activity()
+
+@receiver(post_save, sender=Incident)
+def index_incident(sender, instance, created, **kwargs):
+    changed = instance.tracked_changes()
+    if created or any(field in changed for field in incident_search.SEARCH_FIELDS):
+        incident_search.index_incident(instance.id)
+
+@receiver(post_delete, sender=Incident)
+def unindex_incident(sender, instance, **kwargs):
+    incident_search.remove_incident(instance.id)
+
+@receiver(post_save, sender=IncidentNote)
+@receiver(post_delete, sender=IncidentNote)
+def reindex_note_incident(sender, instance, **kwargs):
+    incident_search.index_incident(instance.incident_id)
+
+@receiver(post_save, sender=Incident)
+def publish_incident_event(sender, instance, created, **kwargs):
+    changed = instance.tracked_changes()
+    if created:
+        event_type = 'incident.created'
+    elif 'assigned_to' in changed:
+        event_type = 'incident.assigned'
+    elif 'status' in changed:
+        event_type = 'incident.status_changed'
+    elif changed:
+        event_type = 'incident.updated'
+    else:
+        return
+    # The previous assignee also needs to hear that it moved away from them
+    previous = [changed['assigned_to'][0]] if 'assigned_to' in changed else []
+    events.publish_on_commit(event_type, instance, audience=previous)
+
+@receiver(post_delete, sender=Incident)
+def publish_incident_deleted(sender, instance, **kwargs):
+    events.publish_on_commit('incident.deleted', instance)
+
+@receiver(post_save, sender=IncidentNote)
+def publish_note_event(sender, instance, created, **kwargs):
+    if created:
+        events.publish_on_commit('incident.note_added', instance.incident)
+
+@receiver(post_delete, sender=Incident)
+def tombstone_incident(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        entity_type='incident', entity_id=instance.id, incident_id=instance.id,
+        reporter_id=instance.reported_by_id, assignee_id=instance.assigned_to_id
+    )
+
+@receiver(post_delete, sender=IncidentNote)
+@receiver(post_delete, sender=Evidence)
+def tombstone_incident_row(sender, instance, origin=None, **kwargs):
+    # Deleted along with their incident, whose tombstone covers them
+    if isinstance(origin, Incident) or getattr(origin, 'model', None) is Incident:
+        return
+    people = Incident.objects.filter(pk=instance.incident_id)\
+        .values_list('reported_by_id', 'assigned_to_id').first() or (None, None)
+    Tombstone.objects.create(
+        entity_type='note' if sender is IncidentNote else 'evidence', entity_id=instance.id,
+        incident_id=instance.incident_id, reporter_id=people[0], assignee_id=people[1]
     )
+
+@receiver(post_save, sender=Incident)
+def sync_reassignment(sender, instance, created, **kwargs):
+    changed = instance.tracked_changes()
+    if created or 'assigned_to' not in changed:
+        return
+    # The previous assignee loses sight of it unless they reported it
+    previous = changed['assigned_to'][0]
+    if previous is not None and previous != instance.reported_by_id:
+        Tombstone.objects.create(
+            entity_type='incident', entity_id=instance.id, incident_id=instance.id, user_id=previous
+        )
+    # The new assignee's next sync must bring the existing notes and evidence too
+    now = timezone.now()
+    IncidentNote.objects.filter(incident=instance).update(updated_at=now)
+    Evidence.objects.filter(incident=instance).update(updated_at=now)
+
+@receiver(post_delete, sender=Evidence)
+def release_evidence_blob(sender, instance, **kwargs):
+    if instance.blob_id is not None:
+        uploads.release_blob(instance.blob_id)
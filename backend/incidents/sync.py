@@ -0,0 +1,119 @@
+"""Delta sync for offline-capable clients.
+
+A client first calls without a token and receives every incident in its
+scope with their notes and evidence. Each response carries a signed token;
+sending it back returns only the rows created or updated since, and the ids
+of rows deleted or moved out of the client's scope (from Tombstone).
+
+Each kind of row is read in (timestamp, id) order from its own cursor, at
+most SYNC_PAGE_SIZE per call, and ``has_more`` tells the client to call
+again straight away. A caught-up cursor resumes SYNC_OVERLAP_SECONDS before
+the request started, because a transaction that commits late carries an
+earlier updated_at; clients apply rows by id, so repeats are harmless.
+
+Evidence rows carry signed URLs that expire, and an unchanged row is never
+sent again. The token records the URL window the client's evidence was
+signed in, and once half of EVIDENCE_URL_LIFETIME has passed the evidence
+cursor starts over, so every row in scope comes back with fresh URLs.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from . import downloads
+from .models import Tombstone
+
+SALT = 'incidents.sync'
+KINDS = ('incidents', 'notes', 'evidence', 'deleted')
+
+
+def overlap_start(started):
+    return (started - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS), 0)
+
+
+def initial_cursors(started):
+    """Everything in scope, and only deletions from now on."""
+    return {'incidents': None, 'notes': None, 'evidence': None, 'deleted': overlap_start(started)}
+
+
+def load_token(token, user):
+    """The cursors and URL window saved in ``token``, or None when it is too old to resume from."""
+    max_age = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=max_age)
+    except signing.SignatureExpired:
+        # The tombstones it would need may have been pruned
+        return None
+    except signing.BadSignature:
+        raise ValidationError({'token': 'Invalid sync token.'})
+    if payload.get('user') != user.id:
+        raise ValidationError({'token': 'Invalid sync token.'})
+    cursors = {
+        kind: (datetime.fromisoformat(cursor[0]), cursor[1]) if cursor else None
+        for kind, cursor in payload['cursors'].items()
+    }
+    # Tokens issued before the window was recorded get their URLs refreshed
+    return cursors, payload.get('window', 0)
+
+
+def refresh_evidence(cursors, window):
+    """Restart the evidence cursor if the URLs signed in ``window`` are half way to expiring.
+
+    Returns the window the client's evidence URLs now belong to.
+    """
+    current = downloads.url_window()
+    if current - window < max(settings.EVIDENCE_URL_LIFETIME // downloads.URL_WINDOW // 2, 1):
+        return window
+    cursors['evidence'] = None
+    return current
+
+
+def dump_token(user, cursors, window):
+    return signing.dumps({
+        'user': user.id,
+        'window': window,
+        'cursors': {
+            kind: [cursor[0].isoformat(), cursor[1]] if cursor else None
+            for kind, cursor in cursors.items()
+        },
+    }, salt=SALT, compress=True)
+
+
+def read_page(queryset, field, cursor, started):
+    """One page of ``queryset`` after ``cursor`` in (``field``, id) order.
+
+    Returns the rows, the cursor to resume from and whether more rows remain.
+    """
+    if cursor is not None:
+        moment, last_id = cursor
+        queryset = queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': last_id}))
+    rows = list(queryset.order_by(field, 'id')[:settings.SYNC_PAGE_SIZE + 1])
+    if len(rows) > settings.SYNC_PAGE_SIZE:
+        rows = rows[:settings.SYNC_PAGE_SIZE]
+        return rows, (getattr(rows[-1], field), rows[-1].id), True
+    # Caught up: step back into the overlap window, but never behind the cursor
+    resume = overlap_start(started)
+    if cursor is not None and cursor > resume:
+        resume = cursor
+    return rows, resume, False
+
+
+def scope_related(queryset, user):
+    """Notes or evidence on incidents visible to ``user``, as filters.scope_incidents."""
+    if user.role not in ['supervisor', 'head', 'admin']:
+        queryset = queryset.filter(Q(incident__assigned_to=user) | Q(incident__reported_by=user))
+    return queryset
+
+
+def scope_tombstones(user):
+    """Tombstones for rows ``user`` could see."""
+    queryset = Tombstone.objects.all()
+    if user.role in ['supervisor', 'head', 'admin']:
+        # Reassignments never hide anything from them
+        return queryset.filter(user__isnull=True)
+    return queryset.filter(
+        Q(user=user) | Q(user__isnull=True) & (Q(reporter_id=user.id) | Q(assignee_id=user.id))
+    )
@@ -1,9 +1,39 @@
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from django.test import AsyncClient, LiveServerTestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from .models import Incident, PublicReport, AuditLog
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.core.cache import caches
+from rest_framework.throttling import AnonRateThrottle
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+import asyncio
+import hashlib
+import os
+from unittest import mock, skipUnless
+import tempfile
+import gzip
+import json
+import csv
+import io
+import time
+from datetime import timedelta
+import re
+from django.db.models import F, Sum
+from .models import Incident, IncidentNote, Evidence, PublicReport, AuditLog, ReferenceSequence, ExportJob, Tombstone, EvidenceBlob
+from analytics.models import DailyIncidentRollup
+from . import audit
+from . import search as incident_search
+from .audit import BufferedAuditSink
+from . import cache as incident_cache
+from . import events
+from asgiref.sync import sync_to_async
+from PIL import Image
+from incident_system import instrumentation, metrics
 
 User = get_user_model()
 
@@ -56,6 +86,973 @@ class IncidentTests(APITestCase):
         self.assertIsNotNone(audit)
         self.assertIn('Assigned incident', audit.description)
 
+class IncidentQueryCountTests(APITestCase):
+    def setUp(self):
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+
+    def create_incidents(self, count):
+        for i in range(count):
+            incident = Incident.objects.create(
+                incident_type='theft', title=f'Theft {i}', description='Laptop stolen',
+                location_building='Library', reported_by=self.guard, assigned_to=self.guard
+            )
+            IncidentNote.objects.create(incident=incident, user=self.guard, note='Checked CCTV')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+
+    def test_list_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.supervisor)
+        url = reverse('incident-list')
+        self.create_incidents(2)
+        small, _ = self.count_queries(url)
+        self.create_incidents(15)
+        large, response = self.count_queries(url)
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['results'][0]['notes_count'], 1)
+        self.assertEqual(response.data['results'][0]['evidence_count'], 0)
+
+    def test_my_incidents_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.guard)
+        url = reverse('incident-my-incidents')
+        self.create_incidents(2)
+        small, _ = self.count_queries(url)
+        self.create_incidents(15)
+        large, response = self.count_queries(url)
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data), 17)
+
+    def test_detail_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.supervisor)
+        self.create_incidents(1)
+        incident = Incident.objects.get()
+        url = reverse('incident-detail', args=[incident.id])
+        small, _ = self.count_queries(url)
+
+        officers = [
+            User.objects.create_user(username=f'officer{i}', password='password', full_name=f'Officer {i}')
+            for i in range(5)
+        ]
+        IncidentNote.objects.bulk_create([
+            IncidentNote(incident=incident, user=officers[i % 5], note=f'Note {i}') for i in range(200)
+        ])
+        Evidence.objects.bulk_create([
+            Evidence(incident=incident, file=f'evidence/photo{i}.jpg', file_type='jpeg',
+                     file_size=1024, uploaded_by=officers[i % 5])
+            for i in range(50)
+        ])
+        large, response = self.count_queries(url)
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['notes']), 201)
+        self.assertEqual(len(response.data['evidence']), 50)
+
+    def test_close_response_includes_resolution_note(self):
+        self.client.force_authenticate(user=self.supervisor)
+        self.create_incidents(1)
+        incident = Incident.objects.get()
+        url = reverse('incident-close', args=[incident.id])
+        response = self.client.post(url, {'resolution_note': 'Recovered'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['notes'][-1]['note'], 'RESOLUTION: Recovered')
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        for i in range(5):
+            Incident.objects.create(
+                incident_type='theft', title=f'Theft {i}', description='Laptop stolen',
+                location_building='Library', location_floor='2', reported_by=self.guard,
+                status='pending' if i % 2 else 'resolved'
+            )
+        Incident.objects.create(
+            incident_type='noise', title='Public, "quoted"', description='Loud', location_building='Hostel'
+        )
+        self.client.force_authenticate(user=self.supervisor)
+
+    def export(self, **params):
+        response = self.client.get(reverse('incident-export-incidents'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(body)))
+
+    def test_export_streams_all_rows(self):
+        rows = self.export()
+        self.assertEqual(rows[0][0], 'Ref Number')
+        self.assertEqual(len(rows), 7)
+        public = next(row for row in rows if row[2] == 'noise')
+        self.assertEqual(public[1], 'Public, "quoted"')
+        self.assertEqual(public[6:8], ['System/Public', 'Unassigned'])
+        theft = next(row for row in rows if row[2] == 'theft')
+        self.assertEqual(theft[5:7], ['Library - 2', 'Guard'])
+
+    def test_export_honours_list_filters(self):
+        rows = self.export(status='pending', type='theft')
+        self.assertEqual(len(rows), 3)
+
+
+class ExportJobTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = self.settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        for i in range(3):
+            incident = Incident.objects.create(
+                incident_type='theft' if i else 'noise', title=f'Incident {i}', description='Details',
+                location_building='Library', reported_by=self.supervisor
+            )
+            IncidentNote.objects.create(incident=incident, user=self.supervisor, note=f'Note {i}')
+        self.client.force_authenticate(user=self.supervisor)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def run_export(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('export-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        job = self.client.get(reverse('export-detail', args=[response.data['id']])).data
+        self.assertEqual(job['status'], 'completed')
+        download = self.client.get(job['download_url'])
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        return job, b''.join(download.streaming_content)
+
+    def test_jsonl_export_includes_notes(self):
+        job, body = self.run_export(format='jsonl', filters={'type': 'theft'})
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(job['row_count'], 2)
+        self.assertEqual({record['incident_type'] for record in records}, {'theft'})
+        self.assertEqual(len(records[0]['notes']), 1)
+
+    def test_gzip_csv_export(self):
+        job, body = self.run_export(format='csv', compress=True)
+        rows = list(csv.reader(io.StringIO(gzip.decompress(body).decode())))
+        self.assertEqual(rows[0][0], 'Ref Number')
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][-2], '1')
+
+    def test_unknown_filters_are_rejected(self):
+        response = self.client.post(reverse('export-list'), {'filters': {'colour': 'red'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_download_before_completion_conflicts(self):
+        job = ExportJob.objects.create(created_by=self.supervisor)
+        response = self.client.get(reverse('export-download', args=[job.pk]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_jobs_lost_with_their_worker_are_failed_when_polled(self):
+        stale = timezone.now() - timedelta(hours=2)
+        pending = ExportJob.objects.create(created_by=self.supervisor)
+        running = ExportJob.objects.create(created_by=self.supervisor, status='running', started_at=stale)
+        ExportJob.objects.filter(pk=pending.pk).update(created_at=stale)
+        fresh = ExportJob.objects.create(created_by=self.supervisor, status='running', started_at=timezone.now())
+
+        response = self.client.get(reverse('export-detail', args=[pending.pk]))
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertIn('interrupted', response.data['error'])
+        running.refresh_from_db()
+        self.assertEqual(running.status, 'failed')
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, 'running')
+
+
+class DashboardStatsTests(APITestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        for incident_type, severity, status_value in [
+            ('theft', 'high', 'pending'), ('theft', 'low', 'resolved'), ('noise', 'low', 'assigned'),
+        ]:
+            Incident.objects.create(
+                incident_type=incident_type, title='Test', description='Test',
+                location_building='Library', severity=severity, status=status_value
+            )
+        self.client.force_authenticate(user=self.supervisor)
+        self.url = reverse('incident-dashboard-stats')
+
+    def test_stats_are_computed_in_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['pending'], 1)
+        self.assertEqual(response.data['resolved'], 1)
+        self.assertEqual(response.data['in_progress'], 0)
+        self.assertEqual(response.data['by_type'], {'theft': 2, 'noise': 1})
+        self.assertEqual(response.data['by_severity'], {'high': 1, 'low': 2})
+
+    def test_stats_are_cached_until_an_incident_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Incident.objects.create(
+                incident_type='noise', title='Test', description='Test', location_building='Library'
+            )
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['total'], 4)
+
+    def test_versions_and_payloads_use_the_shared_cache(self):
+        self.client.get(self.url)
+        self.assertIsNotNone(caches['shared'].get(incident_cache.VERSION_KEY))
+        # Throttle histories and the like stay in the per-process default cache
+        self.assertIsNone(caches['default'].get(incident_cache.VERSION_KEY))
+
+    def test_lost_version_does_not_revive_old_entries(self):
+        self.client.get(self.url)
+        # Culled, or the cache was restarted, while old entries survived
+        incident_cache.cache.delete(incident_cache.VERSION_KEY)
+        Incident.objects.create(
+            incident_type='noise', title='Test', description='Test', location_building='Library'
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['total'], 4)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        self.incident = Incident.objects.create(
+            incident_type='theft', title='Test', description='Test',
+            location_building='Library', assigned_to=self.guard
+        )
+        self.client.force_authenticate(user=self.supervisor)
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_list_not_modified_until_an_incident_changes(self):
+        url = reverse('incident-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        # No page query and no serializing
+        with self.assertNumQueries(0):
+            response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        # Another filter is another representation
+        self.assertEqual(self.revalidate(url + '?status=resolved', etag).status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.incident.status = 'resolved'
+            self.incident.save()
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_when_an_incident_leaves_the_scope(self):
+        url = reverse('incident-list')
+        self.client.force_authenticate(user=self.guard)
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.incident.assigned_to = None
+            self.incident.save()
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_detail_not_modified_until_a_note_is_added(self):
+        url = reverse('incident-detail', args=[self.incident.id])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('incident-add-note', args=[self.incident.id]), {'note': 'On scene'})
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['notes']), 1)
+
+    def test_etags_change_when_evidence_urls_are_re_signed(self):
+        for url in [reverse('incident-list'), reverse('incident-detail', args=[self.incident.id])]:
+            etag = self.client.get(url)['ETag']
+            with mock.patch('incidents.downloads.time.time', return_value=time.time() + 3600):
+                self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_200_OK)
+
+    def test_detail_outside_scope_is_not_found(self):
+        other = Incident.objects.create(
+            incident_type='theft', title='Test', description='Test', location_building='Library'
+        )
+        self.client.force_authenticate(user=self.guard)
+        response = self.revalidate(reverse('incident-detail', args=[other.id]), '*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_dashboard_stats_not_modified(self):
+        url = reverse('incident-dashboard-stats')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.supervisor.full_name = 'Renamed'
+            self.supervisor.save()
+        self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_200_OK)
+
+    def test_public_report_status_not_modified(self):
+        report = PublicReport.objects.create(
+            incident=self.incident, incident_type='theft', description='Test', location_building='Library'
+        )
+        url = reverse('public-report-status', args=[report.reference_number])
+        self.client.force_authenticate(user=None)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        Incident.objects.filter(pk=self.incident.pk).update(status='resolved')
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['incident_status'], 'resolved')
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class DeltaSyncTests(APITestCase):
+    def setUp(self):
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        self.other_guard = User.objects.create_user(
+            username='other', password='password', role='guard', full_name='Other Guard'
+        )
+        self.incident = self.create_incident(assigned_to=self.guard)
+        self.note = IncidentNote.objects.create(incident=self.incident, user=self.guard, note='On scene')
+        self.hidden = self.create_incident(assigned_to=self.other_guard)
+        self.url = reverse('incident-sync')
+
+    def create_incident(self, **kwargs):
+        return Incident.objects.create(
+            incident_type='theft', title='Test', description='Test', location_building='Library', **kwargs
+        )
+
+    def sync(self, user, token=None):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url, {'token': token} if token else {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def ids(self, rows):
+        return [row['id'] for row in rows]
+
+    def test_initial_sync_returns_the_scope(self):
+        data = self.sync(self.guard)
+        self.assertTrue(data['reset'])
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.ids(data['incidents']), [self.incident.id])
+        self.assertEqual(data['notes'][0]['incident'], self.incident.id)
+        self.assertEqual(data['deleted'], {'incidents': [], 'notes': [], 'evidence': []})
+        self.assertEqual(len(self.sync(self.supervisor)['incidents']), 2)
+
+    def test_delta_only_returns_changes(self):
+        token = self.sync(self.guard)['token']
+        data = self.sync(self.guard, token)
+        self.assertFalse(data['reset'])
+        self.assertEqual((data['incidents'], data['notes']), ([], []))
+
+        note = IncidentNote.objects.create(incident=self.incident, user=self.guard, note='Resolved')
+        self.hidden.status = 'resolved'
+        self.hidden.save()
+        data = self.sync(self.guard, data['token'])
+        self.assertEqual(data['incidents'], [])
+        self.assertEqual(self.ids(data['notes']), [note.id])
+
+    def test_deletions_are_reported(self):
+        token = self.sync(self.guard)['token']
+        other_token = self.sync(self.other_guard)['token']
+        incident_id, note_id = self.incident.id, self.note.id
+        self.note.delete()
+        self.incident.delete()
+        data = self.sync(self.guard, token)
+        self.assertEqual(data['deleted']['incidents'], [incident_id])
+        self.assertEqual(data['deleted']['notes'], [note_id])
+        # The other guard never saw either
+        self.assertEqual(self.sync(self.other_guard, other_token)['deleted']['incidents'], [])
+
+    def test_reassignment_moves_the_incident_and_its_notes(self):
+        guard_token = self.sync(self.guard)['token']
+        other_token = self.sync(self.other_guard)['token']
+        self.incident.assigned_to = self.other_guard
+        self.incident.save()
+
+        data = self.sync(self.guard, guard_token)
+        self.assertEqual(data['deleted']['incidents'], [self.incident.id])
+        self.assertEqual(data['incidents'], [])
+        data = self.sync(self.other_guard, other_token)
+        self.assertEqual(self.ids(data['incidents']), [self.incident.id])
+        self.assertEqual(self.ids(data['notes']), [self.note.id])
+        # Supervisors keep seeing it
+        supervisor_token = self.sync(self.supervisor)['token']
+        self.incident.assigned_to = self.guard
+        self.incident.save()
+        self.assertEqual(self.sync(self.supervisor, supervisor_token)['deleted']['incidents'], [])
+
+    @override_settings(SYNC_PAGE_SIZE=1)
+    def test_pages_until_caught_up(self):
+        self.create_incident(reported_by=self.guard)
+        first = self.sync(self.guard)
+        self.assertTrue(first['has_more'])
+        second = self.sync(self.guard, first['token'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(len(first['incidents'] + second['incidents']), 2)
+
+    def test_invalid_and_expired_tokens(self):
+        token = self.sync(self.guard)['token']
+        self.client.force_authenticate(user=self.guard)
+        self.assertEqual(self.client.get(self.url, {'token': token + 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.other_guard)
+        self.assertEqual(self.client.get(self.url, {'token': token}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        later = time.time() + 31 * 24 * 3600
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            data = self.sync(self.guard, token)
+        self.assertTrue(data['reset'])
+        self.assertEqual(self.ids(data['incidents']), [self.incident.id])
+
+    def test_evidence_urls_are_reissued_before_they_expire(self):
+        evidence = Evidence.objects.create(
+            incident=self.incident, file='evidence/photo.jpg', file_type='image', file_size=1, uploaded_by=self.guard
+        )
+        token = self.sync(self.guard)['token']
+        self.assertEqual(self.sync(self.guard, token)['evidence'], [])
+
+        later = time.time() + 13 * 3600
+        with mock.patch('incidents.downloads.time.time', return_value=later):
+            data = self.sync(self.guard, token)
+            self.assertEqual(self.ids(data['evidence']), [evidence.id])
+            # Once per refresh, not on every call
+            self.assertEqual(self.sync(self.guard, data['token'])['evidence'], [])
+        expires = int(re.search(r'expires=(\d+)', data['evidence'][0]['file']).group(1))
+        self.assertGreater(expires, later + 24 * 3600)
+
+    def test_prune_tombstones(self):
+        self.note.delete()
+        Tombstone.objects.create(entity_type='incident', entity_id=1, incident_id=1)
+        Tombstone.objects.filter(entity_type='incident').update(deleted_at=timezone.now() - timedelta(days=31))
+        call_command('prune_tombstones', stdout=io.StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('entity_type', flat=True)), ['note'])
+
+
+class EvidencePipelineTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = self.settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        self.incident = Incident.objects.create(
+            incident_type='theft', title='Test', description='Test',
+            location_building='Library', assigned_to=self.guard
+        )
+        self.client.force_authenticate(user=self.guard)
+        self.url = reverse('incident-upload-evidence', args=[self.incident.id])
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def photo(self, name='photo.jpg', content_type='image/jpeg'):
+        output = io.BytesIO()
+        Image.new('RGB', (1200, 800), (200, 30, 30)).save(output, 'JPEG')
+        return SimpleUploadedFile(name, output.getvalue(), content_type=content_type)
+
+    def upload(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, {'file': upload}, format='multipart')
+
+    def test_upload_is_hashed_and_thumbnailed(self):
+        upload = self.photo()
+        response = self.upload(upload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['file_type'], 'jpeg')
+
+        evidence = Evidence.objects.select_related('blob').get()
+        blob = evidence.blob
+        self.assertEqual(blob.sha256, hashlib.sha256(upload.file.getvalue()).hexdigest())
+        self.assertEqual(evidence.file.name, blob.file.name)
+        with Image.open(blob.thumbnail.path) as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 320)
+
+        detail = self.client.get(reverse('incident-detail', args=[self.incident.id]))
+        self.assertIn(reverse('evidence-thumbnail', args=[evidence.id]), detail.data['evidence'][0]['thumbnail'])
+
+    def test_identical_uploads_share_a_blob(self):
+        self.upload(self.photo('first.jpg'))
+        self.upload(self.photo('second.jpg'))
+        self.assertEqual(Evidence.objects.count(), 2)
+        blob = EvidenceBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        stored = [name for _, _, names in os.walk(os.path.join(self.media_root.name, 'evidence', 'blobs')) for name in names]
+        self.assertEqual(len(stored), 1)
+
+        first, second = Evidence.objects.all()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(os.path.exists(blob.file.path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(EvidenceBlob.objects.exists())
+        self.assertFalse(os.path.exists(blob.file.path))
+        self.assertFalse(os.path.exists(blob.thumbnail.path))
+
+    def test_file_of_a_deleted_blob_is_not_reused(self):
+        upload = self.photo()
+        digest = hashlib.sha256(upload.file.getvalue()).hexdigest()
+        # Left by a blob that was just deleted; its removal runs once that commits
+        stale = os.path.join(self.media_root.name, 'evidence', 'blobs', digest[:2], digest[2:4], f'{digest}.jpg')
+        os.makedirs(os.path.dirname(stale))
+        with open(stale, 'wb') as handle:
+            handle.write(upload.file.getvalue())
+
+        self.upload(upload)
+        os.remove(stale)
+        blob = EvidenceBlob.objects.get()
+        with blob.file.open('rb') as stored:
+            self.assertEqual(stored.read(), upload.file.getvalue())
+
+    def test_type_is_sniffed_from_content(self):
+        pdf = SimpleUploadedFile('scan.png', b'%PDF-1.4\n' + b'0' * 64, content_type='image/png')
+        response = self.upload(pdf)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['file_type'], 'pdf')
+        self.assertIsNone(response.data['thumbnail'])
+
+        script = SimpleUploadedFile('photo.jpg', b'#!/bin/sh\nrm -rf /\n', content_type='image/jpeg')
+        response = self.upload(script)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(EVIDENCE_MAX_UPLOAD_SIZE=1024)
+    def test_oversized_upload_is_rejected(self):
+        response = self.upload(self.photo())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'File too large (max 10MB)')
+        self.assertFalse(EvidenceBlob.objects.exists())
+
+
+class EvidenceDownloadTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = self.settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        self.other_guard = User.objects.create_user(
+            username='other', password='password', role='guard', full_name='Other'
+        )
+        self.incident = Incident.objects.create(
+            incident_type='theft', title='Test', description='Test',
+            location_building='Library', assigned_to=self.guard
+        )
+        self.client.force_authenticate(user=self.guard)
+        output = io.BytesIO()
+        Image.new('RGB', (600, 400), (30, 30, 200)).save(output, 'JPEG')
+        self.content = output.getvalue()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('incident-upload-evidence', args=[self.incident.id]),
+                {'file': SimpleUploadedFile('photo.jpg', self.content, content_type='image/jpeg')},
+                format='multipart'
+            )
+        self.evidence = Evidence.objects.select_related('blob').get(pk=response.data['id'])
+        self.file_url = response.data['file']
+        self.client.force_authenticate(user=None)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def get(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        # The test client closes the response once it is read; closing it
+        # again here would close the database connection on PostgreSQL
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_signed_url_serves_the_file(self):
+        self.assertIn(reverse('evidence-file', args=[self.evidence.id]), self.file_url)
+        response, body = self.get(self.file_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], f'"{self.evidence.blob.sha256}"')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_unsigned_requests_need_access_to_the_incident(self):
+        url = reverse('evidence-file', args=[self.evidence.id])
+        response, _ = self.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response, _ = self.get(self.file_url.replace('signature=', 'signature=x'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # A file URL's signature does not open the thumbnail
+        thumbnail_url = self.file_url.replace('/file/', '/thumbnail/')
+        response, _ = self.get(thumbnail_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.other_guard)
+        response, _ = self.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.guard)
+        response, body = self.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body, self.content)
+
+    def test_signed_url_expires(self):
+        with mock.patch('incidents.downloads.time.time', return_value=time.time() + 3 * 86400):
+            response, _ = self.get(self.file_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_range_requests(self):
+        size = len(self.content)
+        response, body = self.get(self.file_url, Range='bytes=0-9')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(body, self.content[:10])
+        self.assertEqual(response['Content-Range'], f'bytes 0-9/{size}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response, body = self.get(self.file_url, Range='bytes=-5')
+        self.assertEqual(body, self.content[-5:])
+        self.assertEqual(response['Content-Range'], f'bytes {size - 5}-{size - 1}/{size}')
+
+        response, body = self.get(self.file_url, Range='bytes=10-')
+        self.assertEqual(body, self.content[10:])
+
+        response, _ = self.get(self.file_url, Range=f'bytes={size}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+
+        # A stale If-Range gets the whole current file
+        response, body = self.get(self.file_url, Range='bytes=0-9', If_Range='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body, self.content)
+
+    def test_if_none_match_returns_304(self):
+        response, _ = self.get(self.file_url, If_None_Match=f'"{self.evidence.blob.sha256}"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_thumbnail(self):
+        self.client.force_authenticate(user=self.guard)
+        detail = self.client.get(reverse('incident-detail', args=[self.incident.id]))
+        self.client.force_authenticate(user=None)
+        response, body = self.get(detail.data['evidence'][0]['thumbnail'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        with Image.open(io.BytesIO(body)) as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 320)
+
+    def test_legacy_evidence_without_blob(self):
+        os.makedirs(os.path.join(self.media_root.name, 'evidence', '2024', '01', '01'))
+        with open(os.path.join(self.media_root.name, 'evidence', '2024', '01', '01', 'scan.pdf'), 'wb') as handle:
+            handle.write(b'%PDF-1.4 legacy')
+        legacy = Evidence.objects.create(
+            incident=self.incident, file='evidence/2024/01/01/scan.pdf', file_type='pdf',
+            file_size=15, uploaded_by=self.guard
+        )
+        self.client.force_authenticate(user=self.guard)
+        response, body = self.get(reverse('evidence-file', args=[legacy.id]))
+        self.assertEqual(body, b'%PDF-1.4 legacy')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('no-cache', response['Cache-Control'])
+        response, _ = self.get(reverse('evidence-thumbnail', args=[legacy.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(EVIDENCE_SENDFILE='x-accel-redirect', EVIDENCE_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        response, body = self.get(self.file_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body, b'')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.evidence.blob.file.name}')
+        self.assertEqual(response['ETag'], f'"{self.evidence.blob.sha256}"')
+
+    @override_settings(EVIDENCE_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        response, body = self.get(self.file_url)
+        self.assertEqual(body, b'')
+        self.assertEqual(response['X-Sendfile'], self.evidence.blob.file.path)
+
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        self.url = reverse('incident-dashboard-stats')
+
+    def test_jwt_authentication(self):
+        token = RefreshToken.for_user(self.supervisor).access_token
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['total'], 0)
+
+    def test_unauthenticated_and_forbidden(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.guard)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(reverse('incident-my-incidents')).status_code, status.HTTP_200_OK)
+
+    def test_only_get_is_allowed(self):
+        self.client.force_authenticate(user=self.supervisor)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_public_status_is_throttled(self):
+        with mock.patch.object(AnonRateThrottle, 'THROTTLE_RATES', {'anon': '2/minute', 'user': '2/minute'}):
+            url = reverse('public-report-status', args=['PUB-2026-99999'])
+            statuses = [self.client.get(url).status_code for _ in range(3)]
+        self.assertEqual(statuses, [404, 404, 429])
+
+
+@override_settings(EVENTS_HEARTBEAT_INTERVAL=0.05, EVENTS_WSGI_STREAM_TIMEOUT=0.3)
+class IncidentStreamTests(APITestCase):
+    def setUp(self):
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        self.other_guard = User.objects.create_user(
+            username='other', password='password', role='guard', full_name='Other Guard'
+        )
+        self.url = reverse('incident-stream')
+
+    def open_stream(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_events_are_filtered_by_role_scope(self):
+        streams = {user: self.open_stream(user) for user in [self.supervisor, self.guard, self.other_guard]}
+        with self.captureOnCommitCallbacks(execute=True):
+            incident = Incident.objects.create(
+                incident_type='theft', title='Test', description='Test',
+                location_building='Library', reported_by=self.supervisor,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            incident.assigned_to = self.guard
+            incident.status = 'assigned'
+            incident.save()
+
+        supervisor = self.read(streams[self.supervisor])
+        self.assertIn('event: incident.created', supervisor)
+        self.assertIn('event: incident.assigned', supervisor)
+        self.assertIn(f'"reference_number": "{incident.reference_number}"', supervisor)
+        self.assertNotIn('audience', supervisor)
+
+        guard = self.read(streams[self.guard])
+        self.assertNotIn('incident.created', guard)
+        self.assertIn('event: incident.assigned', guard)
+        self.assertNotIn('event: incident', self.read(streams[self.other_guard]))
+
+    def test_note_and_status_events(self):
+        incident = Incident.objects.create(
+            incident_type='theft', title='Test', description='Test',
+            location_building='Library', assigned_to=self.guard, status='in_progress',
+        )
+        stream = self.open_stream(self.guard)
+        self.client.force_authenticate(user=self.guard)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('incident-add-note', args=[incident.id]), {'note': 'On scene'})
+            self.client.patch(reverse('incident-detail', args=[incident.id]), {'status': 'resolved'})
+        body = self.read(stream)
+        self.assertIn('event: incident.note_added', body)
+        self.assertIn('event: incident.status_changed', body)
+        self.assertIn('"status": "resolved"', body)
+
+    def test_changes_from_other_processes_send_sync(self):
+        response = self.open_stream(self.supervisor)
+        content = iter(response.streaming_content)
+        self.assertTrue(next(content).startswith(b'retry:'))
+        # Another worker changed incidents: only the shared version moves
+        incident_cache.bump_version()
+        self.assertEqual(next(content), b'event: sync\ndata: {"type": "sync"}\n\n')
+        self.assertEqual(next(content), b': heartbeat\n\n')
+        # Closed early, as when the browser goes away. Closing sends
+        # request_finished, which would otherwise close the connection holding
+        # the test transaction on PostgreSQL.
+        with mock.patch.object(connection, 'close_if_unusable_or_obsolete'):
+            response.close()
+        self.assertFalse(events.bus._subscribers)
+
+    def test_reconnect_sends_sync(self):
+        self.client.force_authenticate(user=self.guard)
+        response = self.client.get(self.url, HTTP_LAST_EVENT_ID='41')
+        self.assertIn('retry: 3000\n\nevent: sync\n', self.read(response))
+
+    def test_ticket_query_parameter(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        # Access tokens are not accepted in the URL, where logs would record them
+        token = RefreshToken.for_user(self.guard).access_token
+        self.assertEqual(self.client.get(self.url, {'token': str(token)}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.guard)
+        ticket = self.client.get(reverse('incident-stream-ticket'))
+        self.assertEqual(ticket['Cache-Control'], 'no-store')
+        # The test client is WSGI, where browsers are told not to stream
+        self.assertFalse(ticket.data['streaming'])
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url, {'ticket': ticket.data['ticket']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(': heartbeat', self.read(response))
+
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 120):
+            response = self.client.get(self.url, {'ticket': ticket.data['ticket']})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(self.url, {'ticket': 'forged'}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_asgi_stream(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.guard).access_token))()
+        client = AsyncClient()
+        ticket = await client.get(reverse('incident-stream-ticket'), headers={'Authorization': f'Bearer {token}'})
+        ticket = json.loads(ticket.content)
+        self.assertTrue(ticket['streaming'])
+        response = await client.get(self.url, {'ticket': ticket['ticket']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = aiter(response.streaming_content)
+        self.assertTrue((await anext(content)).startswith(b'retry:'))
+
+        events.bus.publish({'type': 'incident.updated', 'incident_id': 1, 'audience': frozenset([self.other_guard.id])})
+        events.bus.publish({'type': 'incident.assigned', 'incident_id': 2, 'audience': frozenset([self.guard.id])})
+        chunk = (await anext(content)).decode()
+        self.assertIn('event: incident.assigned', chunk)
+        self.assertIn('"incident_id": 2', chunk)
+
+        # A client disconnect cancels the task streaming the response
+        pending = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertFalse(events.bus._subscribers)
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def test_reports_throughput_per_endpoint(self):
+        User.objects.create_user(username='supervisor', password='password', role='supervisor', full_name='S')
+        out = io.StringIO()
+        call_command(
+            'load_test', url=self.live_server_url, concurrency=2, duration=0.5,
+            path=['/api/incidents/my_incidents/'], stdout=out,
+        )
+        self.assertIn('/api/incidents/my_incidents/', out.getvalue())
+        self.assertRegex(out.getvalue(), r'\d+ requests in [\d.]+s')
+        self.assertRegex(out.getvalue(), r'my_incidents/\s+[1-9]\d* ok\s+0 errors')
+
+
+class IncidentSearchTests(APITestCase):
+    def setUp(self):
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.in_description = Incident.objects.create(
+            incident_type='theft', title='Missing equipment',
+            description='A projector was taken from the lecture hall',
+            location_building='Engineering Block'
+        )
+        self.in_title = Incident.objects.create(
+            incident_type='theft', title='Projector stolen',
+            description='Reported by the department secretary',
+            location_building='Library'
+        )
+        self.client.force_authenticate(user=self.supervisor)
+        self.url = reverse('incident-list')
+
+    def search(self, query):
+        response = self.client.get(self.url, {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['results']]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('projector'), [self.in_title.id, self.in_description.id])
+
+    def test_prefix_and_location_terms_match(self):
+        self.assertEqual(self.search('proj engineering'), [self.in_description.id])
+
+    def test_notes_are_indexed(self):
+        IncidentNote.objects.create(incident=self.in_title, user=self.supervisor, note='CCTV footage requested')
+        self.assertEqual(self.search('footage'), [self.in_title.id])
+
+    def test_updates_and_reference_numbers_are_searchable(self):
+        self.in_description.title = 'Broken window'
+        self.in_description.save()
+        self.assertEqual(self.search('window'), [self.in_description.id])
+        self.assertEqual(self.search(self.in_title.reference_number), [self.in_title.id])
+
+
+class SearchIndexFlushTests(TransactionTestCase):
+    # Run with DATABASE_URL pointing at PostgreSQL too: flush truncates there
+    def create_incident(self, title):
+        return Incident.objects.create(
+            incident_type='theft', title=title, description='Test', location_building='Library'
+        )
+
+    def matches(self, query):
+        return list(incident_search.apply(Incident.objects.all(), query).values_list('id', flat=True))
+
+    def test_flush_with_indexed_incidents(self):
+        self.create_incident('Projector stolen')
+        call_command('flush', interactive=False, verbosity=0)
+        self.assertFalse(Incident.objects.exists())
+        # Sequences restart, so a new incident may take the old id
+        incident = self.create_incident('Broken window')
+        self.assertEqual(self.matches('projector'), [])
+        self.assertEqual(self.matches('window'), [incident.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_search_table_has_no_foreign_key(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, incident_search.SEARCH_TABLE)
+        self.assertEqual([name for name, info in constraints.items() if info['foreign_key']], [])
+
+
 class PublicPortalTests(APITestCase):
     def test_public_report_submission(self):
         url = reverse('public-report-submit')
@@ -110,3 +1107,632 @@ class AuditLogPermissionsTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreaterEqual(len(response.data['results']), 1)
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        self.supervisor = User.objects.create_user(
+            username='super', password='password', role='supervisor', full_name='Super'
+        )
+        self.client.force_authenticate(user=self.supervisor)
+
+    def walk(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_audit_logs_are_paged_by_cursor_without_counting(self):
+        AuditLog.objects.all().delete()
+        AuditLog.objects.bulk_create([
+            AuditLog(action='login', entity_type='user', description=f'Login {i}') for i in range(45)
+        ])
+        url = reverse('auditlog-list')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        ids = self.walk(url, {})
+        expected = list(AuditLog.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_incident_list_cursor_mode_is_opt_in(self):
+        for i in range(5):
+            Incident.objects.create(
+                incident_type='theft', title=f'Test {i}', description='Test', location_building='Library'
+            )
+        url = reverse('incident-list')
+        self.assertEqual(self.client.get(url).data['count'], 5)
+
+        ids = self.walk(url, {'pagination': 'cursor', 'page_size': 2})
+        expected = list(Incident.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+class QueryPlanTests(APITestCase):
+    """EXPLAIN the main list/detail queries on seeded data and reject sequential scans."""
+    INCIDENTS = 3000
+    AUDIT_LOGS = 6000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supervisor = User.objects.create_user(
+            username='super', password='password', role='supervisor', full_name='Super'
+        )
+        cls.guards = [
+            User.objects.create_user(username=f'guard{i}', password='password', role='guard', full_name=f'Guard {i}')
+            for i in range(30)
+        ]
+        statuses = ['pending', 'assigned', 'in_progress', 'resolved', 'closed', 'closed', 'closed', 'resolved']
+        references = ReferenceSequence.reserve_references(Incident.REFERENCE_PREFIX, cls.INCIDENTS)
+        Incident.objects.bulk_create([
+            Incident(
+                reference_number=reference, incident_type='theft', title='Seeded', description='Seeded',
+                location_building='Library', status=statuses[i % len(statuses)],
+                reported_by=cls.guards[i % 30], assigned_to=cls.guards[(i + 7) % 30],
+            )
+            for i, reference in enumerate(references)
+        ], batch_size=500)
+        incident_ids = list(Incident.objects.values_list('id', flat=True))
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                user=cls.guards[i % 30], action='update', entity_type=['incident', 'user', 'evidence'][i % 3],
+                entity_id=incident_ids[i % len(incident_ids)], description='Seeded'
+            )
+            for i in range(cls.AUDIT_LOGS)
+        ], batch_size=500)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.incident = Incident.objects.filter(reported_by=cls.guards[0]).first()
+
+    def plan_problems(self, sql, sorted_by_index):
+        """Plan lines showing a full table scan, or a sort when ``sorted_by_index`` is expected."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('EXPLAIN ' + sql)
+                lines = [row[0] for row in cursor.fetchall()]
+                # Small tables (users, the empty notes and evidence) are cheapest
+                # read whole, and a few matched rows are cheapest sorted in memory
+                problems = []
+                for line in lines:
+                    sort = re.search(r'\bSort  \(cost=\S+ rows=(\d+)', line)
+                    if re.search(r'Seq Scan on (incidents|audit_logs)\b', line) or (
+                        sorted_by_index and sort and int(sort[1]) > 20
+                    ):
+                        problems.append(line)
+                return problems
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            lines = [row[-1] for row in cursor.fetchall()]
+            # "SCAN <table>" without "USING ... INDEX" reads every row
+            return [
+                line for line in lines
+                if re.fullmatch(r'SCAN (?!CONSTANT)\S+', line) or (sorted_by_index and 'TEMP B-TREE' in line)
+            ]
+
+    def assertIndexedQueries(self, user, url, params=None, sorted_by_index=False):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for query in queries.captured_queries:
+            if not query['sql'].startswith('SELECT') or not re.search(r'"(incidents|audit_logs)"', query['sql']):
+                continue
+            self.assertEqual(self.plan_problems(query['sql'], sorted_by_index), [], query['sql'])
+
+    def test_guard_incident_list(self):
+        self.assertIndexedQueries(self.guards[0], reverse('incident-list'))
+        self.assertIndexedQueries(self.guards[0], reverse('incident-list'), {'status': 'pending'})
+
+    def test_supervisor_open_incident_list(self):
+        self.assertIndexedQueries(self.supervisor, reverse('incident-list'), {'status': 'in_progress'})
+        self.assertIndexedQueries(self.supervisor, reverse('incident-list'), {'pagination': 'cursor'})
+
+    def test_incident_detail_and_my_incidents(self):
+        self.assertIndexedQueries(self.guards[0], reverse('incident-detail', args=[self.incident.id]))
+        self.assertIndexedQueries(self.guards[0], reverse('incident-my-incidents'))
+
+    def test_audit_log_lookups(self):
+        url = reverse('auditlog-list')
+        self.assertIndexedQueries(self.supervisor, url, sorted_by_index=True)
+        self.assertIndexedQueries(
+            self.supervisor, url, {'entity_type': 'incident', 'entity_id': self.incident.id}, sorted_by_index=True
+        )
+        self.assertIndexedQueries(self.supervisor, url, {'user': self.guards[3].id}, sorted_by_index=True)
+
+class AuditTrackingTests(APITestCase):
+    def setUp(self):
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        self.incident = Incident.objects.create(
+            incident_type='theft', title='Test Theft', description='Someone stole a laptop',
+            location_building='Engineering Block', reported_by=self.guard
+        )
+
+    def test_update_is_audited_without_reloading_the_row(self):
+        incident = Incident.objects.get(pk=self.incident.pk)
+        incident.status = 'in_progress'
+        # One UPDATE for the incident, one INSERT for the audit row
+        with self.assertNumQueries(2):
+            incident.save()
+        audit = AuditLog.objects.filter(entity_type='incident', action='update').latest('id')
+        self.assertEqual(audit.changes, {'status': {'old': 'pending', 'new': 'in_progress'}})
+
+    def test_consecutive_saves_only_log_new_changes(self):
+        incident = Incident.objects.get(pk=self.incident.pk)
+        incident.status = 'resolved'
+        incident.save()
+        incident.resolved_at = timezone.now()
+        incident.save()
+        audit = AuditLog.objects.filter(entity_type='incident', action='update').latest('id')
+        self.assertEqual(list(audit.changes), ['resolved_at'])
+
+    def test_unchanged_save_is_not_logged(self):
+        incident = Incident.objects.get(pk=self.incident.pk)
+        before = AuditLog.objects.count()
+        incident.save()
+        self.assertEqual(AuditLog.objects.count(), before)
+
+    def test_password_changes_are_not_recorded(self):
+        user = User.objects.get(pk=self.guard.pk)
+        user.set_password('new-password')
+        user.phone = '0700000000'
+        user.save()
+        audit = AuditLog.objects.filter(entity_type='user', action='update').latest('id')
+        self.assertEqual(list(audit.changes), ['phone'])
+
+
+class AuditDeduplicationTests(APITestCase):
+    def setUp(self):
+        self.supervisor = User.objects.create_user(
+            username='supervisor', password='password', role='supervisor', full_name='Supervisor'
+        )
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        self.incident = Incident.objects.create(
+            incident_type='theft', title='Test Theft', description='Someone stole a laptop',
+            location_building='Engineering Block', reported_by=self.guard
+        )
+        AuditLog.objects.all().delete()
+        self.client.force_authenticate(user=self.supervisor)
+
+    def test_resolving_update_writes_one_merged_row(self):
+        url = reverse('incident-detail', args=[self.incident.id])
+        response = self.client.patch(url, {'status': 'resolved'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AuditLog.objects.count(), 1)
+        log = AuditLog.objects.get()
+        self.assertEqual(log.action, 'status_change')
+        self.assertEqual(log.user, self.supervisor)
+        self.assertIn('Updated incident', log.description)
+        self.assertEqual(set(log.changes), {'status', 'resolved_at'})
+
+    def test_close_folds_resolution_note_into_one_row(self):
+        url = reverse('incident-close', args=[self.incident.id])
+        self.client.post(url, {'resolution_note': 'Recovered'})
+        self.assertEqual(AuditLog.objects.count(), 1)
+        log = AuditLog.objects.get()
+        self.assertEqual((log.action, log.entity_type), ('status_change', 'incident'))
+        self.assertEqual(log.changes['status']['new'], 'closed')
+
+    def test_add_note_writes_one_row(self):
+        url = reverse('incident-add-note', args=[self.incident.id])
+        self.client.post(url, {'note': 'Spoke to the witness'})
+        self.assertEqual(AuditLog.objects.count(), 1)
+        self.assertIn('Added note', AuditLog.objects.get().description)
+
+    def test_upload_evidence_writes_one_row(self):
+        url = reverse('incident-upload-evidence', args=[self.incident.id])
+        upload = SimpleUploadedFile('photo.png', b'\x89PNG\r\n\x1a\n' + b'0' * 64, content_type='image/png')
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            response = self.client.post(url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(AuditLog.objects.count(), 1)
+        self.assertEqual(AuditLog.objects.get().entity_type, 'evidence')
+
+    def test_entries_from_a_rolled_back_block_are_dropped(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from incident_system.middleware import AuditLogMiddleware
+
+        def view(request):
+            audit.record('update', 'incident', 'Kept', entity_id=self.incident.id)
+            try:
+                with transaction.atomic():
+                    audit.record('create', 'evidence', 'Rolled back', entity_id=1)
+                    raise ValueError
+            except ValueError:
+                pass
+            return HttpResponse()
+
+        AuditLogMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(list(AuditLog.objects.values_list('description', flat=True)), ['Kept'])
+
+    def test_rows_keep_the_time_of_the_event(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from incident_system.middleware import AuditLogMiddleware
+
+        happened = timezone.now() - timedelta(minutes=5)
+
+        def view(request):
+            with mock.patch('incidents.audit.timezone.now', return_value=happened):
+                audit.record('update', 'incident', 'Earlier', entity_id=self.incident.id)
+            return HttpResponse()
+
+        AuditLogMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(AuditLog.objects.get().created_at, happened)
+
+
+class RequestContextTests(APITestCase):
+    def setUp(self):
+        self.guard = User.objects.create_user(
+            username='guard', password='password', role='guard', full_name='Guard'
+        )
+        self.client.force_authenticate(user=self.guard)
+
+    def test_signal_entries_are_attributed_to_the_api_user(self):
+        response = self.client.post(reverse('incident-list'), {
+            'incident_type': 'theft', 'title': 'Stolen bike', 'description': 'From the rack',
+            'location_building': 'Library',
+        }, HTTP_USER_AGENT='incident-tests/1.0', HTTP_X_REQUEST_ID='req-123')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response['X-Request-ID'], 'req-123')
+        log = AuditLog.objects.get(entity_type='incident', action='create')
+        self.assertEqual(log.user, self.guard)
+        self.assertEqual(log.ip_address, '127.0.0.1')
+        self.assertEqual(log.user_agent, 'incident-tests/1.0')
+
+    def test_invalid_request_id_is_replaced(self):
+        response = self.client.get(reverse('incident-list'), HTTP_X_REQUEST_ID='bad id\n')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    async def test_concurrent_async_requests_keep_their_own_context(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from incident_system.middleware import AuditLogMiddleware, get_current_ip, get_request_id
+
+        async def view(request):
+            seen = [(get_current_ip(), get_request_id())]
+            # Let the other request run in between
+            await asyncio.sleep(0.01)
+            seen.append((get_current_ip(), get_request_id()))
+            return HttpResponse(json.dumps(seen))
+
+        middleware = AuditLogMiddleware(view)
+        factory = RequestFactory()
+        responses = await asyncio.gather(*[
+            middleware(factory.get('/', REMOTE_ADDR=f'10.0.0.{i}', HTTP_X_REQUEST_ID=f'req-{i}'))
+            for i in range(5)
+        ])
+        for i, response in enumerate(responses):
+            self.assertEqual(json.loads(response.content), [[f'10.0.0.{i}', f'req-{i}']] * 2)
+        self.assertIsNone(get_current_ip())
+
+
+class BufferedAuditSinkTests(TransactionTestCase):
+    def test_shutdown_flushes_every_queued_record(self):
+        # Thresholds high enough that nothing is written before shutdown
+        sink = BufferedAuditSink(batch_size=1000, flush_interval=60)
+        for i in range(5):
+            sink.write([
+                AuditLog(action='login', entity_type='user', description=f'Login {i}-{j}')
+                for j in range(50)
+            ])
+        sink.shutdown()
+        self.assertEqual(AuditLog.objects.count(), 250)
+
+    def test_batches_are_written_when_size_threshold_is_reached(self):
+        sink = BufferedAuditSink(batch_size=10, flush_interval=60)
+        sink.write([AuditLog(action='login', entity_type='user', description='Login') for _ in range(10)])
+        for _ in range(50):
+            if AuditLog.objects.count() == 10:
+                break
+            time.sleep(0.05)
+        self.assertEqual(AuditLog.objects.count(), 10)
+        sink.shutdown()
+
+    def failures(self, name):
+        return metrics.registry.counters[metrics._key(name, {})]
+
+    def test_failed_batches_are_retried(self):
+        bulk_create = AuditLog.objects.bulk_create
+        attempts = []
+
+        def locked_once(logs, *args, **kwargs):
+            attempts.append(len(logs))
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+            return bulk_create(logs, *args, **kwargs)
+
+        failures = self.failures('incident_audit_write_failures_total')
+        sink = BufferedAuditSink(batch_size=1000, flush_interval=60, retry_delays=(0,))
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=locked_once), \
+                self.assertLogs('incidents.audit', 'WARNING') as logs:
+            sink.write([AuditLog(action='login', entity_type='user', description='Login') for _ in range(20)])
+            sink.shutdown()
+        self.assertEqual(attempts, [20, 20])
+        self.assertIn('retrying', logs.output[0])
+        self.assertEqual(AuditLog.objects.count(), 20)
+        self.assertEqual(self.failures('incident_audit_write_failures_total'), failures + 1)
+
+    def test_only_unwritable_entries_are_dropped(self):
+        bulk_create = AuditLog.objects.bulk_create
+
+        def reject_bad(logs, *args, **kwargs):
+            if any(log.description == 'Bad' for log in logs):
+                raise IntegrityError('rejected')
+            return bulk_create(logs, *args, **kwargs)
+
+        dropped = self.failures('incident_audit_entries_dropped_total')
+        sink = BufferedAuditSink(batch_size=1000, flush_interval=60, retry_delays=(0,))
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=reject_bad), \
+                self.assertLogs('incidents.audit', 'ERROR') as logs:
+            sink.write([
+                AuditLog(action='login', entity_type='user', description=description)
+                for description in ['Good', 'Bad', 'Good']
+            ])
+            sink.shutdown()
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self.assertEqual(self.failures('incident_audit_entries_dropped_total'), dropped + 1)
+        self.assertIn('Dropped audit log entry: login user', logs.output[-1])
+
+
+class ReferenceSequenceTests(APITestCase):
+    def create_incident(self):
+        return Incident.objects.create(
+            incident_type='noise', title='Noise', description='Loud music',
+            location_building='Hostel B'
+        )
+
+    def test_reference_numbers_are_sequential_per_prefix(self):
+        year = timezone.now().year
+        first = self.create_incident()
+        second = self.create_incident()
+        report = PublicReport.objects.create(
+            incident_type='noise', description='Loud music', location_building='Hostel B'
+        )
+        self.assertEqual(first.reference_number, f'INC-{year}-00001')
+        self.assertEqual(second.reference_number, f'INC-{year}-00002')
+        self.assertEqual(report.reference_number, f'PUB-{year}-00001')
+
+    def test_bulk_reservation_is_contiguous_and_not_reissued(self):
+        year = timezone.now().year
+        self.create_incident()
+        reserved = ReferenceSequence.reserve_references('INC', 3)
+        self.assertEqual(reserved, [f'INC-{year}-0000{n}' for n in (2, 3, 4)])
+        self.assertEqual(self.create_incident().reference_number, f'INC-{year}-00005')
+
+    def test_allocation_does_not_scan_incidents(self):
+        self.create_incident()
+        with CaptureQueriesContext(connection) as ctx:
+            self.create_incident()
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+
+class GenerateLoadDataTests(APITestCase):
+    def generate(self, seed):
+        call_command(
+            'generate_load_data', users=20, incidents=300, public_reports=30, audit_logs=200,
+            days=90, seed=seed, batch_size=100, stdout=io.StringIO()
+        )
+
+    def test_generates_requested_volumes_with_historical_timestamps(self):
+        self.generate(seed=3)
+        self.assertEqual(User.objects.filter(username__startswith='load3_').count(), 20)
+        self.assertEqual(Incident.objects.count(), 300)
+        self.assertEqual(PublicReport.objects.filter(incident__isnull=False).count(), 30)
+        self.assertEqual(Incident.objects.filter(is_public_report=True).count(), 30)
+        self.assertEqual(AuditLog.objects.filter(user_agent='load-generator').count(), 200)
+        self.assertGreater(IncidentNote.objects.count(), 0)
+        # Only evidence the upload view could have accepted
+        self.assertEqual(set(Evidence.objects.values_list('file_type', flat=True)), {'jpeg', 'png', 'pdf'})
+
+        oldest = Incident.objects.order_by('created_at').first().created_at
+        self.assertLess(oldest, timezone.now() - timedelta(days=30))
+        self.assertFalse(Incident.objects.filter(resolved_at__lt=F('created_at')).exists())
+        self.assertEqual(Incident.objects.values('reference_number').distinct().count(), 300)
+        # Derived tables are rebuilt for the bulk-loaded rows
+        self.assertEqual(DailyIncidentRollup.objects.aggregate(total=Sum('incident_count'))['total'], 300)
+
+    def test_same_seed_gives_same_data(self):
+        self.generate(seed=5)
+        first = list(Incident.objects.order_by('id').values_list('incident_type', 'severity', 'status', 'title'))
+        Incident.objects.all().delete()
+        User.objects.filter(username__startswith='load5_').delete()
+        AuditLog.objects.all().delete()
+        self.generate(seed=5)
+        second = list(Incident.objects.order_by('id').values_list('incident_type', 'severity', 'status', 'title'))
+        self.assertEqual(first, second)
+
+
+class BenchmarkCommandTests(APITestCase):
+    def test_writes_a_report_per_endpoint(self):
+        Incident.objects.create(
+            incident_type='theft', title='Test', description='Test', location_building='Library'
+        )
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command(
+                'benchmark_api', iterations=3, warmup=0, output=output.name, stdout=io.StringIO(),
+                only=['auth.login', 'incidents.list', 'incidents.close', 'public.status'],
+            )
+            with open(output.name) as handle:
+                report = json.load(handle)
+
+        self.assertEqual(report['meta']['database'], connection.vendor)
+        self.assertEqual(
+            set(report['endpoints']), {'auth.login', 'incidents.list', 'incidents.close', 'public.status'}
+        )
+        result = report['endpoints']['incidents.list']
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+        self.assertGreater(result['queries'], 0)
+        self.assertGreater(result['peak_memory_kb'], 0)
+
+    def test_heavy_retrieve_uses_a_fixed_size_incident(self):
+        def run():
+            with tempfile.NamedTemporaryFile(suffix='.json') as output:
+                call_command(
+                    'benchmark_api', iterations=2, warmup=0, output=output.name, stdout=io.StringIO(),
+                    only=['incidents.retrieve', 'incidents.retrieve.heavy', 'incidents.add_note'],
+                )
+                with open(output.name) as handle:
+                    return json.load(handle)
+
+        report = run()
+        heavy = report['meta']['heavy_incident']
+        self.assertEqual((heavy['notes'], heavy['evidence']), (200, 50))
+        incident = Incident.objects.get(pk=heavy['id'])
+        self.assertEqual((incident.notes.count(), incident.evidence.count()), (200, 50))
+        # Prefetched: the query count doesn't grow with notes and evidence
+        endpoints = report['endpoints']
+        self.assertEqual(endpoints['incidents.retrieve.heavy']['queries'], endpoints['incidents.retrieve']['queries'])
+        # Other scenarios never write to it, so later runs reuse it
+        self.assertEqual(run()['meta']['heavy_incident']['id'], incident.id)
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True)
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        instrumentation.stats.reset()
+        self.admin = User.objects.create_user(
+            username='admin', password='password', role='admin', full_name='Admin'
+        )
+        Incident.objects.create(
+            incident_type='theft', title='Test', description='Test', location_building='Library'
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def test_server_timing_and_route_stats(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('incident-list'))
+        query_count = len(queries.captured_queries)
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertIn(f'desc="{query_count} queries"', timing)
+        self.assertIn('serialize;dur=', timing)
+
+        response = self.client.get(reverse('request-stats'))
+        route = response.data['routes']['GET incident-list']
+        self.assertEqual(route['count'], 1)
+        self.assertEqual(route['max_queries'], query_count)
+        self.assertGreater(route['avg_response_bytes'], 0)
+
+    def test_stats_are_admin_only(self):
+        guard = User.objects.create_user(username='guard', password='password', role='guard', full_name='Guard')
+        self.client.force_authenticate(user=guard)
+        self.assertEqual(self.client.get(reverse('request-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(INSTRUMENTATION_QUERY_BUDGET=1)
+    def test_requests_over_budget_are_logged(self):
+        with self.assertLogs('incident_system.instrumentation', level='WARNING') as logs:
+            self.client.get(reverse('incident-list'))
+        self.assertIn('GET incident-list', logs.output[0])
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_nothing_is_recorded_or_served_when_disabled(self):
+        response = self.client.get(reverse('incident-list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.metrics_dir.cleanup)
+        overrides = override_settings(
+            METRICS_ENABLED=True, METRICS_DIR=self.metrics_dir.name, METRICS_TOKEN='scrape-token'
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        metrics.registry._reset()
+
+        self.admin = User.objects.create_user(
+            username='admin', password='password', role='admin', full_name='Admin'
+        )
+        Incident.objects.create(
+            incident_type='theft', title='Test', description='Test', location_building='Library'
+        )
+
+    def scrape(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Token scrape-token')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_nothing_is_recorded_or_served_when_disabled(self):
+        with override_settings(METRICS_ENABLED=False):
+            self.client.force_authenticate(user=self.admin)
+            self.client.get(reverse('incident-list'))
+            self.assertEqual(os.listdir(self.metrics_dir.name), [])
+            self.client.force_authenticate(user=None)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Token scrape-token')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_requests_cache_and_incidents_are_exposed(self):
+        self.client.force_authenticate(user=self.admin)
+        self.client.get(reverse('incident-list'))
+        self.client.get(reverse('incident-dashboard-stats'))
+        self.client.get(reverse('incident-dashboard-stats'))
+
+        body = self.scrape()
+        self.assertIn('incident_api_requests_total{method="GET",route="incident-list",status="200"} 1', body)
+        self.assertIn('incident_api_request_duration_seconds_count{method="GET",route="incident-list"} 1', body)
+        self.assertIn('incident_analytics_cache_requests_total{endpoint="dashboard_stats",result="hit"} 1', body)
+        self.assertIn('incident_analytics_cache_requests_total{endpoint="dashboard_stats",result="miss"} 1', body)
+        self.assertIn('incident_incidents{status="pending"} 1', body)
+        self.assertIn('incident_audit_queue_depth 0', body)
+
+    def test_worker_files_are_summed(self):
+        self.client.force_authenticate(user=self.admin)
+        self.client.get(reverse('incident-list'))
+        # A worker that has since exited: its counters still count, its gauges don't
+        exited = {
+            'pid': 2 ** 31 - 2,
+            'counters': [['incident_api_requests_total', {'route': 'incident-list', 'method': 'GET', 'status': '200'}, 4]],
+            'histograms': [],
+            'gauges': [['incident_audit_queue_depth', {}, 50]],
+        }
+        with open(f'{self.metrics_dir.name}/metrics-{exited["pid"]}.json', 'w') as handle:
+            json.dump(exited, handle)
+
+        body = self.scrape()
+        self.assertIn('incident_api_requests_total{method="GET",route="incident-list",status="200"} 5', body)
+        self.assertIn('incident_audit_queue_depth 0', body)
+
+    def test_files_from_an_earlier_process_with_the_same_pid(self):
+        self.client.force_authenticate(user=self.admin)
+        self.client.get(reverse('incident-list'))
+        metrics.flush(force=True)
+        # Left by a process that had this PID before; its gauges are stale
+        earlier = {
+            'pid': os.getpid(), 'boot': 'earlier', 'written': time.time() - 3600,
+            'counters': [['incident_api_requests_total', {'route': 'incident-list', 'method': 'GET', 'status': '200'}, 2]],
+            'histograms': [],
+            'gauges': [['incident_audit_queue_depth', {}, 50]],
+        }
+        with open(f'{self.metrics_dir.name}/metrics-{os.getpid()}-earlier.json', 'w') as handle:
+            json.dump(earlier, handle)
+        self.assertEqual(len(os.listdir(self.metrics_dir.name)), 2)
+
+        body = self.scrape()
+        self.assertIn('incident_api_requests_total{method="GET",route="incident-list",status="200"} 3', body)
+        self.assertIn('incident_audit_queue_depth 0', body)
+
+        metrics.clear()
+        self.assertEqual(os.listdir(self.metrics_dir.name), [])
+
+    def test_requires_token_or_admin(self):
+        guard = User.objects.create_user(username='guard', password='password', role='guard', full_name='Guard')
+        url = reverse('metrics')
+        self.assertEqual(
+            self.client.get(url, HTTP_AUTHORIZATION='Token wrong').status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        self.client.force_authenticate(user=guard)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
@@ -0,0 +1,57 @@
+class FieldTrackerMixin:
+    """Model mixin that remembers the loaded values of editable fields.
+
+    The snapshot is taken when an instance is loaded from the database and
+    refreshed after every save, so the audit signals can diff an update in
+    memory instead of re-reading the row in pre_save.
+    """
+    tracking_exclude = ()
+
+    @classmethod
+    def tracked_fields(cls):
+        return [
+            field for field in cls._meta.concrete_fields
+            if field.editable and not field.primary_key and field.name not in cls.tracking_exclude
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.reset_tracking()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.reset_tracking()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.reset_tracking(kwargs.get('update_fields'))
+
+    def reset_tracking(self, fields=None):
+        """Snapshot current values, optionally only for the given field names."""
+        # Only fields actually loaded are tracked; deferred ones are skipped
+        state = {
+            field.attname: self.__dict__[field.attname]
+            for field in self.tracked_fields()
+            if field.attname in self.__dict__ and (fields is None or field.name in fields)
+        }
+        if fields is None or not hasattr(self, '_tracked_state'):
+            self._tracked_state = state
+        else:
+            self._tracked_state.update(state)
+
+    def tracked_changes(self):
+        """Return ``{field_name: (old, new)}`` for fields changed since the last load or save."""
+        state = getattr(self, '_tracked_state', None)
+        if state is None:
+            return {}
+        changes = {}
+        for field in self.tracked_fields():
+            if field.attname not in state or field.attname not in self.__dict__:
+                continue
+            old_value = state[field.attname]
+            new_value = self.__dict__[field.attname]
+            if old_value != new_value:
+                changes[field.name] = (old_value, new_value)
+        return changes
@@ -0,0 +1,151 @@
+"""Evidence upload pipeline.
+
+Uploads are spooled to a temporary file chunk by chunk while their SHA-256
+is computed, so a 10MB photo never sits in memory. The real type is sniffed
+from the leading bytes instead of trusting the client's Content-Type.
+Identical files share one content-addressed EvidenceBlob, reference counted
+by the Evidence rows that use it, and images get a downscaled JPEG
+thumbnail generated on the background pool.
+"""
+import hashlib
+import io
+import logging
+
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from incident_system import background
+from incident_system import metrics
+from .models import EvidenceBlob
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of the accepted formats
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'%PDF-', 'application/pdf'),
+]
+EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'application/pdf': 'pdf'}
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """Spool uploads to disk, hashing them on the way.
+
+    The finished file carries ``sha256``. Bytes past EVIDENCE_MAX_UPLOAD_SIZE
+    are counted but not written, so an oversized upload reports its full
+    size for the view to reject without filling the disk.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        room = settings.EVIDENCE_MAX_UPLOAD_SIZE - self.received
+        self.received += len(raw_data)
+        if room > 0:
+            self.hasher.update(raw_data[:room])
+            self.file.write(raw_data[:room])
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+def sniff(file):
+    """The content type from ``file``'s leading bytes, or None if it is not an accepted format."""
+    file.seek(0)
+    head = file.read(16)
+    file.seek(0)
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def file_digest(file):
+    if getattr(file, 'sha256', None):
+        return file.sha256
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def _acquire(digest):
+    """Take a reference to an existing blob; None if there is none."""
+    if EvidenceBlob.objects.filter(sha256=digest).update(ref_count=F('ref_count') + 1):
+        metrics.inc('incident_evidence_deduplicated_total')
+        return EvidenceBlob.objects.get(sha256=digest)
+    return None
+
+
+def store_blob(file, content_type):
+    """The EvidenceBlob holding ``file``'s content, stored if new, with a reference taken."""
+    digest = file_digest(file)
+    blob = _acquire(digest)
+    if blob is not None:
+        return blob
+
+    # Always written: a file already at this path may belong to a blob whose
+    # deletion is queued, and the storage then picks a fresh name
+    name = default_storage.save(f'evidence/blobs/{digest[:2]}/{digest[2:4]}/{digest}.{EXTENSIONS[content_type]}', file)
+    try:
+        with transaction.atomic():
+            blob = EvidenceBlob.objects.create(
+                sha256=digest, file=name, content_type=content_type, size=file.size, ref_count=1
+            )
+    except IntegrityError:
+        # Another upload of the same content created it first
+        default_storage.delete(name)
+        return _acquire(digest)
+
+    if content_type.startswith('image/'):
+        transaction.on_commit(lambda: background.submit(make_thumbnail, blob.pk))
+    return blob
+
+
+def release_blob(blob_id):
+    """Drop one reference to a blob, deleting it and its files once none remain."""
+    with transaction.atomic():
+        # Holding the row lock, so an upload of the same content (_acquire)
+        # cannot take a reference between the decrement and the delete
+        blob = EvidenceBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        EvidenceBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+        deleted, _ = EvidenceBlob.objects.filter(pk=blob_id, ref_count__lte=0).delete()
+    if deleted:
+        names = [name for name in (blob.file.name, blob.thumbnail.name) if name]
+        transaction.on_commit(lambda: [default_storage.delete(name) for name in names])
+
+
+def make_thumbnail(blob_id):
+    """Write a downscaled JPEG preview of an image blob."""
+    blob = EvidenceBlob.objects.filter(pk=blob_id).first()
+    if blob is None or blob.thumbnail:
+        return
+    size = settings.EVIDENCE_THUMBNAIL_SIZE
+    try:
+        with blob.file.open('rb') as source, Image.open(source) as image:
+            # Phone photos are often stored sideways with an EXIF rotation
+            preview = ImageOps.exif_transpose(image)
+            preview.thumbnail((size, size))
+            if preview.mode not in ('RGB', 'L'):
+                preview = preview.convert('RGB')
+            output = io.BytesIO()
+            preview.save(output, 'JPEG', quality=80, optimize=True)
+    except (OSError, Image.DecompressionBombError):
+        logger.warning('Could not generate a thumbnail for evidence blob %s', blob.sha256, exc_info=True)
+        return
+    name = default_storage.save(f'evidence/thumbnails/{blob.sha256[:2]}/{blob.sha256}.jpg', ContentFile(output.getvalue()))
+    EvidenceBlob.objects.filter(pk=blob.pk).update(thumbnail=name)
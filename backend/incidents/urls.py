@@ -1,13 +1,23 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import IncidentViewSet, AuditLogViewSet, public_report_submit, public_report_status
+from .views import IncidentViewSet, AuditLogViewSet, ExportJobViewSet, public_report_submit, evidence_download
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'incidents', IncidentViewSet, basename='incident')
 router.register(r'audit-logs', AuditLogViewSet, basename='auditlog')
+router.register(r'exports', ExportJobViewSet, basename='export')
 
 urlpatterns = [
+    # Async views; listed before the router so they win over incidents/{pk}/
+    path('incidents/my_incidents/', async_views.my_incidents, name='incident-my-incidents'),
+    path('incidents/advanced_analytics/', async_views.advanced_analytics, name='incident-advanced-analytics'),
+    path('incidents/dashboard_stats/', async_views.dashboard_stats, name='incident-dashboard-stats'),
+    path('incidents/stream/', async_views.incident_stream, name='incident-stream'),
+    path('incidents/stream/ticket/', async_views.stream_ticket, name='incident-stream-ticket'),
     path('', include(router.urls)),
+    path('evidence/<int:pk>/file/', evidence_download, {'variant': 'file'}, name='evidence-file'),
+    path('evidence/<int:pk>/thumbnail/', evidence_download, {'variant': 'thumbnail'}, name='evidence-thumbnail'),
     path('public/submit/', public_report_submit, name='public-report-submit'),
-    path('public/status/<str:reference_number>/', public_report_status, name='public-report-status'),
+    path('public/status/<str:reference_number>/', async_views.public_report_status, name='public-report-status'),
 ]
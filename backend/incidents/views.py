@@ -1,29 +1,170 @@
-from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework import viewsets, mixins, status, permissions
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db.models import Q, Count, Avg, F, ExpressionWrapper, fields
+from django.db.models import Q, Count, Avg, F, ExpressionWrapper, fields, OuterRef, Subquery, IntegerField, Prefetch
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import timedelta
 from users.permissions import IsAdminUser, IsSupervisorUser, IsHeadOfSecurity, IsSecurityGuard
-from .models import Incident, IncidentNote, Evidence, AuditLog, PublicReport
+from .models import Incident, IncidentNote, Evidence, AuditLog, PublicReport, ExportJob
+from . import audit
+from . import cache as incident_cache
+from . import downloads
+from . import sync as incident_sync
+from . import uploads
+from .conditional import make_etag, not_modified, set_etag
+from .filters import filter_incidents, scope_incidents
+from .pagination import CreatedAtCursorPagination
+from .exports import EXPORT_CHUNK_SIZE, fail_stale_jobs, run_export
+from incident_system import background
+from incident_system import metrics
 from .serializers import (
     IncidentListSerializer, IncidentDetailSerializer, 
     IncidentCreateSerializer, IncidentUpdateSerializer,
     IncidentNoteSerializer, EvidenceSerializer,
-    PublicReportSerializer, PublicReportStatusSerializer,
-    AuditLogSerializer
+    IncidentSyncSerializer, IncidentNoteSyncSerializer, EvidenceSyncSerializer,
+    PublicReportSerializer,
+    AuditLogSerializer, ExportJobSerializer
 )
 import csv
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import StreamingHttpResponse, FileResponse
+from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import NotAuthenticated
+from django.db import transaction
+
+EXPORT_HEADER = ['Ref Number', 'Title', 'Type', 'Status', 'Severity', 'Location', 'Reported By', 'Assigned To', 'Created At', 'Resolved At']
+
+
+def _related_count(model):
+    """Correlated COUNT of ``model`` rows pointing at the outer incident."""
+    counts = model.objects.filter(incident=OuterRef('pk')).order_by()\
+        .values('incident').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows, rows_per_chunk=500):
+    """Yield CSV text a batch of rows at a time instead of building the whole body."""
+    writer = csv.writer(Echo())
+    chunk = [writer.writerow(header)]
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= rows_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export_row(row):
+    """Format one values_list row of export_incidents as CSV columns."""
+    (reference_number, title, incident_type, status_value, severity, building, floor,
+     reported_by, assigned_to, created_at, resolved_at) = row
+    return [
+        reference_number,
+        title,
+        incident_type,
+        status_value,
+        severity,
+        f"{building} - {floor}",
+        reported_by if reported_by is not None else 'System/Public',
+        assigned_to if assigned_to is not None else 'Unassigned',
+        created_at.strftime('%Y-%m-%d %H:%M'),
+        resolved_at.strftime('%Y-%m-%d %H:%M') if resolved_at else ''
+    ]
+
+
+def with_related_counts(queryset):
+    """Annotate evidence_count/notes_count so list serializers don't query per row."""
+    return queryset.annotate(
+        evidence_count=_related_count(Evidence),
+        notes_count=_related_count(IncidentNote),
+    )
+
+
+def with_detail_relations(queryset):
+    """Load everything IncidentDetailSerializer touches in a fixed number of queries."""
+    return queryset.select_related('reported_by', 'assigned_to').prefetch_related(
+        Prefetch('notes', queryset=IncidentNote.objects.select_related('user')),
+        Prefetch('evidence', queryset=Evidence.objects.select_related('uploaded_by', 'blob')),
+    )
+
+
+def compute_analytics(incidents):
+    """Compute advanced analytics directly from incident rows (per-user scopes)"""
+    # Trends - Last 30 days
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    trends = incidents.filter(created_at__gte=thirty_days_ago)\
+        .extra(select={'date': "DATE(created_at)"})\
+        .values('date')\
+        .annotate(count=Count('id'))\
+        .order_by('date')
+
+    # Frequency by hour of day (0-23)
+    by_hour = incidents.values('created_at__hour').annotate(count=Count('id')).order_by('created_at__hour')
+    hour_stats = {h: 0 for h in range(24)}
+    for entry in by_hour:
+        hour_stats[entry['created_at__hour']] = entry['count']
+
+    # Group by Location Building
+    by_location = incidents.values('location_building').annotate(count=Count('id')).order_by('-count')
+
+    # Severity distribution
+    by_severity = incidents.values('severity').annotate(count=Count('id'))
+
+    # Resolution Time (Avg in hours)
+    resolved_incidents = incidents.filter(status__in=['resolved', 'closed'], resolved_at__isnull=False)
+    duration_expr = ExpressionWrapper(
+        F('resolved_at') - F('created_at'),
+        output_field=fields.DurationField()
+    )
+    avg_resolution = resolved_incidents.annotate(duration=duration_expr).aggregate(Avg('duration'))['duration__avg']
+
+    avg_res_hours = 0
+    if avg_resolution:
+        avg_res_hours = round(avg_resolution.total_seconds() / 3600, 1)
+
+    # Officer Performance (Resolved counts per officer)
+    officer_performance = resolved_incidents.values('assigned_to__full_name')\
+        .annotate(count=Count('id'))\
+        .order_by('-count')
+
+    # Efficiency by Category (Avg resolution time per incident type)
+    efficiency_by_type = resolved_incidents.annotate(duration=duration_expr)\
+        .values('incident_type')\
+        .annotate(avg_hours=Avg('duration'))
+
+    type_efficiency = []
+    for entry in efficiency_by_type:
+        hours = entry['avg_hours'].total_seconds() / 3600 if entry['avg_hours'] else 0
+        type_efficiency.append({
+            'type': entry['incident_type'],
+            'avg_hours': round(hours, 1)
+        })
+
+    return {
+        'trends': list(trends),
+        'by_hour': [{'hour': k, 'count': v} for k, v in hour_stats.items()],
+        'by_location': [{'location': entry['location_building'], 'count': entry['count']} for entry in by_location],
+        'by_severity': {entry['severity']: entry['count'] for entry in by_severity},
+        'avg_resolution_hours': avg_res_hours,
+        'resolved_count': resolved_incidents.count(),
+        'officer_performance': list(officer_performance),
+        'type_efficiency': type_efficiency
+    }
 
 
 class IncidentViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_permissions(self):
-        if self.action in ['advanced_analytics', 'dashboard_stats']:
-            return [IsSupervisorUser()]
         return [permissions.IsAuthenticated()]
     
     def get_serializer_class(self):
@@ -36,45 +177,101 @@ class IncidentViewSet(viewsets.ModelViewSet):
         return IncidentDetailSerializer
     
     def get_queryset(self):
-        queryset = Incident.objects.all()
-        user = self.request.user
-        
-        # Only supervisors, heads, and admins see all incidents
-        if user.role not in ['supervisor', 'head', 'admin']:
-            queryset = queryset.filter(
-                Q(assigned_to=user) | Q(reported_by=user)
-            )
-        
-        # Filter by query params
-        status_filter = self.request.query_params.get('status', None)
-        incident_type = self.request.query_params.get('type', None)
-        severity = self.request.query_params.get('severity', None)
-        assigned_to = self.request.query_params.get('assigned_to', None)
-        search = self.request.query_params.get('search', None)
-        start_date = self.request.query_params.get('start_date', None)
-        end_date = self.request.query_params.get('end_date', None)
-        
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        if incident_type:
-            queryset = queryset.filter(incident_type=incident_type)
-        if severity:
-            queryset = queryset.filter(severity=severity)
-        if assigned_to:
-            queryset = queryset.filter(assigned_to_id=assigned_to)
-        if search:
-            queryset = queryset.filter(
-                Q(reference_number__icontains=search) |
-                Q(title__icontains=search) |
-                Q(description__icontains=search)
-            )
-        if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
+        # Scoped to the user's role and narrowed by the query params
+        queryset = filter_incidents(self.request.user, self.request.query_params)
+
+        if self.action == 'list':
+            queryset = with_related_counts(queryset)
+        elif self.action == 'retrieve':
+            queryset = with_detail_relations(queryset)
             
         return queryset.select_related('reported_by', 'assigned_to')
 
+    @property
+    def paginator(self):
+        # ?pagination=cursor opts into keyset pages (newest first, no total count)
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = CreatedAtCursorPagination()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        # Any incident, note or evidence change bumps a version, so the list is
+        # validated without a query; an aggregate over a supervisor's scope
+        # would scan every incident on each poll. The URL window keeps a 304
+        # from outliving any signed URLs in the page.
+        etag = make_etag(
+            'incidents', incident_cache.scope_for(request.user), request.get_full_path(),
+            incident_cache.get_version(), incident_cache.get_version(incident_cache.ACTIVITY_VERSION_KEY),
+            downloads.url_window(),
+        )
+        return not_modified(request, etag) or set_etag(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        # A bare lookup first; notes and evidence are only loaded when the client's copy is stale
+        incident = get_object_or_404(
+            filter_incidents(request.user, request.query_params).only('updated_at'), pk=kwargs['pk']
+        )
+        self.check_object_permissions(request, incident)
+        # Evidence URLs are re-signed each window, and a 304 would keep expired ones
+        etag = make_etag(
+            'incident', incident.pk, incident.updated_at,
+            incident_cache.get_version(incident_cache.ACTIVITY_VERSION_KEY), downloads.url_window(),
+        )
+        return not_modified(request, etag) or set_etag(super().retrieve(request, *args, **kwargs), etag)
+
+    def detail_response(self, incident, status_code=status.HTTP_200_OK):
+        """Serialize a freshly loaded incident with its notes and evidence prefetched."""
+        incident = with_detail_relations(Incident.objects.all()).get(pk=incident.pk)
+        return Response(IncidentDetailSerializer(incident).data, status=status_code)
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Incidents, notes and evidence changed since the given sync token"""
+        user = request.user
+        started = timezone.now()
+        token = request.query_params.get('token')
+        saved = incident_sync.load_token(token, user) if token else None
+        reset = saved is None
+        if reset:
+            cursors, window = incident_sync.initial_cursors(started), downloads.url_window()
+        else:
+            cursors, window = saved
+            window = incident_sync.refresh_evidence(cursors, window)
+
+        incidents = scope_incidents(Incident.objects.all(), user)
+        pages = {
+            'incidents': (incidents.select_related('reported_by', 'assigned_to'), 'updated_at'),
+            'notes': (incident_sync.scope_related(IncidentNote.objects.select_related('user'), user), 'updated_at'),
+            'evidence': (incident_sync.scope_related(Evidence.objects.select_related('uploaded_by', 'blob'), user), 'updated_at'),
+            'deleted': (incident_sync.scope_tombstones(user), 'deleted_at'),
+        }
+        rows, has_more = {}, False
+        for kind, (queryset, field) in pages.items():
+            rows[kind], cursors[kind], more = incident_sync.read_page(queryset, field, cursors[kind], started)
+            has_more = has_more or more
+
+        deleted = {'incidents': set(), 'notes': set(), 'evidence': set()}
+        for tombstone in rows['deleted']:
+            kind = {'incident': 'incidents', 'note': 'notes', 'evidence': 'evidence'}[tombstone.entity_type]
+            deleted[kind].add(tombstone.entity_id)
+        if deleted['incidents']:
+            # Reassigned back to the user since it was taken away
+            deleted['incidents'] -= set(incidents.filter(id__in=deleted['incidents']).values_list('id', flat=True))
+
+        context = self.get_serializer_context()
+        return Response({
+            'token': incident_sync.dump_token(user, cursors, window),
+            'reset': reset,
+            'has_more': has_more,
+            'incidents': IncidentSyncSerializer(rows['incidents'], many=True, context=context).data,
+            'notes': IncidentNoteSyncSerializer(rows['notes'], many=True, context=context).data,
+            'evidence': EvidenceSyncSerializer(rows['evidence'], many=True, context=context).data,
+            'deleted': {kind: sorted(ids) for kind, ids in deleted.items()},
+        })
+
     @action(detail=True, methods=['post'], permission_classes=[IsSupervisorUser])
     def assign(self, request, pk=None):
         """Dedicated action to assign an officer to an incident"""
@@ -96,7 +293,7 @@ class IncidentViewSet(viewsets.ModelViewSet):
         incident.save()
         
         # Log assignment
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='assign',
             entity_type='incident',
@@ -104,7 +301,7 @@ class IncidentViewSet(viewsets.ModelViewSet):
             description=f'Assigned incident {incident.reference_number} to {officer.full_name}'
         )
         
-        return Response(IncidentDetailSerializer(incident).data)
+        return self.detail_response(incident)
 
     @action(detail=True, methods=['post'])
     def close(self, request, pk=None):
@@ -122,22 +319,23 @@ class IncidentViewSet(viewsets.ModelViewSet):
         incident.save()
         
         # Add a final note
-        IncidentNote.objects.create(
+        note = IncidentNote.objects.create(
             incident=incident,
             user=user,
             note=f"RESOLUTION: {note_text}"
         )
         
         # Log closure
-        AuditLog.objects.create(
+        audit.record(
             user=user,
             action='status_change',
             entity_type='incident',
             entity_id=incident.id,
-            description=f'Closed incident {incident.reference_number}'
+            description=f'Closed incident {incident.reference_number}',
+            covers=[('incidentnote', note.id)]
         )
         
-        return Response(IncidentDetailSerializer(incident).data)
+        return self.detail_response(incident)
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -145,7 +343,7 @@ class IncidentViewSet(viewsets.ModelViewSet):
         incident = serializer.save()
         
         # Log creation
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='create',
             entity_type='incident',
@@ -153,10 +351,7 @@ class IncidentViewSet(viewsets.ModelViewSet):
             description=f'Created incident {incident.reference_number}'
         )
         
-        return Response(
-            IncidentDetailSerializer(incident).data,
-            status=status.HTTP_201_CREATED
-        )
+        return self.detail_response(incident, status.HTTP_201_CREATED)
     
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -174,7 +369,7 @@ class IncidentViewSet(viewsets.ModelViewSet):
         
         # Log update
         changes = ', '.join([f"{k}: {v}" for k, v in request.data.items()])
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='status_change' if 'status' in request.data else 'update',
             entity_type='incident',
@@ -182,7 +377,7 @@ class IncidentViewSet(viewsets.ModelViewSet):
             description=f'Updated incident {incident.reference_number}: {changes}'
         )
         
-        return Response(IncidentDetailSerializer(incident).data)
+        return self.detail_response(incident)
     
     @action(detail=True, methods=['post'])
     def add_note(self, request, pk=None):
@@ -193,12 +388,13 @@ class IncidentViewSet(viewsets.ModelViewSet):
             note = serializer.save(incident=incident, user=request.user)
             
             # Log note addition
-            AuditLog.objects.create(
+            audit.record(
                 user=request.user,
                 action='update',
                 entity_type='incident',
                 entity_id=incident.id,
-                description=f'Added note to incident {incident.reference_number}'
+                description=f'Added note to incident {incident.reference_number}',
+                covers=[('incidentnote', note.id)]
             )
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -212,26 +408,32 @@ class IncidentViewSet(viewsets.ModelViewSet):
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validate file type
-        allowed_types = ['image/jpeg', 'image/png', 'image/jpg', 'application/pdf']
-        if file.content_type not in allowed_types:
-            return Response({'error': 'Invalid file type'}, status=status.HTTP_400_BAD_REQUEST)
-        
         # Validate file size (10MB)
-        if file.size > 10485760:
+        if file.size > settings.EVIDENCE_MAX_UPLOAD_SIZE:
             return Response({'error': 'File too large (max 10MB)'}, status=status.HTTP_400_BAD_REQUEST)
         
-        evidence = Evidence.objects.create(
-            incident=incident,
-            file=file,
-            file_type=file.content_type.split('/')[-1],
-            file_size=file.size,
-            description=request.data.get('description', ''),
-            uploaded_by=request.user
-        )
+        # Validate file type from the content itself, not the client's Content-Type
+        content_type = uploads.sniff(file)
+        if content_type is None:
+            return Response({'error': 'Invalid file type'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            # Identical files share one stored copy
+            blob = uploads.store_blob(file, content_type)
+            evidence = Evidence.objects.create(
+                incident=incident,
+                file=blob.file.name,
+                blob=blob,
+                file_type=content_type.split('/')[-1],
+                file_size=file.size,
+                description=request.data.get('description', ''),
+                uploaded_by=request.user
+            )
+        metrics.inc('incident_evidence_uploads_total')
+        metrics.inc('incident_evidence_upload_bytes_total', file.size)
         
         # Log upload
-        AuditLog.objects.create(
+        audit.record(
             user=request.user,
             action='upload',
             entity_type='evidence',
@@ -241,144 +443,22 @@ class IncidentViewSet(viewsets.ModelViewSet):
         
         return Response(EvidenceSerializer(evidence).data, status=status.HTTP_201_CREATED)
     
-    @action(detail=False, methods=['get'])
-    def my_incidents(self, request):
-        """Get incidents assigned to current user"""
-        incidents = Incident.objects.filter(assigned_to=request.user).select_related('reported_by', 'assigned_to')
-        serializer = IncidentListSerializer(incidents, many=True)
-        return Response(serializer.data)
-    
-    @action(detail=False, methods=['get'])
-    def advanced_analytics(self, request):
-        """Get detailed analytics for security analysis"""
-        from django.core.cache import cache
-        cache_key = f"analytics_{request.user.id}_{request.user.role}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            return Response(cached_data)
-
-        user = request.user
-        if user.role in ['supervisor', 'head', 'admin']:
-            incidents = Incident.objects.all()
-        else:
-            incidents = Incident.objects.filter(Q(assigned_to=user) | Q(reported_by=user))
-
-        # Trends - Last 30 days
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        trends = incidents.filter(created_at__gte=thirty_days_ago)\
-            .extra(select={'date': "DATE(created_at)"})\
-            .values('date')\
-            .annotate(count=Count('id'))\
-            .order_by('date')
-
-        # Frequency by hour of day (0-23)
-        by_hour = incidents.values('created_at__hour').annotate(count=Count('id')).order_by('created_at__hour')
-        hour_stats = {h: 0 for h in range(24)}
-        for entry in by_hour:
-            hour_stats[entry['created_at__hour']] = entry['count']
-        
-        # Group by Location Building
-        by_location = incidents.values('location_building').annotate(count=Count('id')).order_by('-count')
-
-        # Severity distribution
-        by_severity = incidents.values('severity').annotate(count=Count('id'))
-
-        # Resolution Time (Avg in hours)
-        resolved_incidents = incidents.filter(status__in=['resolved', 'closed'], resolved_at__isnull=False)
-        duration_expr = ExpressionWrapper(
-            F('resolved_at') - F('created_at'),
-            output_field=fields.DurationField()
-        )
-        avg_resolution = resolved_incidents.annotate(duration=duration_expr).aggregate(Avg('duration'))['duration__avg']
-        
-        avg_res_hours = 0
-        if avg_resolution:
-            avg_res_hours = round(avg_resolution.total_seconds() / 3600, 1)
-
-        # Officer Performance (Resolved counts per officer)
-        officer_performance = resolved_incidents.values('assigned_to__full_name')\
-            .annotate(count=Count('id'))\
-            .order_by('-count')
-
-        # Efficiency by Category (Avg resolution time per incident type)
-        efficiency_by_type = resolved_incidents.annotate(duration=duration_expr)\
-            .values('incident_type')\
-            .annotate(avg_hours=Avg('duration'))
-        
-        type_efficiency = []
-        for entry in efficiency_by_type:
-            hours = entry['avg_hours'].total_seconds() / 3600 if entry['avg_hours'] else 0
-            type_efficiency.append({
-                'type': entry['incident_type'],
-                'avg_hours': round(hours, 1)
-            })
-
-        result = {
-            'trends': list(trends),
-            'by_hour': [{'hour': k, 'count': v} for k, v in hour_stats.items()],
-            'by_location': [{'location': entry['location_building'], 'count': entry['count']} for entry in by_location],
-            'by_severity': {entry['severity']: entry['count'] for entry in by_severity},
-            'avg_resolution_hours': avg_res_hours,
-            'resolved_count': resolved_incidents.count(),
-            'officer_performance': list(officer_performance),
-            'type_efficiency': type_efficiency
-        }
-        
-        # Cache for 5 minutes
-        cache.set(cache_key, result, 300)
-        return Response(result)
-
     @action(detail=False, methods=['get'], permission_classes=[IsSupervisorUser])
     def export_incidents(self, request):
-        """Export incidents as CSV"""
-        queryset = self.get_queryset()
+        """Export incidents as CSV, streamed in chunks straight from the database"""
+        rows = self.get_queryset().values_list(
+            'reference_number', 'title', 'incident_type', 'status', 'severity',
+            'location_building', 'location_floor', 'reported_by__full_name',
+            'assigned_to__full_name', 'created_at', 'resolved_at'
+        )
         
-        response = HttpResponse(content_type='text/csv')
+        response = StreamingHttpResponse(
+            stream_csv(EXPORT_HEADER, (export_row(row) for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE))),
+            content_type='text/csv'
+        )
         response['Content-Disposition'] = 'attachment; filename="incidents_export.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Ref Number', 'Title', 'Type', 'Status', 'Severity', 'Location', 'Reported By', 'Assigned To', 'Created At', 'Resolved At'])
-        
-        for incident in queryset:
-            writer.writerow([
-                incident.reference_number,
-                incident.title,
-                incident.incident_type,
-                incident.status,
-                incident.severity,
-                f"{incident.location_building} - {incident.location_floor}",
-                incident.reported_by.full_name if incident.reported_by else 'System/Public',
-                incident.assigned_to.full_name if incident.assigned_to else 'Unassigned',
-                incident.created_at.strftime('%Y-%m-%d %H:%M'),
-                incident.resolved_at.strftime('%Y-%m-%d %H:%M') if incident.resolved_at else ''
-            ])
-        
         return response
 
-    @action(detail=False, methods=['get'])
-    def dashboard_stats(self, request):
-        """Get dashboard statistics"""
-        user = request.user
-        
-        if user.role in ['supervisor', 'head', 'admin']:
-            incidents = Incident.objects.all()
-        else:
-            incidents = Incident.objects.filter(Q(assigned_to=user) | Q(reported_by=user))
-        
-        stats = {
-            'total': incidents.count(),
-            'pending': incidents.filter(status='pending').count(),
-            'assigned': incidents.filter(status='assigned').count(),
-            'in_progress': incidents.filter(status='in_progress').count(),
-            'resolved': incidents.filter(status='resolved').count(),
-            'by_type': dict(incidents.values('incident_type').annotate(count=Count('id')).values_list('incident_type', 'count')),
-            'by_severity': dict(incidents.values('severity').annotate(count=Count('id')).values_list('severity', 'count')),
-        }
-        
-        return Response(stats)
-
-
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def public_report_submit(request):
@@ -407,7 +487,7 @@ def public_report_submit(request):
         report.save()
         
         # Log public submission
-        AuditLog.objects.create(
+        audit.record(
             action='create',
             entity_type='public_report',
             entity_id=report.id,
@@ -422,22 +502,25 @@ def public_report_submit(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['GET'])
+@api_view(['GET', 'HEAD'])
 @permission_classes([permissions.AllowAny])
-def public_report_status(request, reference_number):
-    """Check status of public report"""
-    try:
-        report = PublicReport.objects.get(reference_number=reference_number)
-        serializer = PublicReportStatusSerializer(report)
-        return Response(serializer.data)
-    except PublicReport.DoesNotExist:
-        return Response({'error': 'Report not found'}, status=status.HTTP_404_NOT_FOUND)
+# A page of thumbnails or a PDF viewer's range requests would use up the rate limits
+@throttle_classes([])
+def evidence_download(request, pk, variant):
+    """Serve an evidence file or its thumbnail to a signed URL or a user who may see the incident"""
+    evidence = Evidence.objects.select_related('blob', 'incident')
+    if not downloads.has_valid_signature(request, pk, variant):
+        if not request.user.is_authenticated:
+            raise NotAuthenticated('Link is invalid or has expired')
+        evidence = evidence.filter(incident__in=scope_incidents(Incident.objects.all(), request.user))
+    return downloads.serve(request, get_object_or_404(evidence, pk=pk), variant)
 
 
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsSupervisorUser]
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
         # Only supervisors and above can view audit logs
@@ -462,3 +545,34 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(entity_id=entity_id)
         
         return queryset.select_related('user')
+
+
+
+class ExportJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Background incident exports: create a job, poll it, download the file"""
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsSupervisorUser]
+    
+    def get_queryset(self):
+        jobs = ExportJob.objects.filter(created_by=self.request.user)
+        # Polled jobs lost with a restarted worker report failure instead of pending forever
+        fail_stale_jobs(jobs)
+        return jobs
+    
+    def perform_create(self, serializer):
+        job = serializer.save(created_by=self.request.user)
+        # Start only once the job row is committed and visible to the worker thread
+        transaction.on_commit(lambda: background.submit(run_export, job.pk))
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'completed':
+            return Response({'error': f'Export is {job.status}'}, status=status.HTTP_409_CONFLICT)
+        
+        content_type = 'application/gzip' if job.compress else (
+            'text/csv' if job.format == 'csv' else 'application/x-ndjson'
+        )
+        return FileResponse(job.file.open('rb'), as_attachment=True,
+                            filename=job.filename, content_type=content_type)
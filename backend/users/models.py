@@ -1,7 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from incidents.tracking import FieldTrackerMixin
 
-class User(AbstractUser):
+class User(FieldTrackerMixin, AbstractUser):
     ROLE_CHOICES = [
         ('guard', 'Security Guard'),
         ('supervisor', 'Security Supervisor'),
@@ -15,6 +16,9 @@ class User(AbstractUser):
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Sensitive or noisy fields kept out of the audit diff
+    tracking_exclude = ('password', 'last_login')
     
     class Meta:
         db_table = 'users'
@@ -95,3 +95,16 @@ class UserPermissionTests(APITestCase):
         self.client.force_authenticate(user=self.admin)
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_guards_not_modified_until_a_guard_changes(self):
+        self.client.force_authenticate(user=self.supervisor)
+        url = reverse('user-guards')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.guard.active = False
+        self.guard.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
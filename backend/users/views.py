@@ -6,10 +6,12 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Max
 from .models import User
 from .serializers import UserSerializer, UserCreateSerializer, UserDetailSerializer
 from .permissions import IsAdminUser, IsSupervisorUser, IsHeadOfSecurity, IsSecurityGuard
-from incidents.models import AuditLog
+from incidents import audit
+from incidents.conditional import make_etag, not_modified, set_etag
 
 User = get_user_model()
 
@@ -26,7 +28,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         }
         
         # Log login
-        AuditLog.objects.create(
+        audit.record(
             user=self.user,
             action='login',
             entity_type='user',
@@ -87,18 +89,22 @@ class UserViewSet(viewsets.ModelViewSet):
     def guards(self, request):
         """Get all security guards for assignment"""
         guards = User.objects.filter(role='guard', active=True)
+        state = guards.aggregate(last_updated=Max('updated_at'), count=Count('id'))
+        etag = make_etag('guards', state['last_updated'], state['count'])
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
         serializer = self.get_serializer(guards, many=True)
-        return Response(serializer.data)
+        return set_etag(Response(serializer.data), etag)
     
-    def create(self, request, *args, **kwargs):
-        response = super().create(request, *args, **kwargs)
+    def perform_create(self, serializer):
+        user = serializer.save()
         
         # Log user creation
-        AuditLog.objects.create(
-            user=request.user,
+        audit.record(
+            user=self.request.user,
             action='create',
             entity_type='user',
-            description=f'Created user {request.data.get("username")}'
+            entity_id=user.id,
+            description=f'Created user {user.username}'
         )
-        
-        return response
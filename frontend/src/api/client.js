@@ -81,6 +81,7 @@ export const incidentsAPI = {
   myIncidents: () => apiClient.get('/incidents/my_incidents/'),
   dashboardStats: () => apiClient.get('/incidents/dashboard_stats/'),
   advancedAnalytics: () => apiClient.get('/incidents/advanced_analytics/'),
+  sync: (token) => apiClient.get('/incidents/sync/', { params: token ? { token } : {} }),
   getAuditLogs: (params) => apiClient.get('/audit-logs/', { params }),
 };
 
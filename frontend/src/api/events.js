@@ -0,0 +1,90 @@
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import apiClient from './client';
+
+const STREAM_URL = '/api/incidents/stream/';
+const TICKET_PATH = '/incidents/stream/ticket/';
+const INCIDENT_EVENTS = [
+  'incident.created',
+  'incident.updated',
+  'incident.assigned',
+  'incident.status_changed',
+  'incident.note_added',
+  'incident.deleted',
+];
+// Lists and aggregates that any incident change can affect
+const SHARED_KEYS = [
+  ['dashboard-stats'],
+  ['recent-incidents'],
+  ['incidents'],
+  ['my-incidents'],
+  ['advanced-analytics'],
+  ['incidents-with-evidence'],
+];
+
+// Keep cached queries fresh from the server's event stream instead of polling
+export function useIncidentEvents(enabled) {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (!enabled || typeof EventSource === 'undefined') return undefined;
+
+    let source;
+    let retryTimer;
+    let closed = false;
+
+    const invalidateShared = () => {
+      SHARED_KEYS.forEach((queryKey) => queryClient.invalidateQueries({ queryKey }));
+    };
+
+    const handleIncidentEvent = (event) => {
+      const { incident_id: incidentId } = JSON.parse(event.data);
+      invalidateShared();
+      // Detail pages key on the route parameter, which is a string
+      queryClient.invalidateQueries({ queryKey: ['incident', String(incidentId)] });
+      queryClient.invalidateQueries({ queryKey: ['incident-history', String(incidentId)] });
+    };
+
+    const connect = async () => {
+      let ticket;
+      try {
+        // EventSource cannot send an Authorization header, so it opens the
+        // stream with a short-lived ticket; the client's interceptor
+        // refreshes the access token if needed
+        const { data } = await apiClient.get(TICKET_PATH);
+        // Under WSGI each stream would hold a server worker; keep to
+        // ordinary refetching instead
+        if (!data.streaming) return;
+        ticket = data.ticket;
+      } catch (error) {
+        return;
+      }
+      if (closed) return;
+      source = new EventSource(`${STREAM_URL}?ticket=${encodeURIComponent(ticket)}`);
+      INCIDENT_EVENTS.forEach((type) => source.addEventListener(type, handleIncidentEvent));
+      // Events were missed: refetch everything that is on screen
+      source.addEventListener('sync', () => {
+        invalidateShared();
+        queryClient.invalidateQueries({ queryKey: ['incident'] });
+        queryClient.invalidateQueries({ queryKey: ['incident-history'] });
+      });
+      source.onerror = () => {
+        // EventSource retries dropped connections itself, but gives up on an
+        // error response such as an expired ticket
+        if (source.readyState !== EventSource.CLOSED || closed) return;
+        retryTimer = setTimeout(() => {
+          if (closed) return;
+          connect();
+          invalidateShared();
+        }, 5000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
+  }, [enabled, queryClient]);
+}
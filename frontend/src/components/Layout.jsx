@@ -1,12 +1,14 @@
 import React, { useState } from 'react';
 import { Link, useLocation } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
+import { useIncidentEvents } from '../api/events';
 import { Home, FileText, Plus, BarChart, LogOut, User, Menu, X } from 'lucide-react';
 
 export default function Layout({ children }) {
   const { user, logout } = useAuth();
   const location = useLocation();
   const [sidebarOpen, setSidebarOpen] = useState(false);
+  useIncidentEvents(!!user);
 
   const isActive = (path) => location.pathname === path ? 'active' : '';
 
@@ -299,7 +299,9 @@ export default function IncidentDetail() {
                         </a>
                       </div>
                     ) : (
-                      <img src={item.file} alt="Evidence" />
+                      <a href={item.file} target="_blank" rel="noopener noreferrer">
+                        <img src={item.thumbnail || item.file} alt="Evidence" loading="lazy" />
+                      </a>
                     )}
                     <div style={{ padding: '8px', fontSize: '11px', color: '#64748b' }}>
                       {new Date(item.uploaded_at).toLocaleDateString()}